@@ -1,27 +1,159 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, abort
+from flask import Flask, render_template, request, redirect, url_for, flash, session, abort, jsonify, stream_with_context, g, has_request_context
 from werkzeug.security import generate_password_hash, check_password_hash
-from db import SQL
-from datetime import datetime, date
+from db import SQL, Row, DB_FILE
+from cache import PageCache, make_backend
+from sessions import init_session
+from schemas import STATUS_CHOICES, CV_CHOICES, OPT_CHOICES
+import schemas
+import msgspec
+from msgspec.structs import asdict, astuple
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RoutingException
+from werkzeug.http import is_resource_modified
+from markupsafe import escape
+from metrics import Metrics
+from intervals import WeekIntervals, to_minutes, to_hhmm
+import ics
+import migrations
+from datetime import date, datetime, timezone
 import sqlite3
+import re
+import hashlib
+import secrets
+import csv
+import io
+import os
+from urllib.parse import urlencode
+import atexit
+import click
+from flask.cli import AppGroup
+from functools import wraps
+from itertools import islice
+from bisect import bisect_left
 
 app = Flask(__name__)
 app.secret_key = "change-this-in-prod"
 
-db = SQL()
+# settings from FLASK_* environment variables, e.g. FLASK_CACHE_TYPE=filesystem
+app.config.from_prefixed_env()
 
-CREATE_USERS_SQL = """
-CREATE TABLE IF NOT EXISTS users(
-    id INTEget PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE NOT NULL,
-    email TEXT UNIQUE NOT NULL,
-    hash TEXT NOT NULL
-);
-"""
+# DATABASE: path of the SQLite file (FLASK_DATABASE=..., the benchmarks point it at their own copy).
+# DATABASE_PRAGMAS: PRAGMAs for every connection, over db.DEFAULT_PRAGMAS key by key, e.g.
+# FLASK_DATABASE_PRAGMAS__cache_size=-64000 or FLASK_DATABASE_PRAGMAS='{"mmap_size": 0}'
+db = SQL(app.config.get("DATABASE", DB_FILE), pragmas=app.config.get("DATABASE_PRAGMAS"), row_type=Row)
 
-try:
-    db.execute(CREATE_USERS_SQL)
-except Exception as e:
-    print("DB init error:", e)
+# hand the connection back to the pool after every request, close the pool on exit
+@app.teardown_appcontext
+def release_db(exc):
+    db.release()
+
+atexit.register(db.close_all)
+
+# server-side sessions: the cookie only carries the id (SESSION_TYPE, see sessions.py)
+init_session(app, db)
+
+# per-user page datasets, see cache.py (CACHE_TYPE / CACHE_DIR / CACHE_THRESHOLD / CACHE_TIMEOUT).
+# Keyed by the user's data versions, so writes need no invalidation call (see _cache_generation)
+page_cache = PageCache(make_backend(app.config), lambda uid, entity: _cache_generation(uid, entity))
+
+# query count / SQL / render timings and the slow-query log, see metrics.py
+# (METRICS_ENABLED / METRICS_TOKEN / METRICS_SLOW_QUERY_MS)
+metrics = Metrics(app, db)
+
+# ================ HELPERS ================
+
+# loads every object of a JSON list as kind (see schemas.py); returns the rows as tuples
+# in kind's field order, or the per-row errors
+def _parse_bulk(kind):
+    items = request.get_json(silent=True)
+
+    if not isinstance(items, list):
+        return None, [{"row": None, "error": "Expected a JSON list."}]
+    
+    rows = []
+    errors = []
+
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({"row": i, "error": "Expected an object."})
+            continue
+
+        try:
+            rows.append(astuple(schemas.load(kind, item)))
+        except ValueError as e:
+            errors.append({"row": i, "error": str(e)})
+    
+    return rows, errors
+
+# the user's data versions (migrations/0015_user_data_version.sql): a counter per page's
+# data, bumped by triggers on every write, and changed_at
+def _data_version(uid):
+    rows = db.execute(
+        "SELECT schedule, applications, grades, assignments, changed_at FROM user_data_version WHERE user_id = ?", uid
+    )
+
+    return rows[0] if rows else None
+
+# the page cache's generation of the user's entity (see cache.py): its data version. Inside
+# a transaction the version may not be committed yet (and may be rolled back), so
+# nothing read there is cached. A conditional page has already read the versions for its
+# ETag (g.page_version) and does not write, so the cache goes by the same row
+def _cache_generation(uid, entity):
+    if db.connection().in_transaction:
+        return None
+
+    page_version = g.get("page_version") if has_request_context() else None
+
+    if page_version is not None and page_version[0] == uid:
+        version = page_version[1]
+    else:
+        version = _data_version(uid)
+
+    return version[entity] if version else None
+
+# changes with every deploy, so pages rendered by older templates are not revalidated
+PAGE_ETAG_SALT = str(max(
+    os.path.getmtime(path)
+    for path in (__file__, *(e.path for e in os.scandir(os.path.join(app.root_path, app.template_folder))))
+))
+
+# Conditional GET for a logged-in page that shows entity's data: the ETag comes from the
+# user's version of it (one primary-key lookup), extra() (what else the page depends on,
+# e.g. today's date) and the pending flashed messages. When the browser already has that
+# page, the answer is a 304 before the view runs: no page queries, no template.
+# A page with flashed messages always renders, as that is what shows (and clears) them
+def conditional_page(entity, extra = None):
+
+    def decorator(view):
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = _data_version(session["user_id"]) if "user_id" in session else None
+
+            if version is None:
+                return view(*args, **kwargs)
+
+            g.page_version = (session["user_id"], version)
+            flashes = session.get("_flashes")
+            parts = (PAGE_ETAG_SALT, request.full_path, session["user_id"], entity, version[entity], extra() if extra else None, flashes)
+            etag = hashlib.sha1(repr(parts).encode()).hexdigest()
+
+            if not flashes and etag in request.if_none_match:
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+
+        return wrapper
+
+    return decorator
 
 # ================ ROUTES ================
 
@@ -77,6 +209,15 @@ def signup():
 
     return render_template("signup.html", show_nav=False)
 
+# a new session id whenever who is logged in changes, and the old one's row deleted, so an
+# id someone planted or saw before login (or after logout) is worth nothing. Only the
+# server-side session backends have ids; the signed cookie session is replaced outright
+def _rotate_session():
+    regenerate = getattr(app.session_interface, "regenerate", None)
+
+    if regenerate is not None:
+        regenerate(session)
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
@@ -97,90 +238,74 @@ def login():
             flash("Invalid email or password.", "danget")
             return redirect(url_for("login"))
 
+        # nothing from before the login carries over
+        session.clear()
         session["user_id"] = user["id"]
         session["username"] = user["username"]
         session["email"] = user["email"]
+        _rotate_session()
 
         return redirect(url_for("home"))
     
     return render_template("login.html", show_nav=False)
 
-@app.route("/home")
-def home():
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-    
-    uid = session["user_id"]
+# ---- dashboard summary (user_summary table, kept current by triggers, see migrations/0004) ----
 
-    # Assignments: only those with due in next 7 days (excluding done)
-    assignments_due = db.execute (
-        "SELECT COUNT(*) AS c FROM assignments "
-        "WHERE user_id = ? "
-        "AND due_date IS NOT NULL "
-        "AND DATE(due_date) >= DATE('now') "
-        "AND DATE(due_date) <= DATE('now', '+7 day') "
-        "AND status <> 'done'",
-        uid
-    )[0]["c"]
+SUMMARY_SELECT_SQL = (
+    "SELECT apps_active, overall_grade, next_closing, assignments_due_7d, "
+    "dates_as_of = DATE('now') AS fresh "
+    "FROM user_summary WHERE user_id = ?"
+)
 
+# full rebuild, only for users whose row predates the summary table
+SUMMARY_REBUILD_SQL = (
+    "INSERT OR REPLACE INTO user_summary (user_id, apps_active, overall_grade) "
+    "SELECT ?1, "
     # Applications: the count of only the active ones (not rejected/not interested ones)
-    apps_active = db.execute (
-        "SELECT COUNT(*) AS c FROM applications "
-        "WHERE user_id = ? "
-        "AND status NOT IN ('Rejected', 'Not Interested')",
-        uid
-    )[0]["c"]
-
+    "(SELECT COUNT(*) FROM applications "
+    " WHERE user_id = ?1 AND status NOT IN ('Rejected', 'Not Interested')), "
+    # Overall grade: credits-weighted over the modules with at least one score
+    # (a scored weight above WEIGHT_EPSILON, as in migrations/0017)
+    "(SELECT ROUND(SUM(credits * weighted_sum / scored_weight) / SUM(credits), 2) "
+    " FROM modules WHERE user_id = ?1 AND scored_weight > 1e-9)"
+)
+
+# the date-relative fields, recomputed at most once a day or after a relevant write
+SUMMARY_DATES_SQL = (
+    "UPDATE user_summary SET "
     # Next application closing date
-    next_closing = db.execute (
-        "SELECT MIN(close_date) AS d FROM applications "
-        "WHERE user_id = ?  AND close_date IS NOT NULL "
-        "AND DATE(close_date) >= DATE('now')",
-        uid
-    )[0]["d"]
-
-    # Overall grade
-    mods = db.execute(
-        "SELECT id, credits FROM modules WHERE user_id = ?",
-        uid
-    )
-
-    total_c = 0.0
-    acc = 0.0
+    "next_closing = (SELECT MIN(close_date) FROM applications "
+    " WHERE user_id = ?1 AND close_date IS NOT NULL AND DATE(close_date) >= DATE('now')), "
+    # Assignments: only those with due in next 7 days (excluding done)
+    "assignments_due_7d = (SELECT COUNT(*) FROM assignments "
+    " WHERE user_id = ?1 AND due_date IS NOT NULL "
+    " AND DATE(due_date) >= DATE('now') AND DATE(due_date) <= DATE('now', '+7 day') "
+    " AND status <> 'done'), "
+    "dates_as_of = DATE('now') "
+    "WHERE user_id = ?1"
+)
 
-    for m in mods:
-        rows = db.execute(
-            "SELECT weight_pct, score_pct FROM assessments WHERE module_id = ?", m["id"]
-        )
+def _user_summary(uid):
+    rows = db.execute(SUMMARY_SELECT_SQL, uid)
 
+    if rows and rows[0]["fresh"]:
+        return rows[0]
+    
+    with db.transaction():
         if not rows:
-            continue
-
-        w_sum = 0.0
-        ws = 0.0
+            db.execute(SUMMARY_REBUILD_SQL, uid)
+        
+        db.execute(SUMMARY_DATES_SQL, uid)
+    
+    return db.execute(SUMMARY_SELECT_SQL, uid)[0]
 
-        for r in rows:
-            w = float(r["weight_pct"] or 0)
-            s = r["score_pct"]
 
-            if s is not None:
-                w_sum += w
-                ws += w * s
-            
-        if w_sum > 0:
-            grade = ws / w_sum
-            c = float(m["credits"] or 0.0)
-            acc += grade * c
-            total_c += c
-    
-    overall_grade = round(acc / total_c, 2) if total_c > 0 else None
-
-    overview = {
-        "assignments_due_7d": assignments_due,
-        "apps_active": apps_active,
-        "next_closing": next_closing,
-        "overall_grade": overall_grade
-    }
+@app.route("/home")
+def home():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    
+    overview = _user_summary(session["user_id"])
     
     return render_template("home.html", show_nav=True, username=session.get("username"), overview=overview)
 
@@ -188,6 +313,7 @@ def home():
 def logout():
     session.clear()
     flash("Logged out succesfully.", "info")
+    _rotate_session()
     return redirect(url_for("welcome"))
 
 
@@ -196,19 +322,13 @@ def logout():
 # Days helper
 DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
-# Main page:
-@app.route("/schedule", methods=["GET"])
-def schedule_page():
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-    
+def _load_schedule(uid):
     rows = db.execute(
-        "SELECT id, weekday, start_time, end_time, title, notes "
+        "SELECT id, weekday, start_time, end_time, title, notes, start_min, end_min "
         "FROM schedule_items WHERE user_id = ? "
-        "ORDER BY weekday ASC, start_time ASC, id ASC",
-        session["user_id"]
+        "ORDER BY weekday ASC, start_min ASC, id ASC",
+        uid
     )
-    print("SCHEDULE rows for user", session["user_id"], "=>", rows)  # <— ΔΕΣ ΤΟ LOG
 
     # group the rows by weekday
     items_by_day = {i: [] for i in range(7)}
@@ -217,48 +337,111 @@ def schedule_page():
         day = int(r["weekday"])
         items_by_day[day].append(r)
 
-    return render_template("schedule.html", show_nav=True, items_by_day=items_by_day, days=DAYS)
+    return items_by_day
+
+def _schedule_data(uid):
+    return page_cache.get_or_load(uid, "schedule", lambda: _load_schedule(uid))
+
+# the week as an interval index (see intervals.py) keyed by the slot rows, cached next to them
+def _schedule_week(uid):
+
+    def build():
+        items_by_day = _schedule_data(uid)
+        return WeekIntervals((day, r["start_min"], r["end_min"], r) for day in range(7) for r in items_by_day[day])
+
+    return page_cache.get_or_load(uid, "schedule", build, variant="intervals")
+
+# the slot already on the user's weekday that [start_time, end_time) would overlap, or None.
+# Slots never overlap, so the only candidate is the last one starting before end_time:
+# one probe of idx_sched_user_day_min
+def _schedule_conflict(uid, weekday, start_time, end_time, item_id = None):
+    rows = db.execute(
+        "SELECT id, title, start_time, end_time, end_min FROM schedule_items "
+        "WHERE user_id = ? AND weekday = ? AND start_min < ? AND id IS NOT ? "
+        "ORDER BY start_min DESC LIMIT 1",
+        uid, weekday, to_minutes(end_time), item_id
+    )
+
+    if rows and rows[0]["end_min"] > to_minutes(start_time):
+        return rows[0]
+
+    return None
+
+def _conflict_message(row):
+    return f"Overlaps with {row['title']} ({row['start_time']}-{row['end_time']})."
+
+# what is on now and what comes next (rows or None), from the cached interval index
+def _schedule_now_next(uid):
+    week = _schedule_week(uid)
+    now = datetime.now()
+    minute = now.hour * 60 + now.minute
+
+    current = week.at(now.weekday(), minute)
+    upcoming = week.next_after(now.weekday(), minute)
+
+    return current, upcoming[1] if upcoming else None
+
+# the id of the next slot, in the order WeekIntervals.next_after looks: later today, then
+# the following days, then round to the start of the week (today's earlier slots count as
+# next week's). Each branch is one probe of idx_sched_user_day_min
+SCHEDULE_NEXT_SQL = (
+    "SELECT id FROM ("
+    " SELECT * FROM (SELECT id, 0 AS pass FROM schedule_items WHERE user_id = ? AND weekday = ? AND start_min > ? "
+    "  ORDER BY start_min, end_min, id LIMIT 1)"
+    " UNION ALL"
+    " SELECT * FROM (SELECT id, 1 AS pass FROM schedule_items WHERE user_id = ? AND weekday > ? "
+    "  ORDER BY weekday, start_min, end_min, id LIMIT 1)"
+    " UNION ALL"
+    " SELECT * FROM (SELECT id, 2 AS pass FROM schedule_items WHERE user_id = ? AND weekday <= ? "
+    "  ORDER BY weekday, start_min, end_min, id LIMIT 1)"
+    ") ORDER BY pass LIMIT 1"
+)
+
+# what the Now / Next line shows, for the schedule page's ETag: two index probes instead of
+# the whole week, so a 304 never loads the schedule
+def _schedule_now_next_ids(uid):
+    now = datetime.now()
+    weekday = now.weekday()
+    minute = now.hour * 60 + now.minute
+
+    rows = db.execute(
+        "SELECT id, end_min FROM schedule_items "
+        "WHERE user_id = ? AND weekday = ? AND start_min <= ? "
+        "ORDER BY start_min DESC, end_min DESC, id DESC LIMIT 1",
+        uid, weekday, minute
+    )
+    current = rows[0]["id"] if rows and rows[0]["end_min"] > minute else None
+
+    rows = db.execute(SCHEDULE_NEXT_SQL, uid, weekday, minute, uid, weekday, uid, weekday)
+    upcoming = rows[0]["id"] if rows else None
+
+    return current, upcoming
+
+# Main page:
+@app.route("/schedule", methods=["GET"])
+@conditional_page("schedule", extra=lambda: _schedule_now_next_ids(session["user_id"]))
+def schedule_page():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    
+    uid = session["user_id"]
+    current, upcoming = _schedule_now_next(uid)
+
+    return render_template("schedule.html", show_nav=True, items_by_day=_schedule_data(uid), days=DAYS, current=current, upcoming=upcoming,
+                           calendar_token=_calendar_token(uid))
 
 @app.route("/schedule/save", methods=["POST"])
+@db.transactional
 def schedule_save():
     if "user_id" not in session:
         return redirect(url_for("login"))
     
     item_id_raw = request.form.get("id", "").strip()
-    weekday_raw = request.form.get("weekday", "").strip()
-    start = (request.form.get("start_time") or "").strip()
-    end = (request.form.get("end_time") or "").strip()
-    title = (request.form.get("title") or "").strip()
-    notes = (request.form.get("notes") or "").strip()
-
-    # def to check that time is in HH::MM format and valid
-    def valid_time(t):
-        if not t or len(t) != 5 or t[2] != ":":
-            return False
-        
-        hh, mm = t.split(":")
-        return hh.isdigit() and mm.isdigit() and 0 <= int(hh) <= 23 and 0 <= int(mm) <= 59
 
-    # validations:
     try:
-        weekday = int(weekday_raw)
-    except:
-        weekday = -1
-    
-    if weekday < 0 or weekday > 6:
-        flash("Please select a valid day", "warning")
-        return redirect(url_for("schedule_page"))
-    
-    if not valid_time(start) or not valid_time(end):
-        flash("Please enter valid times", "warning")
-        return redirect(url_for("schedule_page"))
-    
-    if end <= start:
-        flash("End time must be after start time", "warning")
-        return redirect(url_for("schedule_page"))
-    
-    if not title:
-        flash("Please enter a title", "warning")
+        weekday, start, end, title, notes = astuple(schemas.load(schemas.ScheduleItemIn, request.form))
+    except ValueError as e:
+        flash(str(e), "warning")
         return redirect(url_for("schedule_page"))
     
     # update/insert logic stays the same
@@ -276,6 +459,12 @@ def schedule_save():
         if not row or row[0]["user_id"] != session["user_id"]:
             abort(403)
         
+        conflict = _schedule_conflict(session["user_id"], weekday, start, end, item_id)
+
+        if conflict:
+            flash(_conflict_message(conflict), "warning")
+            return redirect(url_for("schedule_page"))
+        
         db.execute(
             "UPDATE schedule_items "
             "SET weekday = ?, start_time = ?, end_time = ?, title = ?, notes = ? "
@@ -285,6 +474,12 @@ def schedule_save():
         flash("Slot updated", "success")
     
     else:
+        conflict = _schedule_conflict(session["user_id"], weekday, start, end)
+
+        if conflict:
+            flash(_conflict_message(conflict), "warning")
+            return redirect(url_for("schedule_page"))
+        
         db.execute(
             "INSERT INTO schedule_items(user_id, weekday, start_time, end_time, title, notes) "
             "VALUES (?, ?, ?, ?, ?, ?)",
@@ -294,8 +489,47 @@ def schedule_save():
     
     return redirect(url_for("schedule_page"))
 
+# Import many slots at once: JSON list of {weekday, start_time, end_time, title, notes}
+@app.route("/schedule/bulk", methods=["POST"])
+@db.transactional
+def schedule_bulk():
+    if "user_id" not in session:
+        abort(401)
+    
+    rows, errors = _parse_bulk(schemas.ScheduleItemIn)
+
+    if errors:
+        return jsonify(errors=errors), 400
+    
+    uid = session["user_id"]
+
+    # the new slots must not overlap the saved ones or each other
+    saved = _load_schedule(uid)
+    week = WeekIntervals((day, r["start_min"], r["end_min"], r) for day in range(7) for r in saved[day])
+
+    for i, (weekday, start, end, title, _) in enumerate(rows):
+        start, end = to_minutes(start), to_minutes(end)
+        other = week.overlapping(weekday, start, end)
+
+        if other is None:
+            week.add(weekday, start, end, {"title": title, "start_time": to_hhmm(start), "end_time": to_hhmm(end)})
+        else:
+            errors.append({"row": i, "error": _conflict_message(other)})
+    
+    if errors:
+        return jsonify(errors=errors), 400
+    
+    ids = db.insert_many(
+        "schedule_items",
+        ("user_id", "weekday", "start_time", "end_time", "title", "notes"),
+        ((uid, *r) for r in rows)
+    )
+
+    return jsonify(ids=ids), 201
+
 # Delete a slot on schedule table
 @app.route("/schedule/delete/<int:item_id>", methods=["POST"])
+@db.transactional
 def schedule_delete(item_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -316,6 +550,7 @@ def schedule_delete(item_id):
 
 # clear the whole table
 @app.route("/schedule/clear", methods=["POST"])
+@db.transactional
 def schedule_clear():
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -331,76 +566,368 @@ def schedule_clear():
 
 # ================ APPLICATIONS ================
 
-STATUS_CHOICES = [
-    "Not Applied",
-    "Interested",
-    "Application Submitted",
-    "Online Assessment",
-    "Case Study",
-    "HireVue",
-    "Telephone Interview",
-    "Video Interview",
-    "Face-to-face Interview",
-    "Assessment Centre",
-    "Offer Received",
-    "Rejected",
-    "Not Interested"
-]
-
-CV_CHOICES = ["Yes", "No"]
-OPT_CHOICES = ["Yes", "No", "Optional"]
+APPLICATION_COLUMNS = ("status", "company", "programme", "open_date", "close_date", "cv", "cover", "written", "notes")
+
+APPLICATION_SELECT_SQL = f"SELECT id, {', '.join(APPLICATION_COLUMNS)} FROM applications WHERE "
+
+# ---- list: filters, sort and keyset pages ----
+
+APPLICATIONS_PER_PAGE = 50
+APPLICATION_SORTS = ("newest", "closing")
+
+# "estimate" counts stop here and show "1000+"
+APPLICATION_COUNT_CAP = 1000
+
+# the list options from the query string, anything invalid dropped
+def _application_filters(args):
+    f = {
+        "status": args.get("status", ""),
+        "company": args.get("company", "").strip(),
+        "close_from": args.get("close_from", ""),
+        "close_to": args.get("close_to", ""),
+        "sort": args.get("sort", "newest"),
+        "count": args.get("count", "estimate"),
+        "cursor": args.get("cursor", ""),
+    }
+
+    if f["status"] not in STATUS_CHOICES:
+        f["status"] = ""
+
+    for key in ("close_from", "close_to"):
+        if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", f[key]):
+            f[key] = ""
+
+    if f["sort"] not in APPLICATION_SORTS:
+        f["sort"] = "newest"
+
+    if f["count"] != "exact":
+        f["count"] = "estimate"
+
+    return f
+
+def _applications_where(uid, f):
+    clauses = ["user_id = ?"]
+    params = [uid]
+
+    if f["status"]:
+        clauses.append("status = ?")
+        params.append(f["status"])
+
+    if f["company"]:
+        clauses.append("company LIKE ? ESCAPE '\\'")
+        params.append("%" + re.sub(r"([\\%_])", r"\\\1", f["company"]) + "%")
+
+    if f["close_from"]:
+        clauses.append("close_date >= ?")
+        params.append(f["close_from"])
+
+    if f["close_to"]:
+        clauses.append("close_date <= ?")
+        params.append(f["close_to"])
+
+    return " AND ".join(clauses), params
+
+# one page of the filtered list plus the cursor of the next one (None on the last page).
+# Keyset pages: the cursor is the sort key of the last row shown, so page N costs the same
+# as page 1. "newest" is id DESC (cursor "<id>"); "closing" is close_date ASC, id ASC with
+# the undated rows last, in two index walks (cursor "d.<date>.<id>" or "n.<id>")
+def _load_applications(uid, f, limit = APPLICATIONS_PER_PAGE):
+    where, params = _applications_where(uid, f)
+    cursor = f["cursor"].split(".")
+
+    if f["sort"] == "newest":
+        if cursor[0].isdigit():
+            where += " AND id < ?"
+            params.append(int(cursor[0]))
+
+        rows = db.execute(APPLICATION_SELECT_SQL + where + " ORDER BY id DESC LIMIT ?", *params, limit + 1)
+    else:
+        rows = []
+        undated = cursor[0] == "n" and len(cursor) == 2 and cursor[1].isdigit()
+
+        if not undated:
+            dated_where = where + " AND close_date IS NOT NULL"
+            dated_params = list(params)
+
+            if cursor[0] == "d" and len(cursor) == 3 and cursor[2].isdigit():
+                dated_where += " AND (close_date, id) > (?, ?)"
+                dated_params += [cursor[1], int(cursor[2])]
+
+            rows = db.execute(
+                APPLICATION_SELECT_SQL + dated_where + " ORDER BY close_date, id LIMIT ?",
+                *dated_params, limit + 1
+            )
+
+        # a date range never matches the undated rows
+        if len(rows) <= limit and not (f["close_from"] or f["close_to"]):
+            undated_where = where + " AND close_date IS NULL"
+            undated_params = list(params)
+
+            if undated:
+                undated_where += " AND id > ?"
+                undated_params.append(int(cursor[1]))
+
+            rows += db.execute(
+                APPLICATION_SELECT_SQL + undated_where + " ORDER BY id LIMIT ?",
+                *undated_params, limit + 1 - len(rows)
+            )
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+
+    if f["sort"] == "newest":
+        return rows, str(last["id"])
+
+    return rows, f"d.{last['close_date']}.{last['id']}" if last["close_date"] else f"n.{last['id']}"
+
+# how many rows match the filters: exact, or counted only up to APPLICATION_COUNT_CAP.
+# Returns (count, capped)
+def _count_applications(uid, f):
+    where, params = _applications_where(uid, f)
+
+    if f["count"] == "exact":
+        return db.execute("SELECT COUNT(*) AS n FROM applications WHERE " + where, *params)[0]["n"], False
+
+    n = db.execute(
+        "SELECT COUNT(*) AS n FROM (SELECT 1 FROM applications WHERE " + where + " LIMIT ?)",
+        *params, APPLICATION_COUNT_CAP + 1
+    )[0]["n"]
+
+    return min(n, APPLICATION_COUNT_CAP), n > APPLICATION_COUNT_CAP
+
+# the page for these filters, cached per filter set until the user's next applications write
+def _applications_page_data(uid, f):
+
+    def load():
+        rows, next_cursor = _load_applications(uid, f)
+        count, capped = _count_applications(uid, f)
+        return {"rows": rows, "next_cursor": next_cursor, "count": count, "count_capped": capped}
+
+    return page_cache.get_or_load(uid, "applications", load, variant=urlencode(sorted(f.items())))
 
 @app.route("/applications", methods=["GET"])
+@conditional_page("applications")
 def applications_page():
     if "user_id" not in session:
         return redirect(url_for("login"))
     
-    rows = db.execute(
-        "SELECT id, status, company, programme, open_date, close_date, cv, cover, written, notes "
-        "FROM applications WHERE user_id = ? ORDER BY id DESC",
-        session["user_id"]
-    )
+    f = _application_filters(request.args)
+    data = _applications_page_data(session["user_id"], f)
+
+    # the filters that differ from the defaults, minus the cursor, for the next-page and reset links
+    defaults = _application_filters({})
+    list_args = {k: v for k, v in f.items() if v != defaults[k] and k != "cursor"}
 
     return render_template("applications.html", show_nav=True, 
-        applications = rows, 
+        applications = data["rows"], 
+        next_cursor = data["next_cursor"],
+        total = data["count"],
+        total_capped = data["count_capped"],
+        filters = f,
+        list_args = list_args,
+        
         STATUS_CHOICES = STATUS_CHOICES, 
         CV_CHOICES = CV_CHOICES, 
         OPT_CHOICES = OPT_CHOICES
     )
 
 @app.route("/applications/add", methods=["POST"])
+@db.transactional
 def applications_add():
     if "user_id" not in session:
         return redirect(url_for("login"))
     
-    status = request.form.get("status", "Not Applied").strip()
-    company = request.form.get("company", "").strip()
-    programme = request.form.get("programme", "").strip()
-    open_date = request.form.get("open_date") or None
-    close_date = request.form.get("close_date") or None
-    cv = request.form.get("cv", "Yes").strip()
-    cover = request.form.get("cover", "Optional").strip()
-    written = request.form.get("written", "Optional").strip()
-    notes = request.form.get("notes", "").strip()
-
-    if status not in STATUS_CHOICES or cv not in CV_CHOICES or cover not in OPT_CHOICES or written not in OPT_CHOICES:
-        flash("Invalid selection.", "warning")
-        return redirect(url_for("applications_page"))
-    
-    if not company or not programme:
-        flash("Please fill Company and Programme.", "warning")
+    try:
+        values = astuple(schemas.load(schemas.ApplicationIn, request.form))
+    except ValueError as e:
+        flash(str(e), "warning")
         return redirect(url_for("applications_page"))
     
     db.execute(
         "INSERT INTO applications (user_id, status, company, programme, open_date, close_date, cv, cover, written, notes) "
         "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        session["user_id"], status, company, programme, open_date, close_date, cv, cover, written, notes
+        session["user_id"], *values
     )
 
     flash("Application added.", "success")
     return redirect(url_for("applications_page"))
 
+# Import many applications at once: JSON list of objects with the APPLICATION_COLUMNS keys
+@app.route("/applications/bulk", methods=["POST"])
+@db.transactional
+def applications_bulk():
+    if "user_id" not in session:
+        abort(401)
+    
+    rows, errors = _parse_bulk(schemas.ApplicationIn)
+
+    if errors:
+        return jsonify(errors=errors), 400
+    
+    uid = session["user_id"]
+    ids = db.insert_many("applications", ("user_id", *APPLICATION_COLUMNS), ((uid, *r) for r in rows))
+
+    return jsonify(ids=ids), 201
+
+# ---- CSV import ----
+
+# A spreadsheet saved as CSV, header row first. The file is read one row at a time; rows are
+# validated like the add form, written IMPORT_CHUNK_ROWS per transaction, and skipped when
+# the user already has that company + programme (one idx_applications_user_company_programme
+# lookup each, which also catches repeats inside the file). Bad rows are reported, the rest
+# are saved
+
+IMPORT_CHUNK_ROWS = 500
+IMPORT_MAX_ERRORS = 100
+
+# header spellings people use for the ApplicationIn fields (after lower-casing, non-letters -> _)
+IMPORT_HEADER_ALIASES = {
+    "program": "programme",
+    "role": "programme",
+    "opens": "open_date",
+    "closes": "close_date",
+    "deadline": "close_date",
+    "cover_letter": "cover",
+    "written_test": "written",
+}
+
+APPLICATION_DUPLICATE_SQL = (
+    "SELECT 1 FROM applications "
+    "WHERE user_id = ? AND company = ? COLLATE NOCASE AND programme = ? COLLATE NOCASE LIMIT 1"
+)
+
+APPLICATION_INSERT_SQL = (
+    f"INSERT INTO applications (user_id, {', '.join(APPLICATION_COLUMNS)}) "
+    f"VALUES (?{', ?' * len(APPLICATION_COLUMNS)})"
+)
+
+def _import_field(header):
+    key = re.sub(r"[^a-z0-9]+", "_", header.strip().lower()).strip("_")
+    return IMPORT_HEADER_ALIASES.get(key, key)
+
+# the uploaded CSV as text: the "file" field of a form, or a text/csv request body (read
+# straight from the socket). ValueError when there is none
+def _import_source():
+    upload = request.files.get("file")
+
+    if upload is not None and upload.filename:
+        if upload.filename.lower().endswith((".xlsx", ".xls", ".ods")):
+            raise ValueError("Save the spreadsheet as CSV (File > Save as / Download) and upload that.")
+
+        raw = upload.stream
+    elif request.mimetype == "text/csv":
+        raw = io.BufferedReader(request.stream)
+    else:
+        raise ValueError("Choose a CSV file to import.")
+
+    # utf-8-sig drops the byte order mark Excel writes
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+
+# (line number, {field: value}) per data row; reads the header first, so a file that is
+# not an applications sheet fails before anything is written
+def _import_rows(text):
+    reader = csv.reader(text)
+
+    try:
+        header = next(reader, None)
+    except (csv.Error, UnicodeDecodeError):
+        raise ValueError("The file is not a UTF-8 CSV file (in Excel: Save as > CSV UTF-8).") from None
+
+    if not header:
+        raise ValueError("The file is empty.")
+
+    fields = [_import_field(h) for h in header]
+    known = set(schemas.ApplicationIn.__struct_fields__)
+
+    if "company" not in fields or "programme" not in fields:
+        raise ValueError("The first row must name the columns, with at least Company and Programme.")
+
+    def rows():
+        # numbered by the line the record starts on (the header is line 1, blank lines
+        # count), so a quoted cell spanning lines does not shift the numbers after it
+        while True:
+            number = reader.line_num + 1
+            values = next(reader, None)
+
+            if values is None:
+                return
+
+            if any(v.strip() for v in values):
+                yield number, {f: v for f, v in zip(fields, values) if f in known}
+
+    return rows()
+
+def _import_applications(uid, text):
+    rows = _import_rows(text)
+    report = schemas.ImportReport()
+    last = 1
+
+    def error(number, message):
+        report.error_count += 1
+
+        if len(report.errors) < IMPORT_MAX_ERRORS:
+            report.errors.append(schemas.RowError(row=number, error=message))
+
+    try:
+        while True:
+            # parsed outside the transaction, so a broken file never holds the write lock
+            chunk = list(islice(rows, IMPORT_CHUNK_ROWS))
+
+            if not chunk:
+                break
+
+            with db.transaction():
+                for number, data in chunk:
+                    try:
+                        item = schemas.load(schemas.ApplicationIn, data)
+                    except ValueError as e:
+                        error(number, str(e))
+                        continue
+
+                    if db.execute(APPLICATION_DUPLICATE_SQL, uid, item.company, item.programme):
+                        report.duplicates += 1
+                        continue
+
+                    db.execute(APPLICATION_INSERT_SQL, uid, *astuple(item))
+                    report.imported += 1
+
+            last = chunk[-1][0]
+
+    # the rows before the bad spot are saved
+    except (csv.Error, UnicodeDecodeError):
+        error(None, f"Stopped after the row on line {last}: the rest is not a readable UTF-8 CSV file.")
+
+    return report
+
+# summary flash for the page; the full per-row report is POST /api/v1/applications/import
+@app.route("/applications/import", methods=["POST"])
+def applications_import():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+
+    try:
+        report = _import_applications(session["user_id"], _import_source())
+    except ValueError as e:
+        flash(str(e), "warning")
+        return redirect(url_for("applications_page"))
+
+    message = f"Imported {report.imported} applications."
+
+    if report.duplicates:
+        message += f" Skipped {report.duplicates} you already had."
+
+    if report.error_count:
+        shown = "; ".join(f"line {e.row}: {e.error}" if e.row else e.error for e in report.errors[:5])
+        message += f" {report.error_count} rows not imported ({shown}{'; ...' if report.error_count > 5 else ''})."
+
+    flash(message, "warning" if report.error_count else "success")
+    return redirect(url_for("applications_page"))
+
 @app.route("/applications/<int:app_id>/update", methods=["POST"])
+@db.transactional
 def applications_update(app_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -410,33 +937,22 @@ def applications_update(app_id):
     if not owner or owner[0]["user_id"] != session["user_id"]:
         abort(403)
 
-    status = request.form.get("status", "Not Applied").strip()
-    company = request.form.get("company", "").strip()
-    programme = request.form.get("programme", "").strip()
-    open_date = request.form.get("open_date") or None
-    close_date = request.form.get("close_date") or None
-    cv = request.form.get("cv", "Yes").strip()
-    cover = request.form.get("cover", "Optional").strip()
-    written = request.form.get("written", "Optional").strip()
-    notes = request.form.get("notes", "").strip()
-
-    if status not in STATUS_CHOICES or cv not in CV_CHOICES or cover not in OPT_CHOICES or written not in OPT_CHOICES:
-        flash("Invalid selection.", "warning")
-        return redirect(url_for("applications_page"))
-    
-    if not company or not programme:
-        flash("Please fill Company and Programme.", "warning")
+    try:
+        values = astuple(schemas.load(schemas.ApplicationIn, request.form))
+    except ValueError as e:
+        flash(str(e), "warning")
         return redirect(url_for("applications_page"))
     
     db.execute(
         "UPDATE applications SET status = ?, company = ?, programme = ?, open_date = ?, close_date = ?, cv = ?, cover = ?, written = ?, notes = ? "
         "WHERE id = ?",
-        status, company, programme, open_date, close_date, cv, cover, written, notes, app_id
+        *values, app_id
     )
     flash("Saved.", "success")
     return redirect(url_for("applications_page"))
 
 @app.route("/applications/<int:app_id>/delete", methods=["POST"])
+@db.transactional
 def applications_delete(app_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -453,61 +969,50 @@ def applications_delete(app_id):
 
 # ================ GRADES ================
 
-def _calc_module_stats(module_id: int):
-
-    # it calculates the weight of the assessments and the grade
-    rows = db.execute(
-        "SELECT weight_pct, score_pct FROM assessments WHERE module_id = ?",
-        module_id
-    )
-
-    if not rows:
-        return (0.0, None, 0.0, 0.0)
-    
-    total_weight = sum((r["weight_pct"] or 0) for r in rows)
-    
-    w_sum = 0.0
-    ws_sum = 0.0
+# the module aggregates are REAL sums kept to 9 decimal places (migrations/0016)
+WEIGHT_EPSILON = 1e-9
 
-    for r in rows:
-        w = float(r["weight_pct"] or 0)
-        s = r["score_pct"]
+def _calc_module_stats(m):
 
-        if s is not None:
-            w_sum += w
-            ws_sum += w * s
+    # it calculates the weight of the assessments and the grade
+    # from the module's running aggregates (see trg_assessments_agg_* in migrations/0003, 0016)
+    total_weight = float(m["total_weight"] or 0)
+    w_sum = float(m["scored_weight"] or 0)
+    ws_sum = float(m["weighted_sum"] or 0)
         
-    current_grade = round(ws_sum / w_sum, 2) if w_sum > 0 else None
+    # a scored weight under WEIGHT_EPSILON is what is left of deleted scores, not a score
+    current_grade = round(ws_sum / w_sum, 2) if w_sum > WEIGHT_EPSILON else None
     current_points = round(ws_sum / 100.0, 2)
         
     return (round(total_weight, 2), current_grade, round(w_sum, 2), current_points)
 
 
-@app.route("/grades", methods=["GET"])
-def grades_page():
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-    
-    # Load modules
+# everything grades.html shows, computed once per change
+def _load_grades(uid):
+    # Load modules and all of their assessments: two queries however many modules there are
     modules = db.execute(
-        "SELECT id, name, term, credits FROM modules WHERE user_id = ? ORDER BY term, name",
-        session["user_id"]
+        "SELECT id, name, term, credits, total_weight, scored_weight, weighted_sum "
+        "FROM modules WHERE user_id = ? ORDER BY term, name",
+        uid
+    )
+
+    assessment_rows = db.execute(
+        "SELECT a.id, a.module_id, a.title, a.weight_pct, a.score_pct "
+        "FROM assessments a JOIN modules m ON m.id = a.module_id "
+        "WHERE m.user_id = ? ORDER BY a.module_id, a.id",
+        uid
     )
 
     # building assessments_by_module and modules_by_term
     assessments_by_module = {}
     modules_by_term = {}
 
+    for a in assessment_rows:
+        assessments_by_module.setdefault(a["module_id"], []).append(a)
+
     for m in modules:
-        #load assessments for each module
-        arows = db.execute(
-            "SELECT id, title, weight_pct, score_pct FROM assessments WHERE module_id = ? ORDER BY id",
-            m["id"]
-        )
-        assessments_by_module[m["id"]] = arows
-        
         # computing per-module stats
-        total_w, cur_grade, w_with_score, cur_points = _calc_module_stats(m["id"])
+        total_w, cur_grade, w_with_score, cur_points = _calc_module_stats(m)
 
         m["total_weight"] = total_w
         m["current_grade"] = cur_grade
@@ -583,17 +1088,30 @@ def grades_page():
     vals = [c["overall"] for c in courses_overall if isinstance(c.get("overall"), (int, float))]
     overall_avg = round(sum(vals) / len(vals), 2) if vals else None
 
+    return {
+        "modules_by_term": modules_by_term,
+        "assessments_by_module": assessments_by_module,
+        "term_summaries": term_summaries,
+        "overall_avg": overall_avg,
+        "courses_overall": courses_overall,
+    }
+
+
+@app.route("/grades", methods=["GET"])
+@conditional_page("grades")
+def grades_page():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    
+    uid = session["user_id"]
+    context = page_cache.get_or_load(uid, "grades", lambda: _load_grades(uid))
 
-    return render_template("grades.html", show_nav=True,
-                           modules_by_term = modules_by_term,
-                           assessments_by_module = assessments_by_module,
-                           term_summaries = term_summaries,
-                           overall_avg = overall_avg, 
-                           courses_overall=courses_overall)
+    return render_template("grades.html", show_nav=True, **context)
 
 # -------- Modules: create / update / delete ----------
 
 @app.route("/grades/module/add", methods=["POST"])
+@db.transactional
 def grades_module_add():
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -609,16 +1127,15 @@ def grades_module_add():
     return redirect(url_for("grades_page", open=new_id))
 
 @app.route("/grades/module/create", methods=["POST"])
+@db.transactional
 def grades_module_create():
     if "user_id" not in session:
         return redirect(url_for("login"))
     
-    name = (request.form.get("name") or "").strip()
-    term = int(request.form.get("term") or 1)
-    credits = float(request.form.get("credits") or 0)
-
-    if not name or credits <= 0 or term < 1:
-        flash("Please fill module name, valid term and credits.", "warning")
+    try:
+        name, term, credits = astuple(schemas.load(schemas.ModuleIn, request.form))
+    except ValueError as e:
+        flash(str(e), "warning")
         return redirect(url_for("grades_page"))
     
     db.execute(
@@ -630,6 +1147,7 @@ def grades_module_create():
     return redirect(url_for("grades_page"))
 
 @app.route("/grades/module/<int:module_id>/update", methods=["POST"])
+@db.transactional
 def grades_module_update(module_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -641,12 +1159,10 @@ def grades_module_update(module_id):
     if not owner or owner[0]["user_id"] != session["user_id"]:
         abort(403)
     
-    name = (request.form.get("name") or "").strip()
-    term = int(request.form.get("term") or 1)
-    credits = float(request.form.get("credits") or 0)
-
-    if not name or credits <= 0 or term < 1:
-        flash("Please fill module name, valid term and credits.", "warning")
+    try:
+        name, term, credits = astuple(schemas.load(schemas.ModuleIn, request.form))
+    except ValueError as e:
+        flash(str(e), "warning")
         return redirect(url_for("grades_page"))
     
     db.execute(
@@ -658,6 +1174,7 @@ def grades_module_update(module_id):
     return redirect(url_for("grades_page"))
 
 @app.route("/grades/modules/<int:module_id>/delete", methods=["POST"])
+@db.transactional
 def grades_module_delete(module_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -680,6 +1197,7 @@ def grades_module_delete(module_id):
 # -------- Assessments: create / update / delete ----------
 
 @app.route("/grades/modules/<int:module_id>/assessment/create", methods=["POST"])
+@db.transactional
 def grades_assessment_create(module_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -692,23 +1210,10 @@ def grades_assessment_create(module_id):
         abort(403)
     
 
-    title = (request.form.get("title") or "").strip()
-    weight_raw = request.form.get("weight_pct")
-    score_raw =  request.form.get("score_pct")
-
-    # parsing numbers safely
-    try:
-        weight = float(weight_raw)
-    except:
-        weight = None
-    
     try:
-        score = float(score_raw) if score_raw not in (None, "",) else None
-    except:
-        score = None
-    
-    if not title or weight is None or weight < 0 or weight > 100:
-        flash("Fill a valid assessment title and weight (0-100).", "warning")
+        title, weight, score = astuple(schemas.load(schemas.AssessmentIn, request.form))
+    except ValueError as e:
+        flash(str(e), "warning")
         return redirect(url_for("grades_page"))
     
     db.execute(
@@ -719,10 +1224,38 @@ def grades_assessment_create(module_id):
     flash("Assessment added.", "success")
     return redirect(url_for("grades_page"))
 
-@app.route("/grades/assessment/<int:assessment_id>/update", methods=["POST"])
-def grades_assessment_update(assessment_id):
+# Add many assessments to one module: JSON list of {title, weight_pct, score_pct}
+@app.route("/grades/modules/<int:module_id>/assessments/bulk", methods=["POST"])
+@db.transactional
+def grades_assessment_bulk(module_id):
     if "user_id" not in session:
-        return redirect(url_for("login"))
+        abort(401)
+    
+    owner = db.execute(
+        "SELECT user_id FROM modules WHERE id = ?", module_id
+    )
+
+    if not owner or owner[0]["user_id"] != session["user_id"]:
+        abort(403)
+    
+    rows, errors = _parse_bulk(schemas.AssessmentIn)
+
+    if errors:
+        return jsonify(errors=errors), 400
+    
+    ids = db.insert_many(
+        "assessments",
+        ("module_id", "title", "weight_pct", "score_pct"),
+        ((module_id, *r) for r in rows)
+    )
+
+    return jsonify(ids=ids), 201
+
+@app.route("/grades/assessment/<int:assessment_id>/update", methods=["POST"])
+@db.transactional
+def grades_assessment_update(assessment_id):
+    if "user_id" not in session:
+        return redirect(url_for("login"))
     
     row = db.execute(
         "SELECT a.module_id, m.user_id FROM assessments a JOIN modules m ON m.id = a.module_id WHERE a.id = ?",
@@ -732,23 +1265,10 @@ def grades_assessment_update(assessment_id):
     if not row or row[0]["user_id"] != session["user_id"]:
         abort(403)
     
-    title = (request.form.get("title") or "").strip()
-    weight_raw = request.form.get("weight_pct")
-    score_raw =  request.form.get("score_pct")
-
-    # parsing numbers safely
     try:
-        weight = float(weight_raw)
-    except:
-        weight = None
-    
-    try:
-        score = float(score_raw) if score_raw not in (None, "",) else None
-    except:
-        score = None
-    
-    if not title or weight is None or weight < 0 or weight > 100:
-        flash("Fill a valid assessment title and weight (0-100).", "warning")
+        title, weight, score = astuple(schemas.load(schemas.AssessmentIn, request.form))
+    except ValueError as e:
+        flash(str(e), "warning")
         return redirect(url_for("grades_page"))
     
     db.execute(
@@ -761,6 +1281,7 @@ def grades_assessment_update(assessment_id):
 
 
 @app.route("/grades/assessment/<int:assessment_id>/delete", methods=["POST"])
+@db.transactional
 def grades_assessment_delete(assessment_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -779,72 +1300,135 @@ def grades_assessment_delete(assessment_id):
 
 # ================ ASSIGNMENTS ================
 
-def auto_priority(due_date_str):
-    if not due_date_str:
-        return 3
-    
-    try:
-        due = datetime.strptime(due_date_str, "%Y-%m-%d").date()
-    except ValueError:
-        return 3
-    
-    diff = (due - date.today()).days
+# 1 = due within 3 days (or overdue), 2 = within 7 days, 3 = later or no due date.
+# Worked out in SQL whenever assignments are read, so it is right on any day; the stored
+# priority column is only a snapshot (see migrations/0008_assignment_priority.sql)
+ASSIGNMENT_PRIORITY_SQL = (
+    "CASE "
+    "WHEN julianday(due_date) IS NULL THEN 3 "
+    "WHEN julianday(due_date) - julianday('now', 'localtime', 'start of day') <= 3 THEN 1 "
+    "WHEN julianday(due_date) - julianday('now', 'localtime', 'start of day') <= 7 THEN 2 "
+    "ELSE 3 END"
+)
+
+
+ASSIGNMENT_LIST_SQL = (
+    f"SELECT id, title, due_date, notes, {ASSIGNMENT_PRIORITY_SQL} AS priority, status, done_count, total_count, "
+    "created_at, updated_at FROM assignments WHERE "
+)
+
+ASSIGNMENTS_DONE_PER_PAGE = 20
+
+# the open assignments (not done), headers only: sorted by priority + due date
+def _load_assignments(user_id):
+    return db.execute (
+        ASSIGNMENT_LIST_SQL + "user_id = ? AND status <> 'done' "
+        "ORDER BY priority ASC, "
+        "CASE WHEN due_date IS NULL THEN 1 ELSE 0 END, "
+        "due_date ASC, id DESC",
+        user_id
+    )
 
-    if diff <= 3:
-        return 1
-    if diff <= 7:
-        return 2
+# one page of the finished assignments, newest first, and the cursor of the next page
+# (keyset on id, None on the last page)
+def _load_done_assignments(user_id, cursor = None, limit = ASSIGNMENTS_DONE_PER_PAGE):
+    where = "user_id = ? AND status = 'done'"
+    params = [user_id]
 
-    return 3
+    if cursor:
+        where += " AND id < ?"
+        params.append(cursor)
 
+    rows = db.execute(ASSIGNMENT_LIST_SQL + where + " ORDER BY id DESC LIMIT ?", *params, limit + 1)
 
-def compute_assignment_status(assignment_id):
+    if len(rows) <= limit:
+        return rows, None
 
-    stages = db.execute(
-        "SELECT done FROM assignments_stages WHERE assignment_id = ?", assignment_id
-    )
-    total = len(stages)
-    done = sum(s["done"] for s in stages)
-    progress = (done / total * 100) if total > 0 else 0
+    return rows[:limit], rows[limit - 1]["id"]
 
-    status = (
-        "done" if progress == 100
-        else "in_progress" if done > 0
-        else "pending"
+def _load_stages(assignment_id):
+    return db.execute (
+        "SELECT id, assignment_id, title, done, position FROM assignments_stages "
+        "WHERE assignment_id = ? ORDER BY position ASC, id ASC",
+        assignment_id
     )
 
-    db.execute (
-        "UPDATE assignments SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        status, assignment_id
+# stage positions within an assignment are 1 * STAGE_GAP, 2 * STAGE_GAP, ... (see
+# migrations/0011_stage_position_gaps.sql), leaving room to move a stage between two others
+STAGE_GAP = 1024
+
+# appends a stage; the position is worked out in the same statement, so two adds cannot
+# pick the same one. Returns the new id
+def _insert_stage(assignment_id, title, done = False):
+    return db.execute (
+        "INSERT INTO assignments_stages (assignment_id, title, done, position) "
+        "SELECT ?, ?, ?, COALESCE(MAX(position), 0) + ? FROM assignments_stages WHERE assignment_id = ?",
+        assignment_id, title, int(done), STAGE_GAP, assignment_id
     )
 
-    return progress, status
+# indices of a longest strictly increasing run (not necessarily contiguous) in values
+def _longest_increasing(values):
+    tails, tail_index, prev = [], [], [None] * len(values)
 
+    for i, v in enumerate(values):
+        k = bisect_left(tails, v)
 
-# ----- main page ------
-@app.route("/assignments", methods=["GET"])
-def assignments_page():
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-    
-    user_id = session["user_id"]
+        if k == len(tails):
+            tails.append(v)
+            tail_index.append(i)
+        else:
+            tails[k] = v
+            tail_index[k] = i
+
+        prev[i] = tail_index[k - 1] if k else None
+
+    out = []
+    i = tail_index[-1] if tail_index else None
+
+    while i is not None:
+        out.append(i)
+        i = prev[i]
+
+    return out[::-1]
 
-    # assignments sorted by priority + due date
+# new positions for stages whose current positions, in the wanted order, are `positions`.
+# The longest already-ordered run keeps its positions and every other stage gets one
+# spaced out between its new neighbours, so moving one stage changes one position.
+# When there is no room left, everything is renumbered STAGE_GAP apart
+def _reorder_positions(positions):
+    new = list(positions)
+    anchors = [-1, *_longest_increasing(positions), len(positions)]
+
+    for a, b in zip(anchors, anchors[1:]):
+        if b - a < 2:
+            continue
+
+        low = positions[a] if a >= 0 else 0
+        step = (positions[b] - low) // (b - a) if b < len(positions) else STAGE_GAP
+
+        if step < 1:
+            return [(i + 1) * STAGE_GAP for i in range(len(positions))]
+
+        for j, i in enumerate(range(a + 1, b), start=1):
+            new[i] = low + step * j
+
+    return new
+
+# every assignment with all its stages (the JSON list)
+def _load_assignments_with_stages(user_id):
     assignments = db.execute (
-        "SELECT id, title, due_date, notes, priority, created_at, updated_at "
-        "FROM assignments WHERE user_id = ? "
+        ASSIGNMENT_LIST_SQL + "user_id = ? "
         "ORDER BY priority ASC, "
         "CASE WHEN due_date IS NULL THEN 1 ELSE 0 END, "
         "due_date ASC, id DESC",
         user_id
     )
 
-    # all stages
     stage_rows = db.execute (
-        "SELECT id, assignment_id, title, done, position " 
-        "FROM assignments_stages "
-        "WHERE assignment_id  IN (SELECT id FROM assignments WHERE user_id = ?) " 
-        "ORDER BY assignment_id, position ASC, id ASC",
+        "SELECT s.id, s.assignment_id, s.title, s.done, s.position "
+        "FROM assignments a JOIN assignments_stages s ON s.assignment_id = a.id "
+        "WHERE a.user_id = ? "
+        "ORDER BY s.assignment_id, s.position ASC, s.id ASC",
         user_id
     )
 
@@ -852,26 +1436,82 @@ def assignments_page():
 
     for s in stage_rows:
         stages_by_assignment.setdefault(s["assignment_id"], []).append(s)
+
+    return assignments, stages_by_assignment
+
+
+# one tab of the page (view "active" or "done", cursor = a done page) with the tab counts.
+# The priorities move with the date, so each day has its own cache entries
+def _assignments_page_data(uid, view = "active", cursor = None):
+
+    def load():
+        counts = db.execute (
+            "SELECT COUNT(*) AS total, COALESCE(SUM(status = 'done'), 0) AS done FROM assignments WHERE user_id = ?", uid
+        )[0]
+
+        if view == "done":
+            rows, next_cursor = _load_done_assignments(uid, cursor)
+        else:
+            rows, next_cursor = _load_assignments(uid), None
+
+        return {
+            "assignments": rows,
+            "next_cursor": next_cursor,
+            "active_count": counts["total"] - counts["done"],
+            "done_count": counts["done"],
+        }
+
+    return page_cache.get_or_load(uid, "assignments", load, variant=f"{date.today().isoformat()}:{view}:{cursor or ''}")
+
+
+# ----- main page ------
+# only the cards' headers; the stages come from assignment_stages when a card is opened
+@app.route("/assignments", methods=["GET"])
+@conditional_page("assignments", extra=lambda: date.today().isoformat())
+def assignments_page():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    
+    view = "done" if request.args.get("view") == "done" else "active"
+    cursor = request.args.get("cursor", type=int) if view == "done" else None
+    data = _assignments_page_data(session["user_id"], view, cursor)
+
+    return render_template("assignments.html", show_nav=True, view=view, cursor=cursor, today=date.today().isoformat(), **data)
+
+# ----- stages of one card (HTML fragment) ------
+@app.route("/assignments/<int:assignment_id>/stages", methods=["GET"])
+@conditional_page("assignments")
+def assignment_stages(assignment_id):
+    if "user_id" not in session:
+        abort(401)
     
+    row = db.execute (
+        "SELECT user_id FROM assignments WHERE id = ?", assignment_id
+    )
+
+    if not row or row[0]["user_id"] != session["user_id"]:
+        abort(403)
     
-    return render_template("assignments.html", show_nav=True, assignments=assignments, stages_by_assignment=stages_by_assignment, today=date.today().isoformat())
+    stages = page_cache.get_or_load(session["user_id"], "assignments", lambda: _load_stages(assignment_id), variant=f"stages:{assignment_id}")
+
+    return render_template("assignment_stages.html", assignment_id=assignment_id, stages=stages)
 
 # ------ Add assignment ------
 @app.route("/assignments/add", methods=["POST"])
+@db.transactional
 def assignments_add():
     if "user_id" not in session:
         return redirect(url_for("login"))
     
-    title = (request.form.get("title") or "").strip()
-    due_date = request.form.get("due_date") or None
-    notes = (request.form.get("notes") or "").strip()
-    status = (request.form.get("status") or "pending").strip()
-
-    priority = auto_priority(due_date)
+    try:
+        title, due_date, notes = astuple(schemas.load(schemas.AssignmentIn, request.form))
+    except ValueError as e:
+        flash(str(e), "warning")
+        return redirect(url_for("assignments_page"))
 
     new_id = db.execute(
-        "INSERT INTO assignments (user_id, title, due_date, priority, notes, status) VALUES (?, ?, ?, ?, ?, ?)",
-        session["user_id"], title, due_date, priority, notes, status
+        "INSERT INTO assignments (user_id, title, due_date, notes) VALUES (?, ?, ?, ?)",
+        session["user_id"], title, due_date, notes
     )
 
     flash("Assignment created", "success")
@@ -879,33 +1519,29 @@ def assignments_add():
 
 # ------ Update assignment ---------
 @app.route("/assignments/<int:assignment_id>/update", methods=["POST"])
+@db.transactional
 def assignments_update(assignment_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
     
     row = db.execute (
-        "SELECT user_id FROM assignments WHERE id = ?", assignment_id
+        "SELECT user_id, title, due_date, notes FROM assignments WHERE id = ?", assignment_id
     )
 
     if not row or row[0]["user_id"] != session["user_id"]:
         abort(403)
     
-    title = (request.form.get("title") or "").strip()
-    due_date = request.form.get("due_date") or None
-    notes = (request.form.get("notes") or "").strip()
-    status = (request.form.get("status") or "pending").strip()
-
-    # For just saving the notes
-    if not title:
-        row2 = db.execute("SELECT title, due_date FROM assignments WHERE id = ?", assignment_id)
-        title = row2[0]["title"]
-        due_date = row2[0]["due_date"]
-    
-    priority = auto_priority(due_date)
+    # the notes form and the settings form each post only their own fields,
+    # whatever is not posted keeps its current value
+    try:
+        title, due_date, notes = astuple(schemas.load(schemas.AssignmentIn, {**row[0], **request.form.to_dict()}))
+    except ValueError as e:
+        flash(str(e), "warning")
+        return redirect(url_for("assignments_page"))
     
     db.execute (
-        "UPDATE assignments SET title = ?, due_date = ?, priority = ?, notes = ?, status = ? WHERE id = ?",
-        title, due_date, priority, notes, status, assignment_id
+        "UPDATE assignments SET title = ?, due_date = ?, notes = ? WHERE id = ?",
+        title, due_date, notes, assignment_id
     )
 
     flash("Assignment updated", "success")
@@ -913,6 +1549,7 @@ def assignments_update(assignment_id):
 
 # ------ Delete assignment -------
 @app.route("/assignments/<int:assignment_id>/delete", methods=["POST"])
+@db.transactional
 def assignments_delete(assignment_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -934,6 +1571,7 @@ def assignments_delete(assignment_id):
 
 # -------- Add stage ------------
 @app.route("/assignments/<int:assignment_id>/stage/add", methods=["POST"])
+@db.transactional
 def stage_add(assignment_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -945,26 +1583,55 @@ def stage_add(assignment_id):
     if not row or row[0]["user_id"] != session["user_id"]:
         abort(403)
     
-    title = (request.form.get("title") or "").strip()
-    if not title:
-        flash("Stage title cannot be empty", "warning")
+    try:
+        title, _ = astuple(schemas.load(schemas.StageIn, request.form))
+    except ValueError as e:
+        flash(str(e), "warning")
         return redirect(url_for("assignments_page"))
     
-    next_pos = db.execute (
+    _insert_stage(assignment_id, title)
+
+    flash("Stage added", "success")
+    return redirect(url_for("assignments_page"))
+
+
+# -------- Add many stages ------------
+# JSON list of {title}, appended after the existing stages in list order
+@app.route("/assignments/<int:assignment_id>/stages/bulk", methods=["POST"])
+@db.transactional
+def stage_bulk(assignment_id):
+    if "user_id" not in session:
+        abort(401)
+    
+    row = db.execute (
+        "SELECT user_id FROM assignments WHERE id = ?", assignment_id
+    )
+
+    if not row or row[0]["user_id"] != session["user_id"]:
+        abort(403)
+    
+    rows, errors = _parse_bulk(schemas.StageIn)
+
+    if errors:
+        return jsonify(errors=errors), 400
+    
+    # the write lock is held from the start of the transaction, so MAX cannot move under us
+    last_pos = db.execute (
         "SELECT COALESCE(MAX(position), 0) AS maxp FROM assignments_stages WHERE assignment_id = ?", assignment_id
-    )[0]["maxp"] + 1
+    )[0]["maxp"]
 
-    db.execute (
-        "INSERT INTO assignments_stages (assignment_id, title, done, position) VALUES (?, ?, ?, ?)",
-        assignment_id, title, 0, next_pos
+    ids = db.insert_many(
+        "assignments_stages",
+        ("assignment_id", "title", "done", "position"),
+        ((assignment_id, title, done, last_pos + STAGE_GAP * i) for i, (title, done) in enumerate(rows, start=1))
     )
 
-    flash("Stage added", "success")
-    return redirect(url_for("assignments_page"))
+    return jsonify(ids=ids), 201
 
 
 # --------- Toggle stage done ----------
 @app.route("/assignments/stage/<int:stage_id>/toggle", methods=["POST"])
+@db.transactional
 def stage_toggle(stage_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -989,6 +1656,7 @@ def stage_toggle(stage_id):
 
 # ------- Delete stage ---------
 @app.route("/assignments/stage/<int:stage_id>/delete", methods=["POST"])
+@db.transactional
 def stage_delete(stage_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
@@ -1008,12 +1676,1015 @@ def stage_delete(stage_id):
         "DELETE FROM assignments_stages WHERE id = ?", stage_id
     )
 
-    compute_assignment_status(row[0]["assignment_id"])
-
     flash("Stage deleted", "success")
     return redirect(url_for("assignments_page"))
     
 
+# ================ SEARCH ================
+
+# one FTS5 index over schedule items, applications, assignments and stages, kept current
+# by triggers (migrations/0007_search.sql). rowid = record id * 4 + kind
+SEARCH_KINDS = ("schedule", "application", "assignment", "stage")
+SEARCH_LIMIT = 20
+SEARCH_MAX_TERMS = 8
+
+# highlight markers; the text is HTML-escaped first, then these become <mark>
+MARK_START, MARK_END = "\x02", "\x03"
+
+SEARCH_SQL = (
+    "SELECT search_index.rowid % 4 AS kind, search_index.rowid / 4 AS id, "
+    "highlight(search_index, 1, ?, ?) AS title, highlight(search_index, 2, ?, ?) AS detail, "
+    "snippet(search_index, 3, ?, ?, '…', 12) AS snippet, st.assignment_id "
+    "FROM search_index "
+    "LEFT JOIN assignments_stages st ON search_index.rowid % 4 = 3 AND st.id = search_index.rowid / 4 "
+    "WHERE search_index MATCH ? "
+    "ORDER BY search_index.rank LIMIT ?"
+)
+
+# the user's words as an FTS5 query: every word must appear (as a word prefix) in the
+# title, detail or body, and the row must be the user's. Quoting each word keeps FTS5
+# syntax in the input from meaning anything. None when there is nothing to search for
+def _search_match(uid, text):
+    words = re.findall(r"\w+", text)[:SEARCH_MAX_TERMS]
+
+    if not words:
+        return None
+    
+    terms = " ".join(f'"{w}"*' for w in words)
+    return f'owner : "u{uid}" AND {{title detail body}} : ({terms})'
+
+def _marked(text):
+    return str(escape(text or "")).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+def _search_url(kind, row):
+    if kind == "schedule":
+        return url_for("schedule_page")
+    
+    if kind == "application":
+        company = row["title"].replace(MARK_START, "").replace(MARK_END, "")
+        return url_for("applications_page", company=company)
+    
+    return url_for("assignments_page", open=row["assignment_id"] or row["id"])
+
+# best matches first; title, detail and snippet are HTML with the matched words in <mark>
+def search(uid, text, limit = SEARCH_LIMIT):
+    match = _search_match(uid, text)
+
+    if match is None:
+        return []
+    
+    rows = db.execute(SEARCH_SQL, *(MARK_START, MARK_END) * 3, match, limit)
+    hits = []
+
+    for row in rows:
+        kind = SEARCH_KINDS[row["kind"]]
+
+        hits.append(schemas.SearchHit(
+            kind = kind,
+            id = row["id"],
+            title = _marked(row["title"]),
+            detail = _marked(row["detail"]),
+            snippet = _marked(row["snippet"]),
+            url = _search_url(kind, row),
+        ))
+    
+    return hits
+
+@app.route("/search", methods=["GET"])
+def search_page():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    
+    q = request.args.get("q", "").strip()
+
+    return render_template("search.html", show_nav=True, q=q, hits=search(session["user_id"], q))
+
+
+# ================ CALENDAR FEED ================
+
+# the schedule, assignment due dates and application closing dates as one .ics (see ics.py):
+# /calendar.ics downloads it, /calendar/<token>.ics is the subscription URL calendar apps
+# poll without a session. Events are written one row at a time from the cursor while the
+# response is sent. ETag / Last-Modified come from the user's data versions, so a poll with
+# nothing changed is one query and a 304
+
+CALENDAR_FEED_SQL = (
+    "SELECT 'slot' AS kind, id, title, notes, weekday, start_time, end_time, NULL AS day, NULL AS status, "
+    "created_at, updated_at FROM schedule_items WHERE user_id = ?1 "
+    "UNION ALL "
+    "SELECT 'due', id, title, notes, NULL, NULL, NULL, due_date, status, created_at, updated_at "
+    "FROM assignments WHERE user_id = ?1 AND due_date IS NOT NULL "
+    "UNION ALL "
+    "SELECT 'close', id, company || ' - ' || programme, notes, NULL, NULL, NULL, close_date, status, "
+    "created_at, updated_at FROM applications "
+    "WHERE user_id = ?1 AND close_date IS NOT NULL AND status NOT IN ('Rejected', 'Not Interested')"
+)
+
+# (etag, last_modified) of the user's feed, from the data versions the triggers keep
+# (migrations/0015_user_data_version.sql): one primary-key lookup. changed_at also moves
+# for grade edits, which only costs those clients a full download.
+# changed_at (like HTTP dates) has one-second resolution: a change in the current second
+# could be followed by another in the same second that If-Modified-Since would not see,
+# so until that second is over there is no Last-Modified (and clients go by the ETag)
+def _calendar_version(uid):
+    version = _data_version(uid)
+    etag = hashlib.sha1(f"{uid}:{version['schedule']}:{version['applications']}:{version['assignments']}".encode()).hexdigest()
+    last_modified = datetime.fromisoformat(version["changed_at"]).replace(tzinfo=timezone.utc)
+
+    if last_modified >= datetime.now(timezone.utc).replace(microsecond=0):
+        last_modified = None
+
+    return etag, last_modified
+
+def _calendar_event(row):
+    uid = f"{row['kind']}-{row['id']}@uniflow"
+
+    try:
+        if row["kind"] == "slot":
+            return ics.weekly_event(uid, row["updated_at"], row["created_at"], int(row["weekday"]),
+                                    row["start_time"], row["end_time"], row["title"], row["notes"])
+
+        if row["kind"] == "due":
+            summary = ("Done: " if row["status"] == "done" else "Due: ") + row["title"]
+        else:
+            summary = f"Closes: {row['title']}"
+
+        return ics.day_event(uid, row["updated_at"], row["day"], summary, row["notes"])
+
+    # a date or time the forms would not accept (rows from before validation): left out
+    except ValueError:
+        return ""
+
+def _calendar_events(uid):
+    yield ics.lines(ics.HEADER)
+
+    for row in db.iterate(CALENDAR_FEED_SQL, uid):
+        yield _calendar_event(row)
+
+    yield ics.lines(ics.FOOTER)
+
+def _calendar_response(uid, filename = None):
+    etag, last_modified = _calendar_version(uid)
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(stream_with_context(_calendar_events(uid)), mimetype="text/calendar")
+
+        if filename:
+            response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    response.set_etag(etag)
+
+    # (werkzeug would take None for "now")
+    if last_modified:
+        response.last_modified = last_modified
+
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def _calendar_token(uid):
+    return db.execute("SELECT calendar_token FROM users WHERE id = ?", uid)[0]["calendar_token"]
+
+@app.route("/calendar.ics", methods=["GET"])
+def calendar_download():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+
+    return _calendar_response(session["user_id"], filename="uniflow.ics")
+
+@app.route("/calendar/<token>.ics", methods=["GET"])
+def calendar_feed(token):
+    rows = db.execute("SELECT id FROM users WHERE calendar_token = ?", token)
+
+    if not rows:
+        abort(404)
+
+    return _calendar_response(rows[0]["id"])
+
+# a new subscription link (the old one stops working), or action=off to remove it
+@app.route("/calendar/token", methods=["POST"])
+@db.transactional
+def calendar_token():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+
+    if request.form.get("action") == "off":
+        db.execute("UPDATE users SET calendar_token = NULL WHERE id = ?", session["user_id"])
+        flash("Calendar link turned off", "success")
+    else:
+        db.execute("UPDATE users SET calendar_token = ? WHERE id = ?", secrets.token_urlsafe(24), session["user_id"])
+        flash("New calendar link created", "success")
+
+    return redirect(url_for("schedule_page"))
+
+
+# ================ EXPORT / RESTORE ================
+
+# Everything a user owns as JSON Lines (schemas.ExportRecord): /account/export streams it
+# from one read snapshot, EXPORT_BATCH rows per msgspec encode, and /account/restore loads
+# such a file back in one transaction, replacing the user's data. `flask db backup` is the
+# whole-database copy for ops
+
+EXPORT_BATCH = 500
+
+# (record kind, query) in file order: parents before their children
+EXPORT_QUERIES = (
+    (schemas.ScheduleRecord,
+     "SELECT id, weekday, start_time, end_time, title, COALESCE(notes, '') AS notes "
+     "FROM schedule_items WHERE user_id = ? ORDER BY id"),
+    (schemas.ApplicationRecord,
+     "SELECT id, status, company, programme, open_date, close_date, cv, cover, written, COALESCE(notes, '') AS notes "
+     "FROM applications WHERE user_id = ? ORDER BY id"),
+    (schemas.ModuleRecord,
+     "SELECT id, name, term, credits FROM modules WHERE user_id = ? ORDER BY id"),
+    (schemas.AssessmentRecord,
+     "SELECT s.id, s.module_id, s.title, s.weight_pct, s.score_pct "
+     "FROM assessments s JOIN modules m ON m.id = s.module_id WHERE m.user_id = ? ORDER BY s.module_id, s.id"),
+    (schemas.AssignmentRecord,
+     "SELECT id, title, due_date, COALESCE(notes, '') AS notes FROM assignments WHERE user_id = ? ORDER BY id"),
+    (schemas.StageRecord,
+     "SELECT st.id, st.assignment_id, st.title, st.done FROM assignments_stages st "
+     "JOIN assignments a ON a.id = st.assignment_id WHERE a.user_id = ? ORDER BY st.assignment_id, st.position"),
+)
+
+# record kind -> (table, parent record kind, parent column); a record's columns are its
+# fields minus id and the parent id
+RESTORE_TABLES = {
+    schemas.ScheduleRecord: ("schedule_items", None, None),
+    schemas.ApplicationRecord: ("applications", None, None),
+    schemas.ModuleRecord: ("modules", None, None),
+    schemas.AssessmentRecord: ("assessments", schemas.ModuleRecord, "module_id"),
+    schemas.AssignmentRecord: ("assignments", None, None),
+    schemas.StageRecord: ("assignments_stages", schemas.AssignmentRecord, "assignment_id"),
+}
+
+# the user's rows; ON DELETE CASCADE takes the assessments and stages with them, and the
+# triggers keep the summary, counts and search index in step
+RESTORE_CLEAR_SQL = (
+    "DELETE FROM schedule_items WHERE user_id = ?",
+    "DELETE FROM applications WHERE user_id = ?",
+    "DELETE FROM modules WHERE user_id = ?",
+    "DELETE FROM assignments WHERE user_id = ?",
+)
+
+export_encoder = msgspec.json.Encoder()
+export_decoder = msgspec.json.Decoder(schemas.ExportRecord)
+
+def _export_record(kind, row):
+    if kind is schemas.StageRecord:
+        return schemas.from_row(kind, row, done=bool(row["done"]))
+
+    return schemas.from_row(kind, row)
+
+def _export_lines(uid):
+    with db.snapshot():
+        header = schemas.ExportHeader(exported_at=datetime.now(timezone.utc).isoformat(timespec="seconds"))
+        yield export_encoder.encode(header) + b"\n"
+
+        for kind, query in EXPORT_QUERIES:
+            rows = db.iterate(query, uid)
+
+            while batch := list(islice(rows, EXPORT_BATCH)):
+                yield export_encoder.encode_lines([_export_record(kind, r) for r in batch])
+
+# the columns a record is inserted with: its parent (or user_id), then its own fields
+def _restore_columns(kind):
+    table, parent, parent_column = RESTORE_TABLES[kind]
+    columns = [parent_column or "user_id", *(f for f in kind.__struct_fields__ if f not in ("id", parent_column))]
+
+    # stages keep the file's order, STAGE_GAP apart
+    if kind is schemas.StageRecord:
+        columns.append("position")
+
+    return columns
+
+# replaces the user's data with the file's (an iterable of lines, as bytes) in one
+# transaction. Records are buffered per kind and written RESTORE_BATCH at a time with
+# insert_many; the new ids are mapped from the file's, so children find their parent.
+# All or nothing: ValueError naming the line when anything is wrong. Returns the count per table
+RESTORE_BATCH = 500
+
+def _restore_account(uid, lines):
+    ids = {kind: {} for kind in RESTORE_TABLES}
+    seen = {kind: set() for kind in RESTORE_TABLES}
+    counts = {kind: 0 for kind in RESTORE_TABLES}
+    stage_counts = {}
+    week = WeekIntervals()
+    pending = []
+    header = None
+    kind = None
+
+    def flush():
+        if pending:
+            new_ids = db.insert_many(RESTORE_TABLES[kind][0], _restore_columns(kind), [values for _, values in pending])
+            ids[kind].update(zip((old for old, _ in pending), new_ids))
+            counts[kind] += len(new_ids)
+            pending.clear()
+
+    def row_values(record):
+        table, parent, parent_column = RESTORE_TABLES[type(record)]
+        owner = uid
+
+        if parent is not None:
+            owner = ids[parent].get(getattr(record, parent_column))
+
+            if owner is None:
+                raise ValueError(f"{parent_column} {getattr(record, parent_column)} is not earlier in the file.")
+
+        values = [owner, *(getattr(record, f) for f in type(record).__struct_fields__ if f not in ("id", parent_column))]
+
+        if isinstance(record, schemas.ScheduleRecord):
+            start, end = to_minutes(record.start_time), to_minutes(record.end_time)
+
+            if week.overlapping(record.weekday, start, end) is not None:
+                raise ValueError("The slot overlaps an earlier one.")
+
+            week.add(record.weekday, start, end, record.id)
+
+        if isinstance(record, schemas.StageRecord):
+            stage_counts[owner] = stage_counts.get(owner, 0) + 1
+            values.append(stage_counts[owner] * STAGE_GAP)
+
+        return values
+
+    with db.transaction():
+        for query in RESTORE_CLEAR_SQL:
+            db.execute(query, uid)
+
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                record = export_decoder.decode(line)
+
+                if header is None:
+                    if not isinstance(record, schemas.ExportHeader) or record.version != schemas.EXPORT_FORMAT_VERSION:
+                        raise ValueError("This is not a UniFlow export, or it comes from a newer version.")
+
+                    header = record
+                    continue
+
+                if isinstance(record, schemas.ExportHeader):
+                    raise ValueError("A second export header.")
+
+                # a kind's records are consecutive; another kind (or a full buffer) writes them out
+                if type(record) is not kind or len(pending) >= RESTORE_BATCH:
+                    flush()
+                    kind = type(record)
+
+                if record.id in seen[kind]:
+                    raise ValueError(f"{kind.__struct_config__.tag} {record.id} appears twice.")
+
+                seen[kind].add(record.id)
+
+                pending.append((record.id, row_values(record)))
+
+            except (msgspec.DecodeError, msgspec.ValidationError, ValueError) as e:
+                raise ValueError(f"Line {number}: {e}") from None
+
+        if header is None:
+            raise ValueError("The file is empty.")
+
+        flush()
+
+    return {RESTORE_TABLES[k][0]: n for k, n in counts.items()}
+
+@app.route("/account/export", methods=["GET"])
+def account_export():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+
+    filename = f"uniflow-{date.today().isoformat()}.jsonl"
+    response = app.response_class(stream_with_context(_export_lines(session["user_id"])), mimetype="application/x-ndjson")
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.cache_control.no_store = True
+    return response
+
+@app.route("/account/restore", methods=["POST"])
+def account_restore():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+
+    upload = request.files.get("file")
+
+    if upload is None or not upload.filename:
+        flash("Choose an export file to restore.", "warning")
+        return redirect(url_for("home"))
+
+    try:
+        counts = _restore_account(session["user_id"], upload.stream)
+    except ValueError as e:
+        flash(f"Nothing was restored. {e}", "warning")
+        return redirect(url_for("home"))
+
+    flash(f"Restored {sum(counts.values())} records.", "success")
+    return redirect(url_for("home"))
+
+
+# ================ JSON API (/api/v1) ================
+
+# The pages' data as JSON, one row at a time: list, get, create (POST), replace (PUT),
+# change some fields (PATCH) and DELETE. Bodies are validated and responses encoded with the
+# structs in schemas.py. Lists come from the same page cache as the pages (any write moves
+# its generation, see _cache_generation). Rows of other users answer 404
+
+API = "/api/v1"
+
+# errors under /api as {"error": "..."} instead of an HTML page. Redirects are not errors:
+# RequestRedirect (e.g. // merged into /) and any other 3xx keep their status and Location
+@app.errorhandler(HTTPException)
+def api_errors(e):
+    if not request.path.startswith(API + "/") or isinstance(e, RoutingException) or (e.code or 500) < 400:
+        return e
+    
+    return _api_response({"error": e.description}, e.code)
+
+def _api_response(value, status = 200):
+    return app.response_class(msgspec.json.encode(value), status=status, mimetype="application/json")
+
+def _api_user():
+    if "user_id" not in session:
+        abort(401)
+    
+    return session["user_id"]
+
+# the request body as kind; a PATCH starts from the current row, so only the sent fields change
+def _api_body(kind, current = None):
+    try:
+        data = msgspec.json.decode(request.get_data())
+    except msgspec.DecodeError:
+        abort(400, "Malformed JSON.")
+    
+    if not isinstance(data, dict):
+        abort(400, "Expected a JSON object.")
+    
+    if request.method == "PATCH":
+        data = {**current, **data}
+    
+    try:
+        return schemas.load(kind, data)
+    except ValueError as e:
+        abort(400, str(e))
+
+# the row if it exists and is the user's, 404 otherwise
+def _api_owned(query, row_id, uid):
+    rows = db.execute(query, row_id)
+
+    if not rows or rows[0]["user_id"] != uid:
+        abort(404)
+    
+    return rows[0]
+
+# struct fields are column names
+def _api_insert(table, item, **columns):
+    values = {**columns, **asdict(item)}
+
+    return db.execute(
+        f"INSERT INTO {table} ({', '.join(values)}) VALUES ({', '.join('?' * len(values))})",
+        *values.values()
+    )
+
+def _api_update(table, item, row_id, **columns):
+    values = {**asdict(item), **columns}
+
+    db.execute(
+        f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in values)} WHERE id = ?",
+        *values.values(), row_id
+    )
+
+# -------- schedule ----------
+
+SCHEDULE_ROW_SQL = "SELECT id, user_id, weekday, start_time, end_time, title, notes FROM schedule_items WHERE id = ?"
+
+@app.route(f"{API}/schedule", methods=["GET"])
+def api_schedule_list():
+    uid = _api_user()
+    items_by_day = _schedule_data(uid)
+
+    return _api_response([schemas.from_row(schemas.ScheduleItem, r) for day in range(7) for r in items_by_day[day]])
+
+def _api_schedule_conflict(uid, item, item_id = None):
+    conflict = _schedule_conflict(uid, item.weekday, item.start_time, item.end_time, item_id)
+
+    if conflict:
+        abort(409, _conflict_message(conflict))
+
+# {"now": slot or null, "next": slot or null}
+@app.route(f"{API}/schedule/now", methods=["GET"])
+def api_schedule_now():
+    current, upcoming = _schedule_now_next(_api_user())
+
+    return _api_response({
+        "now": current and schemas.from_row(schemas.ScheduleItem, current),
+        "next": upcoming and schemas.from_row(schemas.ScheduleItem, upcoming),
+    })
+
+# ?minutes=60&from=08:00&to=20:00: free stretches of at least that long, Monday first
+@app.route(f"{API}/schedule/free", methods=["GET"])
+def api_schedule_free():
+    uid = _api_user()
+
+    try:
+        query = schemas.load(schemas.FreeQuery, request.args.to_dict())
+    except ValueError as e:
+        abort(400, str(e))
+    
+    gaps = _schedule_week(uid).free(query.minutes, to_minutes(query.start), to_minutes(query.end))
+
+    return _api_response([
+        schemas.FreeSlot(weekday=day, start_time=to_hhmm(start), end_time=to_hhmm(end)) for day, start, end in gaps
+    ])
+
+@app.route(f"{API}/schedule", methods=["POST"])
+@db.transactional
+def api_schedule_create():
+    uid = _api_user()
+    item = _api_body(schemas.ScheduleItemIn)
+    _api_schedule_conflict(uid, item)
+    new_id = _api_insert("schedule_items", item, user_id=uid)
+
+    return _api_response(schemas.from_row(schemas.ScheduleItem, asdict(item), id=new_id), 201)
+
+@app.route(f"{API}/schedule/<int:item_id>", methods=["GET"])
+def api_schedule_get(item_id):
+    row = _api_owned(SCHEDULE_ROW_SQL, item_id, _api_user())
+    return _api_response(schemas.from_row(schemas.ScheduleItem, row))
+
+@app.route(f"{API}/schedule/<int:item_id>", methods=["PUT", "PATCH"])
+@db.transactional
+def api_schedule_update(item_id):
+    row = _api_owned(SCHEDULE_ROW_SQL, item_id, _api_user())
+    item = _api_body(schemas.ScheduleItemIn, row)
+    _api_schedule_conflict(row["user_id"], item, item_id)
+    _api_update("schedule_items", item, item_id)
+
+    return _api_response(schemas.from_row(schemas.ScheduleItem, asdict(item), id=item_id))
+
+@app.route(f"{API}/schedule/<int:item_id>", methods=["DELETE"])
+@db.transactional
+def api_schedule_delete(item_id):
+    _api_owned(SCHEDULE_ROW_SQL, item_id, _api_user())
+    db.execute("DELETE FROM schedule_items WHERE id = ?", item_id)
+
+    return "", 204
+
+# -------- applications ----------
+
+APPLICATION_ROW_SQL = f"SELECT id, user_id, {', '.join(APPLICATION_COLUMNS)} FROM applications WHERE id = ?"
+
+@app.route(f"{API}/applications", methods=["GET"])
+def api_applications_list():
+    uid = _api_user()
+    data = _applications_page_data(uid, _application_filters(request.args))
+    response = _api_response([schemas.from_row(schemas.Application, r) for r in data["rows"]])
+
+    # same query options and cursors as the page
+    if data["next_cursor"]:
+        response.headers["X-Next-Cursor"] = data["next_cursor"]
+    
+    response.headers["X-Total-Count"] = f"{data['count']}+" if data["count_capped"] else str(data["count"])
+    return response
+
+@app.route(f"{API}/applications", methods=["POST"])
+@db.transactional
+def api_applications_create():
+    uid = _api_user()
+    item = _api_body(schemas.ApplicationIn)
+    new_id = _api_insert("applications", item, user_id=uid)
+
+    return _api_response(schemas.from_row(schemas.Application, asdict(item), id=new_id), 201)
+
+# a CSV file (multipart "file" field, or a text/csv body); answers with the ImportReport
+@app.route(f"{API}/applications/import", methods=["POST"])
+def api_applications_import():
+    uid = _api_user()
+
+    try:
+        report = _import_applications(uid, _import_source())
+    except ValueError as e:
+        abort(400, str(e))
+
+    return _api_response(report)
+
+@app.route(f"{API}/applications/<int:app_id>", methods=["GET"])
+def api_applications_get(app_id):
+    row = _api_owned(APPLICATION_ROW_SQL, app_id, _api_user())
+    return _api_response(schemas.from_row(schemas.Application, row))
+
+@app.route(f"{API}/applications/<int:app_id>", methods=["PUT", "PATCH"])
+@db.transactional
+def api_applications_update(app_id):
+    row = _api_owned(APPLICATION_ROW_SQL, app_id, _api_user())
+    item = _api_body(schemas.ApplicationIn, row)
+    _api_update("applications", item, app_id)
+
+    return _api_response(schemas.from_row(schemas.Application, asdict(item), id=app_id))
+
+@app.route(f"{API}/applications/<int:app_id>", methods=["DELETE"])
+@db.transactional
+def api_applications_delete(app_id):
+    _api_owned(APPLICATION_ROW_SQL, app_id, _api_user())
+    db.execute("DELETE FROM applications WHERE id = ?", app_id)
+
+    return "", 204
+
+# -------- modules and assessments ----------
+
+MODULE_ROW_SQL = "SELECT id, user_id, name, term, credits, total_weight, scored_weight, weighted_sum FROM modules WHERE id = ?"
+
+ASSESSMENT_ROW_SQL = (
+    "SELECT a.id, a.module_id, a.title, a.weight_pct, a.score_pct, m.user_id "
+    "FROM assessments a JOIN modules m ON m.id = a.module_id WHERE a.id = ?"
+)
+
+def _api_module(m, assessments):
+    total_w, cur_grade, w_with_score, cur_points = _calc_module_stats(m)
+
+    return schemas.from_row(
+        schemas.Module, m,
+        total_weight=total_w, current_grade=cur_grade, w_with_score=w_with_score, current_points=cur_points,
+        assessments=[schemas.from_row(schemas.Assessment, a) for a in assessments]
+    )
+
+# re-read after a write: the aggregates are maintained by triggers
+def _api_module_by_id(module_id):
+    m = db.execute(MODULE_ROW_SQL, module_id)[0]
+    assessments = db.execute(
+        "SELECT id, module_id, title, weight_pct, score_pct FROM assessments WHERE module_id = ? ORDER BY id",
+        module_id
+    )
+
+    return _api_module(m, assessments)
+
+@app.route(f"{API}/modules", methods=["GET"])
+def api_modules_list():
+    uid = _api_user()
+    context = page_cache.get_or_load(uid, "grades", lambda: _load_grades(uid))
+    by_module = context["assessments_by_module"]
+
+    return _api_response([
+        _api_module(m, by_module.get(m["id"], []))
+        for mods in context["modules_by_term"].values()
+        for m in mods
+    ])
+
+@app.route(f"{API}/modules", methods=["POST"])
+@db.transactional
+def api_modules_create():
+    uid = _api_user()
+    new_id = _api_insert("modules", _api_body(schemas.ModuleIn), user_id=uid)
+
+    return _api_response(_api_module_by_id(new_id), 201)
+
+@app.route(f"{API}/modules/<int:module_id>", methods=["GET"])
+def api_modules_get(module_id):
+    _api_owned(MODULE_ROW_SQL, module_id, _api_user())
+    return _api_response(_api_module_by_id(module_id))
+
+@app.route(f"{API}/modules/<int:module_id>", methods=["PUT", "PATCH"])
+@db.transactional
+def api_modules_update(module_id):
+    row = _api_owned(MODULE_ROW_SQL, module_id, _api_user())
+    _api_update("modules", _api_body(schemas.ModuleIn, row), module_id)
+
+    return _api_response(_api_module_by_id(module_id))
+
+@app.route(f"{API}/modules/<int:module_id>", methods=["DELETE"])
+@db.transactional
+def api_modules_delete(module_id):
+    _api_owned(MODULE_ROW_SQL, module_id, _api_user())
+    db.execute("DELETE FROM modules WHERE id = ?", module_id)
+
+    return "", 204
+
+@app.route(f"{API}/modules/<int:module_id>/assessments", methods=["POST"])
+@db.transactional
+def api_assessments_create(module_id):
+    _api_owned(MODULE_ROW_SQL, module_id, _api_user())
+    item = _api_body(schemas.AssessmentIn)
+    new_id = _api_insert("assessments", item, module_id=module_id)
+
+    return _api_response(schemas.from_row(schemas.Assessment, asdict(item), id=new_id, module_id=module_id), 201)
+
+@app.route(f"{API}/assessments/<int:assessment_id>", methods=["GET"])
+def api_assessments_get(assessment_id):
+    row = _api_owned(ASSESSMENT_ROW_SQL, assessment_id, _api_user())
+    return _api_response(schemas.from_row(schemas.Assessment, row))
+
+@app.route(f"{API}/assessments/<int:assessment_id>", methods=["PUT", "PATCH"])
+@db.transactional
+def api_assessments_update(assessment_id):
+    row = _api_owned(ASSESSMENT_ROW_SQL, assessment_id, _api_user())
+    item = _api_body(schemas.AssessmentIn, row)
+    _api_update("assessments", item, assessment_id)
+
+    return _api_response(schemas.from_row(schemas.Assessment, asdict(item), id=assessment_id, module_id=row["module_id"]))
+
+@app.route(f"{API}/assessments/<int:assessment_id>", methods=["DELETE"])
+@db.transactional
+def api_assessments_delete(assessment_id):
+    _api_owned(ASSESSMENT_ROW_SQL, assessment_id, _api_user())
+    db.execute("DELETE FROM assessments WHERE id = ?", assessment_id)
+
+    return "", 204
+
+# -------- assignments and stages ----------
+
+ASSIGNMENT_ROW_SQL = (
+    f"SELECT id, user_id, title, due_date, notes, status, done_count, total_count, {ASSIGNMENT_PRIORITY_SQL} AS priority "
+    "FROM assignments WHERE id = ?"
+)
+
+STAGE_ROW_SQL = (
+    "SELECT s.id, s.assignment_id, s.title, s.done, s.position, a.user_id "
+    "FROM assignments_stages s JOIN assignments a ON a.id = s.assignment_id WHERE s.id = ?"
+)
+
+def _api_stage(s):
+    return schemas.from_row(schemas.Stage, s, done=bool(s["done"]))
+
+def _api_assignment(a, stages):
+    return schemas.from_row(schemas.Assignment, a, stages=[_api_stage(s) for s in stages])
+
+def _api_assignment_by_id(assignment_id):
+    a = db.execute(ASSIGNMENT_ROW_SQL, assignment_id)[0]
+    return _api_assignment(a, _load_stages(assignment_id))
+
+@app.route(f"{API}/assignments", methods=["GET"])
+def api_assignments_list():
+    uid = _api_user()
+    assignments, stages_by_assignment = page_cache.get_or_load(
+        uid, "assignments", lambda: _load_assignments_with_stages(uid), variant=f"{date.today().isoformat()}:api"
+    )
+
+    return _api_response([_api_assignment(a, stages_by_assignment.get(a["id"], [])) for a in assignments])
+
+@app.route(f"{API}/assignments", methods=["POST"])
+@db.transactional
+def api_assignments_create():
+    uid = _api_user()
+    item = _api_body(schemas.AssignmentIn)
+    new_id = _api_insert("assignments", item, user_id=uid)
+
+    return _api_response(_api_assignment_by_id(new_id), 201)
+
+@app.route(f"{API}/assignments/<int:assignment_id>", methods=["GET"])
+def api_assignments_get(assignment_id):
+    _api_owned(ASSIGNMENT_ROW_SQL, assignment_id, _api_user())
+    return _api_response(_api_assignment_by_id(assignment_id))
+
+@app.route(f"{API}/assignments/<int:assignment_id>", methods=["PUT", "PATCH"])
+@db.transactional
+def api_assignments_update(assignment_id):
+    row = _api_owned(ASSIGNMENT_ROW_SQL, assignment_id, _api_user())
+    item = _api_body(schemas.AssignmentIn, row)
+    _api_update("assignments", item, assignment_id)
+
+    return _api_response(_api_assignment_by_id(assignment_id))
+
+@app.route(f"{API}/assignments/<int:assignment_id>", methods=["DELETE"])
+@db.transactional
+def api_assignments_delete(assignment_id):
+    _api_owned(ASSIGNMENT_ROW_SQL, assignment_id, _api_user())
+    db.execute("DELETE FROM assignments WHERE id = ?", assignment_id)
+
+    return "", 204
+
+@app.route(f"{API}/assignments/<int:assignment_id>/stages", methods=["POST"])
+@db.transactional
+def api_stages_create(assignment_id):
+    _api_owned(ASSIGNMENT_ROW_SQL, assignment_id, _api_user())
+    item = _api_body(schemas.StageIn)
+    new_id = _insert_stage(assignment_id, item.title, item.done)
+
+    return _api_response(_api_stage(db.execute(STAGE_ROW_SQL, new_id)[0]), 201)
+
+# the whole checklist in one go: {"stages": [{"id": 3, "done": true}, {"id": 1}, ...], "delete": [2]}.
+# stages lists every stage that remains, in the new order (done left out = unchanged);
+# delete lists the ones to remove. Reorder, ticks and deletes commit together. If the
+# lists do not match the stages the assignment has now (another tab added or removed
+# one), nothing changes and the answer is 409
+@app.route(f"{API}/assignments/<int:assignment_id>/stages", methods=["PUT"])
+@db.transactional
+def api_stages_batch(assignment_id):
+    _api_owned(ASSIGNMENT_ROW_SQL, assignment_id, _api_user())
+    batch = _api_body(schemas.StageBatch)
+
+    current = {s["id"]: s for s in _load_stages(assignment_id)}
+    order = [s.id for s in batch.stages]
+    deleted = set(batch.delete)
+
+    if len(set(order)) != len(order) or deleted & set(order):
+        abort(400, "Each stage can only be listed once.")
+    
+    if not deleted <= current.keys() or set(order) != current.keys() - deleted:
+        abort(409, "The checklist has changed, reload it and try again.")
+    
+    if deleted:
+        db.execute(f"DELETE FROM assignments_stages WHERE id IN ({', '.join('?' * len(deleted))})", *deleted)
+    
+    positions = _reorder_positions([current[i]["position"] for i in order])
+    moved = [(p, i) for i, p in zip(order, positions) if p != current[i]["position"]]
+
+    if moved:
+        db.executemany("UPDATE assignments_stages SET position = ? WHERE id = ?", moved)
+    
+    ticked = [(int(s.done), s.id) for s in batch.stages if s.done is not None and s.done != bool(current[s.id]["done"])]
+
+    if ticked:
+        db.executemany("UPDATE assignments_stages SET done = ? WHERE id = ?", ticked)
+    
+    return _api_response(_api_assignment_by_id(assignment_id))
+
+@app.route(f"{API}/stages/<int:stage_id>", methods=["GET"])
+def api_stages_get(stage_id):
+    row = _api_owned(STAGE_ROW_SQL, stage_id, _api_user())
+    return _api_response(_api_stage(row))
+
+@app.route(f"{API}/stages/<int:stage_id>", methods=["PUT", "PATCH"])
+@db.transactional
+def api_stages_update(stage_id):
+    row = _api_owned(STAGE_ROW_SQL, stage_id, _api_user())
+    _api_update("assignments_stages", _api_body(schemas.StageIn, row), stage_id)
+
+    return _api_response(_api_stage(db.execute(STAGE_ROW_SQL, stage_id)[0]))
+
+@app.route(f"{API}/stages/<int:stage_id>", methods=["DELETE"])
+@db.transactional
+def api_stages_delete(stage_id):
+    _api_owned(STAGE_ROW_SQL, stage_id, _api_user())
+    db.execute("DELETE FROM assignments_stages WHERE id = ?", stage_id)
+
+    return "", 204
+
+# -------- search ----------
+
+# ?q=words&limit=N (at most 50)
+@app.route(f"{API}/search", methods=["GET"])
+def api_search():
+    uid = _api_user()
+    limit = min(max(request.args.get("limit", SEARCH_LIMIT, type=int), 1), 50)
+
+    return _api_response(search(uid, request.args.get("q", ""), limit))
+
+
+# ================ MAINTENANCE ================
+
+# flask db upgrade | status | maintain
+db_cli = AppGroup("db", help="Database schema and maintenance.")
+
+# run once per deploy, before starting the workers; the app itself never runs DDL
+@db_cli.command("upgrade")
+def db_upgrade():
+    applied = migrations.upgrade(db)
+
+    for version, name in applied:
+        print(f"Applied {version:04d}_{name}")
+
+    print(f"Database at version {migrations.current_version(db)}.")
+
+@db_cli.command("status")
+def db_status():
+    print(f"Database at version {migrations.current_version(db)}.")
+
+    for version, name, _ in migrations.pending(db):
+        print(f"Pending {version:04d}_{name}")
+
+# run from cron / a systemd timer: WAL checkpoint + PRAGMA optimize
+@db_cli.command("maintain")
+def db_maintain():
+    db.maintain()
+    print("Database maintenance done.")
+
+# online snapshot of the whole database, safe while the app is serving (see SQL.backup)
+@db_cli.command("backup")
+@click.argument("target", required=False, type=click.Path(dir_okay=False))
+def db_backup(target):
+    # default: backups/ next to the database file
+    if target is None:
+        folder = os.path.join(os.path.dirname(db.path), "backups")
+        os.makedirs(folder, exist_ok=True)
+        target = os.path.join(folder, f"uniflow-{datetime.now().strftime('%Y%m%d-%H%M%S')}.db")
+
+    path = db.backup(target)
+    print(f"Backed up to {path} ({path.stat().st_size // 1024} KiB).")
+
+app.cli.add_command(db_cli)
+
+
+# module aggregates recomputed from the assessments themselves, rounded to 9 places like the
+# triggers round every write (migrations/0016), so a module in step matches exactly
+MODULE_AGG_SQL = {
+    "total_weight": "ROUND(COALESCE((SELECT SUM(weight_pct) FROM assessments WHERE module_id = modules.id), 0), 9)",
+    "scored_weight": "ROUND(COALESCE((SELECT SUM(weight_pct) FROM assessments WHERE module_id = modules.id AND score_pct IS NOT NULL), 0), 9)",
+    "weighted_sum": "ROUND(COALESCE((SELECT SUM(weight_pct * score_pct) FROM assessments WHERE module_id = modules.id), 0), 9)",
+}
+
+# flask grades-repair [--check]: find (and fix) modules whose running aggregates drifted
+@app.cli.command("grades-repair")
+@click.option("--check", is_flag=True, help="Only report, do not fix.")
+def grades_repair(check):
+    # exact: even a residue of 1e-15 is drift (it turned "no scores" into a grade of 0)
+    drift = " OR ".join(f"{col} IS NOT {expr}" for col, expr in MODULE_AGG_SQL.items())
+    bad = db.execute(f"SELECT id FROM modules WHERE {drift}")
+
+    print(f"{len(bad)} module(s) with drifted aggregates.")
+
+    if check:
+        if bad:
+            raise SystemExit(1)
+        return
+    
+    sets = ", ".join(f"{col} = {expr}" for col, expr in MODULE_AGG_SQL.items())
+
+    with db.transaction():
+        db.execute(f"UPDATE modules SET {sets}")
+
+    print("Module aggregates rebuilt.")
+
+
+# assignment progress recomputed from the stages themselves, and the status that follows from it
+ASSIGNMENT_COUNT_SQL = {
+    "total_count": "(SELECT COUNT(*) FROM assignments_stages WHERE assignment_id = assignments.id)",
+    "done_count": "(SELECT COUNT(*) FROM assignments_stages WHERE assignment_id = assignments.id AND done <> 0)",
+}
+
+ASSIGNMENT_STATUS_SQL = (
+    "CASE WHEN total_count > 0 AND done_count = total_count THEN 'done' "
+    "WHEN done_count > 0 THEN 'in_progress' ELSE 'pending' END"
+)
+
+# flask assignments-repair [--check]: find (and fix) assignments whose stage counts or status drifted
+@app.cli.command("assignments-repair")
+@click.option("--check", is_flag=True, help="Only report, do not fix.")
+def assignments_repair(check):
+    drift = " OR ".join(f"{col} <> {expr}" for col, expr in ASSIGNMENT_COUNT_SQL.items())
+    drift += f" OR status IS NOT ({ASSIGNMENT_STATUS_SQL})"
+    bad = db.execute(f"SELECT id FROM assignments WHERE {drift}")
+
+    print(f"{len(bad)} assignment(s) with drifted progress.")
+
+    if check:
+        if bad:
+            raise SystemExit(1)
+        return
+    
+    sets = ", ".join(f"{col} = {expr}" for col, expr in ASSIGNMENT_COUNT_SQL.items())
+
+    # the counts first: the status is worked out from the new ones
+    with db.transaction():
+        db.execute(f"UPDATE assignments SET {sets}")
+        db.execute(f"UPDATE assignments SET status = {ASSIGNMENT_STATUS_SQL} WHERE status IS NOT ({ASSIGNMENT_STATUS_SQL})")
+
+    print("Assignment progress rebuilt.")
+
+
+# flask assignments-priority [--check]: bring the stored priority snapshot up to date for
+# every user in one statement (run daily from cron; the pages never read the snapshot)
+@app.cli.command("assignments-priority")
+@click.option("--check", is_flag=True, help="Only report, do not fix.")
+def assignments_priority(check):
+    stale = f"priority IS NOT ({ASSIGNMENT_PRIORITY_SQL})"
+    n = db.execute(f"SELECT COUNT(*) AS n FROM assignments WHERE {stale}")[0]["n"]
+
+    print(f"{n} assignment(s) with an out-of-date priority.")
+
+    if check:
+        if n:
+            raise SystemExit(1)
+        return
+    
+    with db.transaction():
+        db.execute(f"UPDATE assignments SET priority = {ASSIGNMENT_PRIORITY_SQL} WHERE {stale}")
+
+    print("Assignment priorities refreshed.")
+
+# what search_index holds, straight from the tables (same rows as migrations/0007_search.sql)
+SEARCH_SOURCE_SQL = (
+    "SELECT id * 4, 'u' || user_id, title, '', COALESCE(notes, '') FROM schedule_items",
+    "SELECT id * 4 + 1, 'u' || user_id, company, programme, COALESCE(notes, '') FROM applications",
+    "SELECT id * 4 + 2, 'u' || user_id, title, '', COALESCE(notes, '') FROM assignments",
+    "SELECT s.id * 4 + 3, 'u' || a.user_id, s.title, a.title, '' "
+    "FROM assignments_stages s JOIN assignments a ON a.id = s.assignment_id",
+)
+
+# flask search-rebuild: refill the search index from the tables and merge its segments
+@app.cli.command("search-rebuild")
+def search_rebuild():
+    with db.transaction():
+        db.execute("DELETE FROM search_index")
+
+        for source in SEARCH_SOURCE_SQL:
+            db.execute(f"INSERT INTO search_index (rowid, owner, title, detail, body) {source}")
+        
+        db.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    
+    print(f"Search index rebuilt: {db.execute('SELECT COUNT(*) AS n FROM search_index')[0]['n']} rows.")
+
+
 # ===============================
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+# bench: synthetic data (bench.datagen) and the load driver (bench.run), see README
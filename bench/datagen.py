@@ -0,0 +1,181 @@
+# bench/datagen.py
+#
+# python -m bench.datagen --db instance/bench.db --users 1000 --profile light --seed 1
+#
+# Adds synthetic users and their data. The same seed, user count and
+# profile always produce the same rows. Every user can log in as bench<N>@bench.example,
+# with the password "bench"
+
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+from werkzeug.security import generate_password_hash
+
+import migrations
+from db import SQL
+from intervals import WeekIntervals, to_minutes
+
+PASSWORD = "bench"
+
+# rows per user as (min, max), drawn per user (schedule: draws that would overlap are dropped). heavy averages ~950 rows per user, so 1000 heavy users is about 1M rows
+PROFILES = {
+    "light": {
+        "schedule": (3, 10), "applications": (2, 10),
+        "modules": (2, 4), "assessments": (1, 3),
+        "assignments": (1, 5), "stages": (0, 3),
+    },
+    "medium": {
+        "schedule": (10, 25), "applications": (10, 50),
+        "modules": (4, 8), "assessments": (2, 6),
+        "assignments": (5, 20), "stages": (2, 6),
+    },
+    "heavy": {
+        "schedule": (30, 60), "applications": (100, 300),
+        "modules": (8, 16), "assessments": (4, 10),
+        "assignments": (30, 80), "stages": (5, 15),
+    },
+}
+
+STATUSES = ["Not Applied", "Interested", "Application Submitted", "Online Assessment", "Telephone Interview",
+            "Assessment Centre", "Offer Received", "Rejected", "Not Interested"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne", "Tyrell", "Soylent", "Cyberdyne"]
+PROGRAMMES = ["Graduate Scheme", "Summer Internship", "Spring Week", "Industrial Placement", "Insight Day"]
+SUBJECTS = ["Algorithms", "Databases", "Networks", "Statistics", "Economics", "Law", "Physics", "Design"]
+STAGE_TITLES = ["Research", "Outline", "Draft", "Review", "Final", "Submit"]
+
+
+def _count(rng, profile, key):
+    return rng.randint(*profile[key])
+
+
+def _day(rng, spread = 60):
+    return (date.today() + timedelta(days = rng.randint(-spread, spread))).isoformat()
+
+
+def _time(rng):
+    start = rng.randint(8 * 4, 18 * 4) * 15
+    end = start + rng.choice((45, 60, 90, 120))
+    return f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}"
+
+
+def generate(db, users, profile, seed = 1):
+    rng = random.Random(seed)
+    profile = PROFILES[profile]
+    counts = {}
+
+    # one hash for everyone, hashing per user would dominate the run
+    pw_hash = generate_password_hash(PASSWORD, method="pbkdf2:sha256", salt_length=16)
+
+    first = db.execute("SELECT COALESCE(MAX(id), 0) AS n FROM users")[0]["n"] + 1
+    user_ids = db.insert_many(
+        "users", ("username", "email", "hash"),
+        ((f"bench{n}", f"bench{n}@bench.example", pw_hash) for n in range(first, first + users))
+    )
+    counts["users"] = len(user_ids)
+
+    # the app refuses overlapping slots, so candidates that would overlap are dropped
+    def schedule():
+        for uid in user_ids:
+            week = WeekIntervals()
+
+            for _ in range(_count(rng, profile, "schedule")):
+                start, end = _time(rng)
+                day = rng.randint(0, 6)
+
+                if week.overlapping(day, to_minutes(start), to_minutes(end)) is None:
+                    week.add(day, to_minutes(start), to_minutes(end), start)
+                    yield uid, day, start, end, rng.choice(SUBJECTS) + " lecture", ""
+
+    counts["schedule_items"] = len(db.insert_many(
+        "schedule_items", ("user_id", "weekday", "start_time", "end_time", "title", "notes"), schedule()
+    ))
+
+    def applications():
+        for uid in user_ids:
+            for _ in range(_count(rng, profile, "applications")):
+                yield (uid, rng.choice(STATUSES), rng.choice(COMPANIES), rng.choice(PROGRAMMES),
+                       _day(rng), _day(rng, 120), rng.choice(("Yes", "No")), "Optional", "Optional", "")
+
+    counts["applications"] = len(db.insert_many(
+        "applications",
+        ("user_id", "status", "company", "programme", "open_date", "close_date", "cv", "cover", "written", "notes"),
+        applications()
+    ))
+
+    module_rows = [
+        (uid, rng.choice(SUBJECTS), rng.randint(1, 3), rng.choice((5.0, 10.0, 15.0, 20.0)))
+        for uid in user_ids
+        for _ in range(_count(rng, profile, "modules"))
+    ]
+    module_ids = db.insert_many("modules", ("user_id", "name", "term", "credits"), module_rows)
+    counts["modules"] = len(module_ids)
+
+    def assessments():
+        for mid in module_ids:
+            n = _count(rng, profile, "assessments")
+
+            for i in range(n):
+                score = round(rng.uniform(35, 95), 1) if rng.random() < 0.7 else None
+                yield mid, f"Assessment {i + 1}", round(100 / n, 2), score
+
+    counts["assessments"] = len(db.insert_many(
+        "assessments", ("module_id", "title", "weight_pct", "score_pct"), assessments()
+    ))
+
+    assignment_rows = [
+        (uid, rng.choice(SUBJECTS) + " coursework", _day(rng, 30), "")
+        for uid in user_ids
+        for _ in range(_count(rng, profile, "assignments"))
+    ]
+    assignment_ids = db.insert_many(
+        "assignments", ("user_id", "title", "due_date", "notes"), assignment_rows
+    )
+    counts["assignments"] = len(assignment_ids)
+
+    def stages():
+        for aid in assignment_ids:
+            for pos in range(1, _count(rng, profile, "stages") + 1):
+                # spaced like app.STAGE_GAP
+                yield aid, STAGE_TITLES[(pos - 1) % len(STAGE_TITLES)], int(rng.random() < 0.4), pos * 1024
+
+    counts["assignments_stages"] = len(db.insert_many(
+        "assignments_stages", ("assignment_id", "title", "done", "position"), stages()
+    ))
+
+    return counts
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Fill a database with synthetic UniFlow data.")
+    parser.add_argument("--db", default = "instance/bench.db")
+    parser.add_argument("--users", type = int, default = 1000)
+    parser.add_argument("--profile", choices = sorted(PROFILES), default = "light")
+    parser.add_argument("--seed", type = int, default = 1)
+    parser.add_argument("--fresh", action = "store_true", help = "delete the database file first")
+    args = parser.parse_args(argv)
+
+    path = Path(args.db)
+
+    if args.fresh:
+        for suffix in ("", "-wal", "-shm"):
+            Path(str(path) + suffix).unlink(missing_ok = True)
+
+    path.parent.mkdir(parents = True, exist_ok = True)
+
+    db = SQL(path)
+    migrations.upgrade(db)
+    counts = generate(db, args.users, args.profile, args.seed)
+    db.maintain()
+    db.close_all()
+
+    for table, n in counts.items():
+        print(f"{table:20} {n:>10}")
+
+    print(f"{'total':20} {sum(counts.values()):>10}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,544 @@
+# bench/run.py
+#
+# python -m bench.run --db instance/bench.db --mode client --vusers 4 --iterations 20 \
+#     --save bench/baselines/local.json
+# python -m bench.run --db instance/bench.db --mode wsgi --baseline bench/baselines/local.json
+#
+# Each virtual user logs in as one of the bench.datagen users and loops over every page and
+# form route and the JSON API: the page loads, then create / update / delete on each page,
+# on rows it created itself so the data set keeps its size (except /applications/add and
+# /grades/module/create, which do not hand back the id and leave one row per loop, and the
+# CSV imports, which add a few rows per user and then one per loop). Each user creates a
+# calendar subscription link once, polls the feed every loop like a calendar app, and
+# turns the link off at the end. The first user also signs up a throwaway account once and
+# runs the routes that would replace or wipe a seeded user's data on it (/account/restore,
+# also with a file it refuses, and /schedule/clear). Latency is recorded per endpoint;
+# queries per request come from the Server-Timing header (metrics.py), so the run enables
+# METRICS_ENABLED.
+#
+# --mode client  Flask's test client, in process: the app and SQL cost without HTTP
+# --mode wsgi    a threaded werkzeug server on a local port, requests over real sockets
+# --url URL      an already running server (started with FLASK_METRICS_ENABLED=true and
+#                FLASK_DATABASE pointing at the same file)
+#
+# With --baseline the run exits 1 when an endpoint's p95 grew by more than --threshold
+# (and by more than --floor-ms), when it issues more queries per request, or when the
+# throughput fell by more than --threshold
+
+import argparse
+import http.client
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+# the subscription link on the schedule page
+CALENDAR_FEED = re.compile(r'/calendar/([\w-]+)\.ics')
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+# ---------------- transports ----------------
+
+# the same calls over the test client or over HTTP: (status, headers, body). data is a form
+# (dict) or a raw body (bytes, with its Content-Type in headers); files are multipart
+# uploads, {field: (filename, content, content type)}
+class ClientTransport:
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data = None, json_body = None, headers = None, files = None):
+        if files:
+            data = {**(data or {}), **{k: (io.BytesIO(content), name, kind) for k, (name, content, kind) in files.items()}}
+
+        r = self.client.open(path, method = method, data = data, json = json_body, headers = headers)
+        return r.status_code, r.headers, r.get_data()
+
+
+class HTTPTransport:
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.cookies = SimpleCookie()
+
+    def request(self, method, path, data = None, json_body = None, headers = None, files = None):
+        headers = dict(headers or {})
+        body = None
+
+        if files:
+            boundary = f"bench{time.time_ns()}"
+            parts = [
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode()
+                for k, v in (data or {}).items()
+            ]
+            parts += [
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"; filename="{name}"\r\n'
+                f"Content-Type: {kind}\r\n\r\n".encode() + content + b"\r\n"
+                for k, (name, content, kind) in files.items()
+            ]
+            body = b"".join(parts) + f"--{boundary}--\r\n".encode()
+            headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+        elif isinstance(data, bytes):
+            body = data
+        elif data is not None:
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif json_body is not None:
+            body = json.dumps(json_body)
+            headers["Content-Type"] = "application/json"
+
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={m.value}" for k, m in self.cookies.items())
+
+        con = http.client.HTTPConnection(self.host, self.port, timeout = 30)
+
+        try:
+            con.request(method, path, body = body, headers = headers)
+            r = con.getresponse()
+            payload = r.read()
+        finally:
+            con.close()
+
+        for cookie in r.headers.get_all("Set-Cookie") or ():
+            self.cookies.load(cookie)
+
+        return r.status, r.headers, payload
+
+
+# ---------------- the scenario ----------------
+
+# one virtual user: records (endpoint, seconds, queries) into samples
+class VirtualUser:
+
+    def __init__(self, transport, email, samples, rng):
+        self.t = transport
+        self.email = email
+        self.samples = samples
+        self.rng = rng
+
+    def call(self, endpoint, method, path, data = None, json_body = None, expect = (200, 201, 302), headers = None, files = None):
+        start = time.perf_counter()
+        status, headers, body = self.t.request(method, path, data, json_body, headers, files)
+        elapsed = time.perf_counter() - start
+
+        if status not in expect:
+            raise RuntimeError(f"{method} {path} -> {status}: {body[:200]!r}")
+
+        m = SERVER_TIMING_QUERIES.search(headers.get("Server-Timing") or "")
+        self.samples.append((endpoint, elapsed, int(m.group(1)) if m else None))
+        return headers, body
+
+    # id of the row a form route just created, from its redirect (?open=<id>)
+    def opened_id(self, headers):
+        query = parse_qs(urlsplit(headers["Location"]).query)
+        return int(query["open"][0])
+
+    def ids(self, body):
+        return json.loads(body)["ids"]
+
+    # an API call that creates something: the decoded answer
+    def json(self, endpoint, method, path, json_body):
+        return json.loads(self.call(endpoint, method, path, json_body = json_body, expect = (201,))[1])
+
+    def login(self):
+        self.call("login", "POST", "/login", {"email": self.email, "password": "bench"})
+
+    def anonymous(self, n):
+        self.call("welcome", "GET", "/")
+        self.call("signup_form", "GET", "/signup")
+        self.call("login_form", "GET", "/login")
+        self.call("signup", "POST", "/signup", {
+            "username": f"signup-{n}", "email": f"signup-{n}@bench.example",
+            "password": "bench", "confirm": "bench"
+        })
+
+    # as the account anonymous() signed up: the routes that replace or remove everything
+    def throwaway(self, n):
+        self.call("login", "POST", "/login", {"email": f"signup-{n}@bench.example", "password": "bench"})
+
+        items = [{"weekday": d, "start_time": "09:00", "end_time": "10:00", "title": "Bench", "notes": ""} for d in range(5)]
+        self.call("schedule_bulk", "POST", "/schedule/bulk", json_body = items)
+        self.call("applications_bulk", "POST", "/applications/bulk",
+                  json_body = [{"company": "Bench", "programme": f"Restore {i}"} for i in range(20)])
+
+        # the export restored as it is, then with a slot overlapping another (the first one
+        # renumbered to id 0), which is refused as a whole
+        _, export = self.call("account_export", "GET", "/account/export")
+        self.call("account_restore", "POST", "/account/restore",
+                  files = {"file": ("uniflow.jsonl", export, "application/jsonl")})
+
+        lines = [json.loads(line) for line in export.splitlines()]
+        slot = next(r for r in lines if r.get("type") == "schedule")
+        clash = {**slot, "id": max(r.get("id", 0) for r in lines) + 1, "start_time": "09:30", "end_time": "10:30"}
+        slot["id"] = 0
+        overlapping = "".join(json.dumps(r) + "\n" for r in (*lines, clash)).encode()
+
+        self.call("account_restore_overlap", "POST", "/account/restore",
+                  files = {"file": ("uniflow.jsonl", overlapping, "application/jsonl")})
+
+        if b"Nothing was restored" not in self.call("home", "GET", "/home")[1]:
+            raise RuntimeError("an overlapping restore was accepted")
+
+        self.call("schedule_clear", "POST", "/schedule/clear")
+
+        self.call("logout", "GET", "/logout")
+
+    def pages(self):
+        for endpoint in ("home", "schedule_page", "applications_page", "grades_page", "assignments_page"):
+            headers, _ = self.call(endpoint, "GET", "/" + endpoint.replace("_page", ""))
+
+            # a reload with nothing changed: the browser sends the ETag back
+            if headers.get("ETag"):
+                self.call(endpoint + "_304", "GET", "/" + endpoint.replace("_page", ""),
+                          headers = {"If-None-Match": headers["ETag"]}, expect = (304,))
+
+        self.call("assignments_done", "GET", "/assignments?view=done")
+        self.call("account_export", "GET", "/account/export")
+        self.call("calendar_download", "GET", "/calendar.ics")
+
+        # what a subscribed calendar app does: fetch the feed, then poll it with the ETag
+        headers, _ = self.call("calendar_feed", "GET", self.feed)
+        self.call("calendar_feed_304", "GET", self.feed, headers = {"If-None-Match": headers["ETag"]}, expect = (304,))
+
+        # words the seeded data is made of (bench.datagen)
+        word = self.rng.choice(("acme", "graduate", "draft", "lecture", "databases"))
+        self.call("search_page", "GET", f"/search?q={word}")
+
+    def schedule(self):
+        day = self.rng.randint(0, 6)
+        item = {"weekday": day, "start_time": "07:00", "end_time": "07:45", "title": "Bench", "notes": ""}
+        (sid,) = self.ids(self.call("schedule_bulk", "POST", "/schedule/bulk", json_body = [item])[1])
+
+        self.call("schedule_save", "POST", "/schedule/save", {**item, "id": sid, "end_time": "07:50"})
+        self.call("schedule_delete", "POST", f"/schedule/delete/{sid}")
+
+    def applications(self):
+        item = {"status": "Interested", "company": "Bench", "programme": "Load Test", "close_date": "2099-01-01"}
+        (aid,) = self.ids(self.call("applications_bulk", "POST", "/applications/bulk", json_body = [item])[1])
+
+        self.call("applications_add", "POST", "/applications/add", {**item, "company": "Bench form"})
+        self.call("applications_update", "POST", f"/applications/{aid}/update", {**item, "status": "Rejected"})
+        self.call("applications_delete", "POST", f"/applications/{aid}/delete")
+
+    # a spreadsheet export: the same rows every loop (the first loop saves them, later ones
+    # find them all already there, in a different letter case) plus one new row per loop
+    def applications_import(self, n):
+        rows = [f"{'BENCH CSV' if n % 2 else 'Bench csv'},Programme {i},Application Submitted,2099-01-01" for i in range(20)]
+        rows.append(f'Bench CSV,Loop {n} {self.email},Interested,,"imported by the bench,\non two lines"')
+        csv_text = ("Company,Programme,Status,Close date,Notes\n" + "\n".join(rows) + "\n").encode()
+
+        self.call("applications_import", "POST", "/applications/import",
+                  files = {"file": ("applications.csv", csv_text, "text/csv")})
+        self.call("api_applications_import", "POST", "/api/v1/applications/import", csv_text,
+                  headers = {"Content-Type": "text/csv"})
+
+    def grades(self):
+        self.call("grades_module_create", "POST", "/grades/module/create", {"name": "Bench form", "term": "1", "credits": "5"})
+        mid = self.opened_id(self.call("grades_module_add", "POST", "/grades/module/add?term=1")[0])
+
+        self.call("grades_module_update", "POST", f"/grades/module/{mid}/update",
+                  {"name": "Bench", "term": "1", "credits": "10"})
+        self.call("grades_assessment_create", "POST", f"/grades/modules/{mid}/assessment/create",
+                  {"title": "Quiz", "weight_pct": "20", "score_pct": "60"})
+
+        (asid,) = self.ids(self.call("grades_assessment_bulk", "POST", f"/grades/modules/{mid}/assessments/bulk",
+                                     json_body = [{"title": "Exam", "weight_pct": 80, "score_pct": None}])[1])
+
+        self.call("grades_assessment_update", "POST", f"/grades/assessment/{asid}/update",
+                  {"title": "Exam", "weight_pct": "80", "score_pct": "70"})
+        self.call("grades_assessment_delete", "POST", f"/grades/assessment/{asid}/delete")
+        self.call("grades_module_delete", "POST", f"/grades/modules/{mid}/delete")
+
+    def assignments(self):
+        aid = self.opened_id(self.call("assignments_add", "POST", "/assignments/add",
+                                       {"title": "Bench", "due_date": "2099-01-01"})[0])
+
+        self.call("stage_add", "POST", f"/assignments/{aid}/stage/add", {"title": "Outline"})
+        first, second = self.ids(self.call("stage_bulk", "POST", f"/assignments/{aid}/stages/bulk",
+                                           json_body = [{"title": "Draft"}, {"title": "Final"}])[1])
+
+        self.call("assignment_stages", "GET", f"/assignments/{aid}/stages")
+        self.call("stage_toggle", "POST", f"/assignments/stage/{first}/toggle")
+        self.call("assignments_update", "POST", f"/assignments/{aid}/update",
+                  {"title": "Bench", "due_date": "2099-01-02", "notes": "n"})
+        self.call("stage_delete", "POST", f"/assignments/stage/{second}/delete")
+        self.call("assignments_delete", "POST", f"/assignments/{aid}/delete")
+
+    # the JSON API (/api/v1): reads, then create / update / delete on rows made here
+    def api(self):
+        for endpoint, path in (
+            ("api_schedule_list", "/api/v1/schedule"),
+            ("api_schedule_now", "/api/v1/schedule/now"),
+            ("api_schedule_free", "/api/v1/schedule/free?minutes=60&from=08:00&to=20:00"),
+            ("api_applications_list", "/api/v1/applications?sort=close_date"),
+            ("api_modules_list", "/api/v1/modules"),
+            ("api_assignments_list", "/api/v1/assignments"),
+            ("api_search", f"/api/v1/search?q={self.rng.choice(('acme', 'draft', 'lecture'))}"),
+        ):
+            self.call(endpoint, "GET", path)
+
+        day = self.rng.randint(0, 6)
+        item = self.json("api_schedule_create", "POST", "/api/v1/schedule",
+                         {"weekday": day, "start_time": "06:00", "end_time": "06:30", "title": "Bench API"})
+        self.call("api_schedule_get", "GET", f"/api/v1/schedule/{item['id']}")
+        self.call("api_schedule_update", "PATCH", f"/api/v1/schedule/{item['id']}", json_body = {"end_time": "06:45"})
+        self.call("api_schedule_delete", "DELETE", f"/api/v1/schedule/{item['id']}", expect = (204,))
+
+        item = self.json("api_applications_create", "POST", "/api/v1/applications",
+                         {"company": "Bench API", "programme": "Load Test", "close_date": "2099-01-01"})
+        self.call("api_applications_get", "GET", f"/api/v1/applications/{item['id']}")
+        self.call("api_applications_update", "PATCH", f"/api/v1/applications/{item['id']}", json_body = {"status": "Rejected"})
+        self.call("api_applications_delete", "DELETE", f"/api/v1/applications/{item['id']}", expect = (204,))
+
+        module = self.json("api_modules_create", "POST", "/api/v1/modules", {"name": "Bench API", "credits": 10})
+        item = self.json("api_assessments_create", "POST", f"/api/v1/modules/{module['id']}/assessments",
+                         {"title": "Exam", "weight_pct": 60, "score_pct": 70})
+        self.call("api_assessments_get", "GET", f"/api/v1/assessments/{item['id']}")
+        self.call("api_assessments_update", "PATCH", f"/api/v1/assessments/{item['id']}", json_body = {"score_pct": 75})
+        self.call("api_assessments_delete", "DELETE", f"/api/v1/assessments/{item['id']}", expect = (204,))
+        self.call("api_modules_get", "GET", f"/api/v1/modules/{module['id']}")
+        self.call("api_modules_update", "PATCH", f"/api/v1/modules/{module['id']}", json_body = {"credits": 15})
+        self.call("api_modules_delete", "DELETE", f"/api/v1/modules/{module['id']}", expect = (204,))
+
+        assignment = self.json("api_assignments_create", "POST", "/api/v1/assignments", {"title": "Bench API", "due_date": "2099-01-01"})
+        first = self.json("api_stages_create", "POST", f"/api/v1/assignments/{assignment['id']}/stages", {"title": "Outline"})
+        second = self.json("api_stages_create", "POST", f"/api/v1/assignments/{assignment['id']}/stages", {"title": "Draft"})
+        self.call("api_stages_batch", "PUT", f"/api/v1/assignments/{assignment['id']}/stages",
+                  json_body = {"stages": [{"id": second["id"], "done": True}, {"id": first["id"]}]})
+        self.call("api_stages_get", "GET", f"/api/v1/stages/{first['id']}")
+        self.call("api_stages_update", "PATCH", f"/api/v1/stages/{first['id']}", json_body = {"done": True})
+        self.call("api_stages_delete", "DELETE", f"/api/v1/stages/{second['id']}", expect = (204,))
+        self.call("api_assignments_get", "GET", f"/api/v1/assignments/{assignment['id']}")
+        self.call("api_assignments_update", "PATCH", f"/api/v1/assignments/{assignment['id']}", json_body = {"notes": "n"})
+        self.call("api_assignments_delete", "DELETE", f"/api/v1/assignments/{assignment['id']}", expect = (204,))
+
+    # a subscription link for the loops to poll, turned off again at the end of the run
+    def subscribe(self):
+        self.call("calendar_token", "POST", "/calendar/token")
+        _, body = self.call("schedule_page", "GET", "/schedule")
+        self.feed = f"/calendar/{CALENDAR_FEED.search(body.decode()).group(1)}.ics"
+
+    def run(self, iterations):
+        self.login()
+        self.subscribe()
+
+        for n in range(iterations):
+            self.pages()
+            self.schedule()
+            self.applications()
+            self.applications_import(n)
+            self.grades()
+            self.assignments()
+            self.api()
+
+        self.call("calendar_token", "POST", "/calendar/token", {"action": "off"})
+        self.call("logout", "GET", "/logout")
+
+
+# ---------------- running and reporting ----------------
+
+def drive(make_transport, emails, iterations, seed):
+    samples = []
+    errors = []
+
+    def worker(i, email):
+        try:
+            user = VirtualUser(make_transport(), email, samples, random.Random(seed + i))
+
+            if i == 0:
+                n = f"{seed}-{time.time_ns()}"
+                user.anonymous(n)
+                user.throwaway(n)
+
+            user.run(iterations)
+        except Exception as e:
+            errors.append(f"{email}: {e}")
+
+    threads = [threading.Thread(target = worker, args = (i, email)) for i, email in enumerate(emails)]
+    start = time.perf_counter()
+
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    return samples, errors, time.perf_counter() - start
+
+
+def summarise(samples, wall):
+    by_endpoint = {}
+
+    for endpoint, seconds, queries in samples:
+        by_endpoint.setdefault(endpoint, []).append((seconds, queries))
+
+    endpoints = {}
+
+    for endpoint, rows in sorted(by_endpoint.items()):
+        times = [r[0] for r in rows]
+        queries = [r[1] for r in rows if r[1] is not None]
+
+        endpoints[endpoint] = {
+            "count": len(rows),
+            "p50_ms": round(percentile(times, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(times, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(times, 0.99) * 1000, 3),
+            "queries": round(sum(queries) / len(queries), 2) if queries else None,
+        }
+
+    return {
+        "requests": len(samples),
+        "seconds": round(wall, 3),
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def compare(result, baseline, threshold, floor_ms):
+    problems = []
+
+    for endpoint, old in baseline["endpoints"].items():
+        new = result["endpoints"].get(endpoint)
+
+        if new is None:
+            continue
+
+        grown = new["p95_ms"] - old["p95_ms"]
+
+        if grown > floor_ms and new["p95_ms"] > old["p95_ms"] * (1 + threshold):
+            problems.append(f"{endpoint}: p95 {old['p95_ms']:.2f} -> {new['p95_ms']:.2f} ms")
+
+        # query counts do not depend on the machine, any increase is a regression
+        if old["queries"] is not None and new["queries"] is not None and new["queries"] > old["queries"] + 0.01:
+            problems.append(f"{endpoint}: queries/request {old['queries']} -> {new['queries']}")
+
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - threshold):
+        problems.append(f"throughput {baseline['throughput_rps']} -> {result['throughput_rps']} req/s")
+
+    return problems
+
+
+def print_report(result):
+    print(f"{'endpoint':28} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+
+    for endpoint, s in result["endpoints"].items():
+        queries = "-" if s["queries"] is None else f"{s['queries']:.1f}"
+        print(f"{endpoint:28} {s['count']:>6} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f} {queries:>8}")
+
+    print(f"\n{result['requests']} requests in {result['seconds']:.2f} s = {result['throughput_rps']:.1f} req/s")
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Drive every UniFlow route and report latency.")
+    parser.add_argument("--db", default = "instance/bench.db")
+    parser.add_argument("--mode", choices = ("client", "wsgi"), default = "client")
+    parser.add_argument("--url", help = "benchmark an already running server instead")
+    parser.add_argument("--vusers", type = int, default = 4, help = "concurrent virtual users")
+    parser.add_argument("--iterations", type = int, default = 20, help = "loops over the routes per user")
+    parser.add_argument("--seed", type = int, default = 1)
+    parser.add_argument("--save", help = "write the result as JSON")
+    parser.add_argument("--baseline", help = "compare with a saved result")
+    parser.add_argument("--threshold", type = float, default = 0.25, help = "allowed relative slowdown")
+    parser.add_argument("--floor-ms", type = float, default = 1.0, help = "ignore p95 changes below this")
+    args = parser.parse_args(argv)
+
+    server = None
+
+    if args.url:
+        make_transport = lambda: HTTPTransport(args.url)
+        db = None
+    else:
+        # must be set before app is imported, it reads them at import time
+        os.environ["FLASK_DATABASE"] = args.db
+        os.environ["FLASK_METRICS_ENABLED"] = "true"
+
+        from app import app, db
+
+        if args.mode == "client":
+            make_transport = lambda: ClientTransport(app)
+        else:
+            from werkzeug.serving import make_server
+
+            server = make_server("127.0.0.1", 0, app, threaded = True)
+            threading.Thread(target = server.serve_forever, daemon = True).start()
+
+            url = f"http://127.0.0.1:{server.server_port}"
+            make_transport = lambda: HTTPTransport(url)
+
+    # pick the virtual users among the generated ones, the same ones for the same seed
+    if db is not None:
+        emails = [r["email"] for r in db.execute("SELECT email FROM users WHERE email LIKE 'bench%@bench.example'")]
+    else:
+        emails = [f"bench{n}@bench.example" for n in range(1, args.vusers * 10 + 1)]
+
+    if len(emails) < args.vusers:
+        sys.exit(f"only {len(emails)} bench users in {args.db}, run python -m bench.datagen first")
+
+    emails = random.Random(args.seed).sample(emails, args.vusers)
+
+    try:
+        samples, errors, wall = drive(make_transport, emails, args.iterations, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    for e in errors:
+        print("error:", e, file = sys.stderr)
+
+    result = summarise(samples, wall)
+    result["config"] = {
+        "mode": "url" if args.url else args.mode, "vusers": args.vusers,
+        "iterations": args.iterations, "seed": args.seed, "db": args.db,
+    }
+    print_report(result)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok = True)
+
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent = 2)
+
+        print(f"saved {args.save}")
+
+    if errors:
+        return 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        if baseline.get("config", {}).get("mode") != result["config"]["mode"]:
+            print(f"note: baseline was recorded in {baseline.get('config', {}).get('mode')} mode")
+
+        problems = compare(result, baseline, args.threshold, args.floor_ms)
+
+        for p in problems:
+            print("REGRESSION", p)
+
+        if problems:
+            return 1
+
+        print(f"no regression against {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
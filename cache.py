@@ -0,0 +1,75 @@
+# cache.py
+
+import threading
+
+from cachelib import FileSystemCache, NullCache, SimpleCache
+
+
+# CACHE_TYPE: "simple" (per process), "filesystem" (shared by every worker on the host) or "null".
+# FLASK_CACHE_TYPE=null arrives as None through app.config.from_prefixed_env().
+# Any of them is safe with several workers, the generations live in the database. After
+# putting back a database file from a backup, empty CACHE_DIR (its versions went back too)
+def make_backend(config):
+    kind = config.get("CACHE_TYPE", "simple")
+    threshold = config.get("CACHE_THRESHOLD", 500)
+    timeout = config.get("CACHE_TIMEOUT", 300)
+
+    if kind == "filesystem":
+        return FileSystemCache(config.get("CACHE_DIR", "instance/cache"), threshold = threshold, default_timeout = timeout)
+
+    if kind in (None, "null"):
+        return NullCache()
+
+    return SimpleCache(threshold = threshold, default_timeout = timeout)
+
+
+# Read-through cache for per-user page datasets.
+# Every (user, entity) pair has a generation that is part of the data key. It comes from
+# generation(uid, entity), which the app reads from the database (user_data_version, bumped
+# by triggers on every write), so a write made by any worker, the CLI or a restore moves
+# every worker's key on at once: old entries are never read again and expire on their own.
+# The generation is read before the loader runs, so what is stored under it is at least
+# that new. generation() returns None when the data must not be cached (e.g. inside an
+# uncommitted transaction), the loader then just runs
+class PageCache:
+
+    def __init__(self, backend, generation):
+        self.backend = backend
+        self.generation = generation
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, entity, field):
+        with self._lock:
+            stats = self._stats.setdefault(entity, {"hits": 0, "misses": 0})
+            stats[field] += 1
+
+    # the loader must return a value that pickles; it only runs on a miss.
+    # variant tells apart several datasets of one entity (e.g. the pages of a filtered list),
+    # they all share the entity's generation
+    def get_or_load(self, uid, entity, loader, variant = ""):
+        # NullCache: nothing to look up, and no generation to read
+        if isinstance(self.backend, NullCache):
+            return loader()
+
+        gen = self.generation(uid, entity)
+
+        if gen is None:
+            return loader()
+
+        key = f"{entity}:{uid}:{gen}:{variant}"
+        value = self.backend.get(key)
+
+        if value is not None:
+            self._count(entity, "hits")
+            return value
+
+        self._count(entity, "misses")
+        value = loader()
+        self.backend.set(key, value)
+        return value
+
+    # hits/misses per entity since the process started
+    def stats(self):
+        with self._lock:
+            return {entity: dict(s) for entity, s in self._stats.items()}
@@ -1,32 +1,480 @@
 # db.py
 
+import os
 import sqlite3
+import threading
+import time
+from itertools import islice
+from contextlib import contextmanager
+from functools import lru_cache, partial, wraps
 from pathlib import Path
 
 DB_FILE = Path("instance/uniflow.db")
 DB_FILE.parent.mkdir(exist_ok = True)
 
+# applied to every new connection, override per key with SQL(pragmas={...}) (the app passes
+# its DATABASE_PRAGMAS setting)
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",          # readers no longer block behind the writer
+    "synchronous": "NORMAL",        # safe with WAL, one fsync per checkpoint instead of per commit
+    "foreign_keys": "ON",           # makes the ON DELETE CASCADE clauses in the schema work
+    "busy_timeout": 5000,
+    "cache_size": -16000,           # negative = KiB, so 16 MB of page cache per connection
+    "mmap_size": 268435456,         # 256 MB of memory-mapped reads
+    "temp_store": "MEMORY",
+}
+
+# idle-time maintenance (WAL checkpoint + PRAGMA optimize) runs at most this often
+MAINTENANCE_INTERVAL = 300
+
+# sqlite3's own prepared-statement cache, sized to hold every query the app issues
+STATEMENT_CACHE_SIZE = 256
+
+# SQLITE_MAX_VARIABLE_NUMBER since 3.32; multi-row inserts are chunked below it
+MAX_VARIABLES = 32766
+
+WRITE_VERBS = frozenset({"insert", "update", "delete", "replace"})
+DDL_VERBS = frozenset({"create", "drop", "alter"})
+
+# how often BEGIN is retried when another writer holds the lock (on top of the busy timeout)
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05
+
+
+# statement kind is worked out once per distinct query text
+@lru_cache(maxsize = 1024)
+def _statement_kind(query):
+    verb = query.lstrip().split(None, 1)[0].lower()
+
+    if verb in WRITE_VERBS:
+        return "write"
+
+    if verb in DDL_VERBS:
+        return "ddl"
+
+    return "read"
+
+
+# lightweight row: the values stay in the tuple sqlite3 returns and the name -> position
+# map is shared by every row of the same query. Reads like a dict (row["id"], row.get(),
+# a.title in Jinja); keys assigned later go to a small side dict
+class Row:
+
+    __slots__ = ("_index", "_values", "_extra")
+
+    def __init__(self, index, values):
+        self._index = index
+        self._values = values
+        self._extra = None
+
+    def __getitem__(self, key):
+        extra = self._extra
+
+        if extra is not None and key in extra:
+            return extra[key]
+
+        return self._values[self._index[key]]
+
+    def __setitem__(self, key, value):
+        if self._extra is None:
+            self._extra = {}
+
+        self._extra[key] = value
+
+    def __contains__(self, key):
+        return key in self._index or (self._extra is not None and key in self._extra)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        return dict(self.items()) == (dict(other.items()) if isinstance(other, Row) else other)
+
+    def __repr__(self):
+        return f"Row({dict(self.items())!r})"
+
+    def get(self, key, default = None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        if self._extra is None:
+            return list(self._index)
+
+        return list(self._index) + [k for k in self._extra if k not in self._index]
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+
+def _is_busy(e):
+    code = getattr(e, "sqlite_errorcode", None)
+
+    if code is not None:
+        return code in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+    return "locked" in str(e) or "busy" in str(e)
+
+
 class SQL:
 
-    def __init__(self, path = DB_FILE):
+    def __init__(self, path = DB_FILE, max_idle = 8, pragmas = None, row_type = dict):
         self.path = str(path)
-    
+        self.max_idle = max_idle
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.row_type = row_type
+
+        # query text -> (column names, name -> position), filled on first run
+        self._columns = {}
+
+        # fn(query, params, seconds) after every statement, see add_listener()
+        self._listeners = []
+        self._last_maintenance = time.monotonic()
+
+        # a connection is bound to a thread while in use and parked in _idle between requests
+        self._local = threading.local()
+        self._idle = []
+        self._conns = set()
+        self._lock = threading.Lock()
+
+        # a connection must never cross a fork, the child opens its own
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child = self._forget_all)
+
+    def _connect(self):
+        # check_same_thread is off because connections move between threads through the pool
+        # isolation_level=None: autocommit, transactions are opened explicitly by transaction()
+        con = sqlite3.connect(
+            self.path,
+            check_same_thread = False,
+            isolation_level = None,
+            cached_statements = STATEMENT_CACHE_SIZE
+        )
+
+        for name, value in self.pragmas.items():
+            con.execute(f"PRAGMA {name} = {value}")
+
+        return con
+
+    # checkout: reuse this thread's connection, else an idle one, else open a new one
+    def connection(self):
+        con = getattr(self._local, "con", None)
+
+        if con is not None:
+            return con
+
+        with self._lock:
+            con = self._idle.pop() if self._idle else None
+
+        if con is None:
+            con = self._connect()
+
+            with self._lock:
+                self._conns.add(con)
+
+        self._local.con = con
+        return con
+
+    # instrumentation hook: fn(query, params, seconds) is called after every statement
+    # (executemany/insert_many report once per call). Nothing is timed while no listener is set
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def _timed(self, query, params, run):
+        if not self._listeners:
+            return run()
+
+        start = time.perf_counter()
+
+        try:
+            return run()
+        finally:
+            elapsed = time.perf_counter() - start
+
+            for fn in self._listeners:
+                fn(query, params, elapsed)
+
     def execute(self, query, *params):
-        con = sqlite3.connect(self.path)
-        con.row_factory = sqlite3.Row
-        cur = con.execute(query, params)
-        is_write = query.lstrip().split()[0].lower() in {
-            "insert", "update", "delete", "delete", "create", "drop", "alter"
-        }
-
-        if is_write:
-            con.commit()
+        if not self._listeners:
+            return self._execute(query, params)
+
+        return self._timed(query, params, partial(self._execute, query, params))
+
+    def _execute(self, query, params):
+        kind = _statement_kind(query)
+        cur = self.connection().execute(query, params)
+
+        if kind != "read":
+            # a schema change can change what SELECT * returns
+            if kind == "ddl":
+                self._columns.clear()
+
             last_id = cur.lastrowid
-            cur.close(); con.close()
+            cur.close()
             return last_id
-    
-        rows = [dict(r) for r in cur.fetchall()]
-        cur.close(); con.close()
-        return rows
-    
-    
+
+        rows = cur.fetchall()
+        meta = self._columns.get(query)
+
+        if meta is None:
+            names = tuple(d[0] for d in cur.description or ())
+            meta = (names, {n: i for i, n in enumerate(names)})
+
+            if len(self._columns) < STATEMENT_CACHE_SIZE * 4:
+                self._columns[query] = meta
+
+        cur.close()
+
+        if self.row_type is Row:
+            index = meta[1]
+            return [Row(index, r) for r in rows]
+
+        names = meta[0]
+        return [dict(zip(names, r)) for r in rows]
+
+    # reads rows from the open cursor, batch at a time, instead of fetching them all into a list
+    # (for responses that are streamed as they are read). The statement is timed up to its
+    # first rows. The connection stays with this thread until the generator is finished or
+    # closed, so a view that returns it must wrap it in stream_with_context
+    def iterate(self, query, *params, batch = 256):
+        cur = self._timed(query, params, partial(self.connection().execute, query, params))
+
+        try:
+            names = tuple(d[0] for d in cur.description or ())
+            index = {n: i for i, n in enumerate(names)}
+
+            while True:
+                rows = cur.fetchmany(batch)
+
+                if not rows:
+                    break
+
+                if self.row_type is Row:
+                    yield from (Row(index, r) for r in rows)
+                else:
+                    yield from (dict(zip(names, r)) for r in rows)
+        finally:
+            cur.close()
+
+    # one statement, many parameter rows, one commit. Returns the number of rows changed
+    def executemany(self, query, seq_of_params):
+        with self.transaction():
+            cur = self._timed(query, (), partial(self.connection().executemany, query, seq_of_params))
+            count = cur.rowcount
+            cur.close()
+
+        return count
+
+    # chunked multi-row INSERT ... VALUES (...), (...) returning the new ids in input order.
+    # Only for tables keyed by INTEGER PRIMARY KEY: inside one statement holding the write
+    # lock SQLite hands out consecutive rowids, so the ids end at lastrowid.
+    # rows may be any iterable (a generator is never materialised past one chunk)
+    def insert_many(self, table, columns, rows, chunk_size = 500):
+        cols = ", ".join(columns)
+        placeholders = "(" + ", ".join("?" * len(columns)) + ")"
+        chunk_size = max(1, min(chunk_size, MAX_VARIABLES // len(columns)))
+
+        ids = []
+        rows = iter(rows)
+
+        with self.transaction():
+            con = self.connection()
+
+            while True:
+                chunk = list(islice(rows, chunk_size))
+
+                if not chunk:
+                    break
+
+                query = f"INSERT INTO {table} ({cols}) VALUES " + ", ".join([placeholders] * len(chunk))
+                cur = self._timed(query, (), partial(con.execute, query, [v for r in chunk for v in r]))
+                last_id = cur.lastrowid
+                cur.close()
+
+                ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+
+        return ids
+
+    # unit of work: every statement inside the block shares one connection and one commit.
+    # nested blocks become savepoints, so an inner failure only undoes the inner work
+    @contextmanager
+    def transaction(self):
+        con = self.connection()
+        depth = getattr(self._local, "depth", 0)
+
+        if depth == 0:
+            self._begin(con)
+            self._local.on_commit = []
+        else:
+            con.execute(f"SAVEPOINT sp_{depth}")
+
+        self._local.depth = depth + 1
+
+        try:
+            yield self
+
+        except BaseException:
+            self._local.depth = depth
+
+            if depth == 0:
+                self._local.on_commit = []
+
+            # SQLite may already have rolled the whole transaction back (e.g. disk full)
+            if not con.in_transaction:
+                pass
+            elif depth == 0:
+                con.execute("ROLLBACK")
+            else:
+                con.execute(f"ROLLBACK TO sp_{depth}")
+                con.execute(f"RELEASE sp_{depth}")
+            raise
+
+        self._local.depth = depth
+
+        if depth == 0:
+            con.execute("COMMIT")
+
+            callbacks, self._local.on_commit = self._local.on_commit, []
+
+            for fn in callbacks:
+                fn()
+        else:
+            con.execute(f"RELEASE sp_{depth}")
+
+    # read-only unit: every statement inside the block reads the same snapshot of the database.
+    # Plain BEGIN takes no write lock, so under WAL the writers carry on meanwhile. Inside an
+    # open transaction it adds nothing, that one is already a snapshot
+    @contextmanager
+    def snapshot(self):
+        con = self.connection()
+
+        if con.in_transaction:
+            yield self
+            return
+
+        con.execute("BEGIN")
+
+        try:
+            yield self
+        finally:
+            if con.in_transaction:
+                con.execute("COMMIT")
+
+    # run fn once the current transaction has committed (dropped if it rolls back);
+    # outside a transaction the data is already committed, so it runs right away
+    def on_commit(self, fn):
+        if getattr(self._local, "depth", 0) == 0:
+            fn()
+        else:
+            self._local.on_commit.append(fn)
+
+    # IMMEDIATE takes the write lock up front, so SQLITE_BUSY can only happen here and is safe to retry
+    def _begin(self, con):
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                con.execute("BEGIN IMMEDIATE")
+                return
+
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == BUSY_RETRIES:
+                    raise
+
+                time.sleep(BUSY_BACKOFF * (2 ** attempt))
+
+    # request-scoped variant: wraps a whole view in one transaction
+    def transactional(self, view):
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with self.transaction():
+                return view(*args, **kwargs)
+
+        return wrapper
+
+    # return: give the calling thread's connection back to the pool (end of request)
+    def release(self):
+        con = getattr(self._local, "con", None)
+
+        if con is None:
+            return
+
+        self._local.con = None
+        self._local.depth = 0
+
+        if con.in_transaction:
+            con.rollback()
+
+        if time.monotonic() - self._last_maintenance >= MAINTENANCE_INTERVAL:
+            self._last_maintenance = time.monotonic()
+            self._maintain(con)
+
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(con)
+                return
+
+            self._conns.discard(con)
+
+        con.close()
+
+    # fold the WAL back into the main file without waiting on readers, refresh planner stats
+    def _maintain(self, con):
+        try:
+            con.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+            con.execute("PRAGMA optimize")
+        except sqlite3.OperationalError:
+            pass
+
+    def maintain(self):
+        self._last_maintenance = time.monotonic()
+        self._maintain(self.connection())
+
+    # online copy of the whole database to target, on a connection of its own. The copy is
+    # made in one backup step, i.e. one read transaction: under WAL the workers keep reading
+    # and writing meanwhile, and the copy is the database as it was when the step began.
+    # Written to target.part and renamed, so target is never a half-written file
+    def backup(self, target):
+        target = Path(target)
+        partial_file = target.with_name(target.name + ".part")
+        partial_file.unlink(missing_ok = True)
+
+        source = self._connect()
+        copy = sqlite3.connect(partial_file)
+
+        try:
+            source.backup(copy)
+        finally:
+            copy.close()
+            source.close()
+
+        os.replace(partial_file, target)
+        return target
+
+    # close every pooled connection (app teardown / shutdown)
+    def close_all(self):
+        with self._lock:
+            conns = list(self._conns)
+            self._conns.clear()
+            self._idle.clear()
+
+        self._local = threading.local()
+
+        for con in conns:
+            try:
+                con.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+
+            con.close()
+
+    # after fork: drop the parent's connections without touching them
+    def _forget_all(self):
+        self._lock = threading.Lock()
+        self._idle = []
+        self._conns = set()
+        self._local = threading.local()
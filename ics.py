@@ -0,0 +1,115 @@
+# ics.py
+#
+# iCalendar (RFC 5545) text for the calendar feed, one event at a time so the feed can be
+# streamed while the rows are read. Times are floating (no TZID): the app has no time zones,
+# a slot at 09:00 is 09:00 wherever the calendar app is.
+#
+# Every value written here comes from the row itself (DTSTAMP is the row's updated_at), so
+# the same rows always give the same bytes and the feed's ETag stays valid.
+
+from datetime import date, datetime, timedelta
+
+CRLF = "\r\n"
+
+# content lines are folded at 75 octets, continuation lines start with one space
+LINE_OCTETS = 75
+
+HEADER = (
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//UniFlow//Calendar feed//EN",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH",
+    "X-WR-CALNAME:UniFlow",
+    "REFRESH-INTERVAL;VALUE=DURATION:PT1H",
+    "X-PUBLISHED-TTL:PT1H",
+)
+
+FOOTER = ("END:VCALENDAR",)
+
+
+def escape_text(value):
+    return (
+        (value or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+        .replace("\r", "\\n")
+    )
+
+
+# splits on UTF-8 octets without cutting a character in half
+def fold(line):
+    data = line.encode("utf-8")
+
+    if len(data) <= LINE_OCTETS:
+        return line
+
+    parts = []
+    start = 0
+    limit = LINE_OCTETS
+
+    while len(data) - start > limit:
+        end = start + limit
+
+        # back up to the first byte of a character (continuation bytes are 10xxxxxx)
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+
+        parts.append(data[start:end].decode("utf-8"))
+        start = end
+        limit = LINE_OCTETS - 1
+
+    parts.append(data[start:].decode("utf-8"))
+    return (CRLF + " ").join(parts)
+
+
+def lines(items):
+    return "".join(fold(line) + CRLF for line in items)
+
+
+# SQLite CURRENT_TIMESTAMP ('YYYY-MM-DD HH:MM:SS', UTC) as an iCalendar UTC date-time
+def utc_stamp(timestamp):
+    return datetime.fromisoformat(timestamp).strftime("%Y%m%dT%H%M%SZ")
+
+
+# first date on or after day that falls on weekday (0 = Monday)
+def first_weekday(day, weekday):
+    return day + timedelta(days=(weekday - day.weekday()) % 7)
+
+
+# a weekly slot as a recurring event. It starts on the first matching weekday after the
+# row was created, so the anchor does not move from one request to the next
+def weekly_event(uid, stamp, created, weekday, start_time, end_time, summary, description = None):
+    day = first_weekday(date.fromisoformat(created[:10]), weekday).strftime("%Y%m%d")
+
+    return lines((
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{utc_stamp(stamp)}",
+        f"DTSTART:{day}T{start_time.replace(':', '')}00",
+        f"DTEND:{day}T{end_time.replace(':', '')}00",
+        "RRULE:FREQ=WEEKLY",
+        f"SUMMARY:{escape_text(summary)}",
+        *((f"DESCRIPTION:{escape_text(description)}",) if description else ()),
+        "END:VEVENT",
+    ))
+
+
+# a deadline as an all-day event (DTEND is exclusive, so the day after)
+def day_event(uid, stamp, day, summary, description = None):
+    day = date.fromisoformat(day)
+
+    return lines((
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{utc_stamp(stamp)}",
+        f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{(day + timedelta(days=1)).strftime('%Y%m%d')}",
+        "TRANSP:TRANSPARENT",
+        f"SUMMARY:{escape_text(summary)}",
+        *((f"DESCRIPTION:{escape_text(description)}",) if description else ()),
+        "END:VEVENT",
+    ))
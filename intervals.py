@@ -0,0 +1,111 @@
+# intervals.py
+#
+# A user's weekly timetable as sorted intervals, one list per weekday (0 = Monday), in
+# minutes since midnight. Built once from the schedule rows (and cached with them), then
+# every lookup is a binary search.
+#
+# Slots of one day never overlap (saves that would overlap are refused), so sorting a day
+# by start also sorts it by end: the only slot that can overlap [start, end) is the last
+# one starting before end, and the slot on at minute t is the last one starting at or before t
+
+from bisect import bisect_left, bisect_right, insort
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(hhmm):
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def to_hhmm(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class WeekIntervals:
+
+    # items: (weekday, start, end, key) with start < end in minutes; key identifies the slot
+    # and is what the lookups return, so it must not be None
+    def __init__(self, items = ()):
+        self._days = [[] for _ in range(7)]
+
+        for weekday, start, end, key in items:
+            self._days[weekday].append((start, end, key))
+
+        for day in self._days:
+            day.sort(key = lambda t: (t[0], t[1]))
+
+    def __len__(self):
+        return sum(len(day) for day in self._days)
+
+    def add(self, weekday, start, end, key):
+        insort(self._days[weekday], (start, end, key), key = lambda t: (t[0], t[1]))
+
+    # key of a slot overlapping [start, end) on weekday (ignoring the slot `ignore`), or None
+    def overlapping(self, weekday, start, end, ignore = None):
+        day = self._days[weekday]
+        i = bisect_left(day, end, key = lambda t: t[0]) - 1
+
+        if i >= 0 and ignore is not None and day[i][2] == ignore:
+            i -= 1
+
+        if i >= 0 and day[i][1] > start:
+            return day[i][2]
+
+        return None
+
+    # key of the slot on at minute t of weekday, or None
+    def at(self, weekday, minute):
+        day = self._days[weekday]
+        i = bisect_right(day, minute, key = lambda t: t[0]) - 1
+
+        if i >= 0 and day[i][1] > minute:
+            return day[i][2]
+
+        return None
+
+    # (weekday, key) of the first slot starting after minute t of weekday, looking up to a
+    # week ahead (the same day's earlier slots count as next week's), or None when empty
+    def next_after(self, weekday, minute):
+        day = self._days[weekday]
+        i = bisect_right(day, minute, key = lambda t: t[0])
+
+        if i < len(day):
+            return weekday, day[i][2]
+
+        for ahead in range(1, 8):
+            d = (weekday + ahead) % 7
+
+            if self._days[d]:
+                return d, self._days[d][0][2]
+
+        return None
+
+    # free stretches of at least `minutes` between day_start and day_end, as
+    # [(weekday, start, end), ...] in week order
+    def free(self, minutes, day_start = 0, day_end = MINUTES_PER_DAY, weekdays = range(7)):
+        gaps = []
+
+        for weekday in weekdays:
+            day = self._days[weekday]
+            cursor = day_start
+
+            # skip the slots that end before the window opens
+            i = bisect_right(day, day_start, key = lambda t: t[0])
+
+            if i > 0 and day[i - 1][1] > cursor:
+                cursor = day[i - 1][1]
+
+            for start, end, _ in day[i:]:
+                if start >= day_end:
+                    break
+
+                if start - cursor >= minutes:
+                    gaps.append((weekday, cursor, start))
+
+                cursor = max(cursor, end)
+
+            if day_end - cursor >= minutes:
+                gaps.append((weekday, cursor, day_end))
+
+        return gaps
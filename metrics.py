@@ -0,0 +1,210 @@
+# metrics.py
+
+import hmac
+import logging
+import reprlib
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+from flask import Response, abort, before_render_template, g, has_request_context, request, template_rendered
+
+# slow statements are logged here with their parameters
+slow_log = logging.getLogger("uniflow.sql")
+
+# parameters are shortened in the log (hashes, session blobs, bulk inserts)
+_param_repr = reprlib.Repr()
+_param_repr.maxstring = 40
+_param_repr.maxother = 40
+_param_repr.maxtuple = 20
+
+# upper bounds of the Prometheus histogram buckets
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# quantiles are worked out over the last WINDOW requests of each endpoint
+WINDOW = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+
+# (metric name, Series attribute, help text)
+HISTOGRAMS = (
+    ("uniflow_request_duration_seconds", "request", "Wall time per request."),
+    ("uniflow_sql_duration_seconds", "sql", "Time spent in SQL per request."),
+    ("uniflow_render_duration_seconds", "render", "Time spent rendering templates per request."),
+    ("uniflow_sql_queries_per_request", "queries", "SQL statements per request."),
+)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        out = []
+        running = 0
+
+        for bound, n in zip(self.buckets, self.counts):
+            running += n
+            out.append(f'{name}_bucket{{{labels},le="{bound}"}} {running}')
+
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+# everything recorded for one endpoint
+class Series:
+
+    def __init__(self):
+        self.request = Histogram(SECONDS_BUCKETS)
+        self.sql = Histogram(SECONDS_BUCKETS)
+        self.render = Histogram(SECONDS_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        # (total, slowest query) of the most recent requests
+        self.recent = deque(maxlen = WINDOW)
+
+
+# Opt-in request instrumentation (METRICS_ENABLED): per request it counts the queries and
+# times SQL and template rendering, answers with a Server-Timing header and keeps per-endpoint
+# histograms, served in Prometheus text format at /_metrics to callers presenting
+# METRICS_TOKEN as a bearer token.
+# Statements slower than METRICS_SLOW_QUERY_MS are logged to "uniflow.sql" (default 100 with
+# METRICS_ENABLED, off without it unless set). With neither, no listener is registered and
+# db.py does not time anything
+class Metrics:
+
+    def __init__(self, app = None, db = None):
+        self.series = {}
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.enabled = bool(app.config.get("METRICS_ENABLED", False))
+        self.token = app.config.get("METRICS_TOKEN")
+        slow_ms = app.config.get("METRICS_SLOW_QUERY_MS", 100 if self.enabled else None)
+        self.slow_query = None if slow_ms is None else slow_ms / 1000
+
+        if self.enabled or self.slow_query is not None:
+            db.add_listener(self._on_query)
+
+        if not self.enabled:
+            return
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        before_render_template.connect(self._render_start, app)
+        template_rendered.connect(self._render_end, app)
+        app.add_url_rule("/_metrics", "metrics", self.export)
+
+    # ---------------- recording ----------------
+
+    def _on_query(self, query, params, seconds):
+        if self.slow_query is not None and seconds >= self.slow_query:
+            slow_log.warning("slow query (%.1f ms): %s %s", seconds * 1000, query, _param_repr.repr(params))
+
+        if not self.enabled or not has_request_context():
+            return
+
+        m = g.get("_metrics")
+
+        if m is not None:
+            m["queries"] += 1
+            m["sql"] += seconds
+            m["slowest"] = max(m["slowest"], seconds)
+
+    # the session is loaded before this and saved after _finish, so its queries are not counted
+    def _start(self):
+        g._metrics = {"start": time.perf_counter(), "queries": 0, "sql": 0.0, "slowest": 0.0, "render": 0.0}
+
+    def _render_start(self, sender, **extra):
+        g._render_start = time.perf_counter()
+
+    def _render_end(self, sender, **extra):
+        m = g.get("_metrics")
+        start = g.pop("_render_start", None)
+
+        if m is not None and start is not None:
+            m["render"] += time.perf_counter() - start
+
+    def _finish(self, response):
+        m = g.pop("_metrics", None)
+
+        if m is None:
+            return response
+
+        total = time.perf_counter() - m["start"]
+        endpoint = request.endpoint or "unmatched"
+
+        with self._lock:
+            s = self.series.get(endpoint)
+
+            if s is None:
+                s = self.series[endpoint] = Series()
+
+            s.request.observe(total)
+            s.sql.observe(m["sql"])
+            s.render.observe(m["render"])
+            s.queries.observe(m["queries"])
+            s.recent.append((total, m["slowest"]))
+
+        response.headers["Server-Timing"] = (
+            f'db;dur={m["sql"] * 1000:.2f};desc="{m["queries"]} queries", '
+            f'tpl;dur={m["render"] * 1000:.2f}, '
+            f"total;dur={total * 1000:.2f}"
+        )
+        return response
+
+    # ---------------- export ----------------
+
+    def export(self):
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+
+        # without a configured token the endpoint does not exist
+        if not self.token or not hmac.compare_digest(supplied.encode(), str(self.token).encode()):
+            abort(404)
+
+        return Response("\n".join(self.render_text()) + "\n", mimetype = "text/plain; version=0.0.4")
+
+    def render_text(self):
+        with self._lock:
+            snapshot = [(endpoint, s, list(s.recent)) for endpoint, s in sorted(self.series.items())]
+            out = []
+
+            for name, attr, help_text in HISTOGRAMS:
+                out.append(f"# HELP {name} {help_text}")
+                out.append(f"# TYPE {name} histogram")
+
+                for endpoint, s, _ in snapshot:
+                    out.extend(getattr(s, attr).lines(name, f'endpoint="{endpoint}"'))
+
+        out.append(f"# HELP uniflow_request_recent_seconds Request time quantiles over the last {WINDOW} requests.")
+        out.append("# TYPE uniflow_request_recent_seconds gauge")
+
+        for endpoint, _, recent in snapshot:
+            totals = sorted(r[0] for r in recent)
+
+            for q in QUANTILES:
+                value = totals[min(len(totals) - 1, int(q * len(totals)))]
+                out.append(f'uniflow_request_recent_seconds{{endpoint="{endpoint}",quantile="{q}"}} {value:.6f}')
+
+        out.append(f"# HELP uniflow_sql_slowest_recent_seconds Slowest statement over the last {WINDOW} requests.")
+        out.append("# TYPE uniflow_sql_slowest_recent_seconds gauge")
+
+        for endpoint, _, recent in snapshot:
+            slowest = max(r[1] for r in recent)
+            out.append(f'uniflow_sql_slowest_recent_seconds{{endpoint="{endpoint}"}} {slowest:.6f}')
+
+        return out
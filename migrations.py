@@ -0,0 +1,71 @@
+# migrations.py
+
+import re
+from pathlib import Path
+
+# numbered scripts: migrations/0001_initial.sql, 0002_..., applied in order, each exactly once
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATION_NAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+SCHEMA_VERSION_SQL = (
+    "CREATE TABLE IF NOT EXISTS schema_version ("
+    "version INTEGER PRIMARY KEY, "
+    "name TEXT NOT NULL, "
+    "applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+)
+
+
+# [(version, name, path), ...] sorted by version
+def available(directory = MIGRATIONS_DIR):
+    found = []
+
+    for path in Path(directory).glob("*.sql"):
+        m = MIGRATION_NAME.match(path.name)
+
+        if m:
+            found.append((int(m.group(1)), m.group(2), path))
+
+    return sorted(found)
+
+
+def current_version(db):
+    db.execute(SCHEMA_VERSION_SQL)
+    return db.execute("SELECT COALESCE(MAX(version), 0) AS v FROM schema_version")[0]["v"]
+
+
+def pending(db, directory = MIGRATIONS_DIR):
+    version = current_version(db)
+    return [m for m in available(directory) if m[0] > version]
+
+
+# applies every pending migration, each in its own transaction together with its
+# schema_version row, so a failing script leaves the database at the previous version.
+# Returns the [(version, name)] that were applied
+def upgrade(db, directory = MIGRATIONS_DIR, target = None):
+    applied = []
+    con = db.connection()
+
+    for version, name, path in pending(db, directory):
+        if target is not None and version > target:
+            break
+
+        script = (
+            "BEGIN IMMEDIATE;\n"
+            + path.read_text()
+            + f"\nINSERT INTO schema_version (version, name) VALUES ({version}, '{name}');\n"
+            + "COMMIT;"
+        )
+
+        try:
+            con.executescript(script)
+        except Exception:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            raise
+
+        applied.append((version, name))
+
+    # a migration can change what SELECT * returns
+    db._columns.clear()
+
+    return applied
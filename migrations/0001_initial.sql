@@ -2,7 +2,7 @@
 
 CREATE TABLE IF NOT EXISTS users(
     id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEX NOT NULL COLLATE NOCASE UNIQUE,
+    username TEXT NOT NULL COLLATE NOCASE UNIQUE,
     email TEXT NOT NULL COLLATE NOCASE UNIQUE,
     hash TEXT NOT NULL
 );
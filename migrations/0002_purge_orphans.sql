@@ -0,0 +1,9 @@
+-- rows left behind while foreign keys were not enforced (before the pragma profile
+-- turned foreign_keys on). Parents first, so the cascade already removes most children
+
+DELETE FROM schedule_items WHERE user_id NOT IN (SELECT id FROM users);
+DELETE FROM applications WHERE user_id NOT IN (SELECT id FROM users);
+DELETE FROM modules WHERE user_id NOT IN (SELECT id FROM users);
+DELETE FROM assignments WHERE user_id NOT IN (SELECT id FROM users);
+DELETE FROM assessments WHERE module_id NOT IN (SELECT id FROM modules);
+DELETE FROM assignments_stages WHERE assignment_id NOT IN (SELECT id FROM assignments);
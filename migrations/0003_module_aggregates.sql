@@ -0,0 +1,49 @@
+-- =============== Grade Tracker: running module aggregates =============== --
+
+ALTER TABLE modules ADD COLUMN total_weight REAL NOT NULL DEFAULT 0;       -- SUM(weight_pct)
+ALTER TABLE modules ADD COLUMN scored_weight REAL NOT NULL DEFAULT 0;      -- SUM(weight_pct) of the scored ones
+ALTER TABLE modules ADD COLUMN weighted_sum REAL NOT NULL DEFAULT 0;       -- SUM(weight_pct * score_pct)
+
+UPDATE modules SET
+    total_weight = COALESCE((SELECT SUM(weight_pct) FROM assessments WHERE module_id = modules.id), 0),
+    scored_weight = COALESCE((SELECT SUM(weight_pct) FROM assessments WHERE module_id = modules.id AND score_pct IS NOT NULL), 0),
+    weighted_sum = COALESCE((SELECT SUM(weight_pct * score_pct) FROM assessments WHERE module_id = modules.id), 0);
+
+-- module aggregates: every assessment write adjusts its module by the difference,
+-- `flask grades-repair` rebuilds them from scratch
+
+CREATE TRIGGER IF NOT EXISTS trg_assessments_agg_insert
+AFTER INSERT ON assessments
+FOR EACH ROW BEGIN
+    UPDATE modules
+    SET total_weight = total_weight + NEW.weight_pct,
+        scored_weight = scored_weight + IIF(NEW.score_pct IS NULL, 0, NEW.weight_pct),
+        weighted_sum = weighted_sum + COALESCE(NEW.weight_pct * NEW.score_pct, 0)
+    WHERE id = NEW.module_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assessments_agg_delete
+AFTER DELETE ON assessments
+FOR EACH ROW BEGIN
+    UPDATE modules
+    SET total_weight = total_weight - OLD.weight_pct,
+        scored_weight = scored_weight - IIF(OLD.score_pct IS NULL, 0, OLD.weight_pct),
+        weighted_sum = weighted_sum - COALESCE(OLD.weight_pct * OLD.score_pct, 0)
+    WHERE id = OLD.module_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assessments_agg_update
+AFTER UPDATE OF module_id, weight_pct, score_pct ON assessments
+FOR EACH ROW BEGIN
+    UPDATE modules
+    SET total_weight = total_weight - OLD.weight_pct,
+        scored_weight = scored_weight - IIF(OLD.score_pct IS NULL, 0, OLD.weight_pct),
+        weighted_sum = weighted_sum - COALESCE(OLD.weight_pct * OLD.score_pct, 0)
+    WHERE id = OLD.module_id;
+
+    UPDATE modules
+    SET total_weight = total_weight + NEW.weight_pct,
+        scored_weight = scored_weight + IIF(NEW.score_pct IS NULL, 0, NEW.weight_pct),
+        weighted_sum = weighted_sum + COALESCE(NEW.weight_pct * NEW.score_pct, 0)
+    WHERE id = NEW.module_id;
+END;
@@ -0,0 +1,120 @@
+-- =============== Home Page Summary =============== --
+
+-- one row per user, so /home is a single primary-key lookup.
+-- apps_active and overall_grade are kept current by the triggers below;
+-- next_closing and assignments_due_7d depend on today's date, so the triggers only
+-- mark them stale (dates_as_of = NULL) and the app recomputes them on the next visit
+
+CREATE TABLE IF NOT EXISTS user_summary (
+    user_id INTEGER PRIMARY KEY,
+    apps_active INTEGER NOT NULL DEFAULT 0,
+    overall_grade REAL,
+    next_closing TEXT,
+    assignments_due_7d INTEGER NOT NULL DEFAULT 0,
+    dates_as_of TEXT,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_users_summary_insert
+AFTER INSERT ON users
+FOR EACH ROW BEGIN
+    INSERT OR IGNORE INTO user_summary (user_id) VALUES (NEW.id);
+END;
+
+-- applications: running count of the active ones
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_summary_insert
+AFTER INSERT ON applications
+FOR EACH ROW BEGIN
+    UPDATE user_summary
+    SET apps_active = apps_active + (NEW.status NOT IN ('Rejected', 'Not Interested')),
+        dates_as_of = NULL
+    WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_summary_delete
+AFTER DELETE ON applications
+FOR EACH ROW BEGIN
+    UPDATE user_summary
+    SET apps_active = apps_active - (OLD.status NOT IN ('Rejected', 'Not Interested')),
+        dates_as_of = NULL
+    WHERE user_id = OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_summary_update
+AFTER UPDATE OF status, close_date ON applications
+FOR EACH ROW BEGIN
+    UPDATE user_summary
+    SET apps_active = apps_active
+            + (NEW.status NOT IN ('Rejected', 'Not Interested'))
+            - (OLD.status NOT IN ('Rejected', 'Not Interested')),
+        dates_as_of = NULL
+    WHERE user_id = NEW.user_id;
+END;
+
+-- assignments: only the date-relative count depends on them
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_summary_insert
+AFTER INSERT ON assignments
+FOR EACH ROW BEGIN
+    UPDATE user_summary SET dates_as_of = NULL WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_summary_delete
+AFTER DELETE ON assignments
+FOR EACH ROW BEGIN
+    UPDATE user_summary SET dates_as_of = NULL WHERE user_id = OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_summary_update
+AFTER UPDATE OF due_date, status ON assignments
+FOR EACH ROW BEGIN
+    UPDATE user_summary SET dates_as_of = NULL WHERE user_id = NEW.user_id;
+END;
+
+-- grades: credits-weighted average of the modules that have at least one score.
+-- Assessment writes reach here through the module aggregates changing
+
+CREATE TRIGGER IF NOT EXISTS trg_modules_summary_insert
+AFTER INSERT ON modules
+FOR EACH ROW BEGIN
+    UPDATE user_summary
+    SET overall_grade = (
+        SELECT ROUND(SUM(credits * weighted_sum / scored_weight) / SUM(credits), 2)
+        FROM modules WHERE user_id = NEW.user_id AND scored_weight > 0
+    )
+    WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modules_summary_update
+AFTER UPDATE OF credits, scored_weight, weighted_sum ON modules
+FOR EACH ROW BEGIN
+    UPDATE user_summary
+    SET overall_grade = (
+        SELECT ROUND(SUM(credits * weighted_sum / scored_weight) / SUM(credits), 2)
+        FROM modules WHERE user_id = NEW.user_id AND scored_weight > 0
+    )
+    WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modules_summary_delete
+AFTER DELETE ON modules
+FOR EACH ROW BEGIN
+    UPDATE user_summary
+    SET overall_grade = (
+        SELECT ROUND(SUM(credits * weighted_sum / scored_weight) / SUM(credits), 2)
+        FROM modules WHERE user_id = OLD.user_id AND scored_weight > 0
+    )
+    WHERE user_id = OLD.user_id;
+END;
+
+-- existing users
+
+INSERT OR IGNORE INTO user_summary (user_id, apps_active, overall_grade)
+SELECT
+    u.id,
+    (SELECT COUNT(*) FROM applications
+     WHERE user_id = u.id AND status NOT IN ('Rejected', 'Not Interested')),
+    (SELECT ROUND(SUM(credits * weighted_sum / scored_weight) / SUM(credits), 2)
+     FROM modules WHERE user_id = u.id AND scored_weight > 0)
+FROM users u;
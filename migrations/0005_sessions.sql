@@ -0,0 +1,12 @@
+-- =============== Sessions =============== --
+
+-- server-side Flask sessions (sessions.py); expired rows go with `flask session_cleanup`
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    expiry INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_sessions_expiry
+ON sessions(expiry);
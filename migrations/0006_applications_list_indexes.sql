@@ -0,0 +1,14 @@
+-- =============== Applications list indexes =============== --
+
+-- the applications list is always one user's rows, filtered by status and/or a close-date
+-- range and sorted by close date or newest first (keyset pages, see _load_applications).
+-- idx_applications_close_date spans every user's rows and no query can use it.
+-- idx_applications_user stays: it is the (user_id, id) order of the "newest" sort
+
+DROP INDEX IF EXISTS idx_applications_close_date;
+
+CREATE INDEX IF NOT EXISTS idx_applications_user_close
+ON applications(user_id, close_date);
+
+CREATE INDEX IF NOT EXISTS idx_applications_user_status_close
+ON applications(user_id, status, close_date);
@@ -0,0 +1,134 @@
+-- =============== Search =============== --
+
+-- one full-text row per searchable record, kept current by the triggers below.
+-- rowid = record id * 4 + kind (0 schedule item, 1 application, 2 assignment, 3 stage), so
+-- a trigger finds its row by primary key.
+-- owner is the token 'u<user_id>'; every search ANDs it in, so a query only walks the
+-- postings of one user. title / detail / body are what the results show:
+--   schedule item   title, -, notes
+--   application     company, programme, notes
+--   assignment      title, -, notes
+--   stage           title, assignment title, -
+-- `flask search-rebuild` refills it from the tables
+
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    owner, title, detail, body,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+-- the owner column never counts towards the rank, titles count most
+INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(0.0, 10.0, 5.0, 1.0)');
+
+INSERT INTO search_index (rowid, owner, title, detail, body)
+SELECT id * 4, 'u' || user_id, title, '', COALESCE(notes, '') FROM schedule_items;
+
+INSERT INTO search_index (rowid, owner, title, detail, body)
+SELECT id * 4 + 1, 'u' || user_id, company, programme, COALESCE(notes, '') FROM applications;
+
+INSERT INTO search_index (rowid, owner, title, detail, body)
+SELECT id * 4 + 2, 'u' || user_id, title, '', COALESCE(notes, '') FROM assignments;
+
+INSERT INTO search_index (rowid, owner, title, detail, body)
+SELECT s.id * 4 + 3, 'u' || a.user_id, s.title, a.title, ''
+FROM assignments_stages s JOIN assignments a ON a.id = s.assignment_id;
+
+-- schedule items
+
+CREATE TRIGGER IF NOT EXISTS trg_schedule_items_search_insert
+AFTER INSERT ON schedule_items
+FOR EACH ROW BEGIN
+    INSERT INTO search_index (rowid, owner, title, detail, body)
+    VALUES (NEW.id * 4, 'u' || NEW.user_id, NEW.title, '', COALESCE(NEW.notes, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedule_items_search_delete
+AFTER DELETE ON schedule_items
+FOR EACH ROW BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedule_items_search_update
+AFTER UPDATE OF user_id, title, notes ON schedule_items
+FOR EACH ROW BEGIN
+    UPDATE search_index
+    SET owner = 'u' || NEW.user_id, title = NEW.title, body = COALESCE(NEW.notes, '')
+    WHERE rowid = NEW.id * 4;
+END;
+
+-- applications
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_search_insert
+AFTER INSERT ON applications
+FOR EACH ROW BEGIN
+    INSERT INTO search_index (rowid, owner, title, detail, body)
+    VALUES (NEW.id * 4 + 1, 'u' || NEW.user_id, NEW.company, NEW.programme, COALESCE(NEW.notes, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_search_delete
+AFTER DELETE ON applications
+FOR EACH ROW BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_search_update
+AFTER UPDATE OF user_id, company, programme, notes ON applications
+FOR EACH ROW BEGIN
+    UPDATE search_index
+    SET owner = 'u' || NEW.user_id, title = NEW.company, detail = NEW.programme, body = COALESCE(NEW.notes, '')
+    WHERE rowid = NEW.id * 4 + 1;
+END;
+
+-- assignments (a new title is also the detail of their stages)
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_search_insert
+AFTER INSERT ON assignments
+FOR EACH ROW BEGIN
+    INSERT INTO search_index (rowid, owner, title, detail, body)
+    VALUES (NEW.id * 4 + 2, 'u' || NEW.user_id, NEW.title, '', COALESCE(NEW.notes, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_search_delete
+AFTER DELETE ON assignments
+FOR EACH ROW BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 2;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_search_update
+AFTER UPDATE OF user_id, title, notes ON assignments
+FOR EACH ROW BEGIN
+    UPDATE search_index
+    SET owner = 'u' || NEW.user_id, title = NEW.title, body = COALESCE(NEW.notes, '')
+    WHERE rowid = NEW.id * 4 + 2;
+
+    UPDATE search_index
+    SET owner = 'u' || NEW.user_id, detail = NEW.title
+    WHERE rowid IN (SELECT id * 4 + 3 FROM assignments_stages WHERE assignment_id = NEW.id)
+      AND (OLD.title IS NOT NEW.title OR OLD.user_id IS NOT NEW.user_id);
+END;
+
+-- stages
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_stages_search_insert
+AFTER INSERT ON assignments_stages
+FOR EACH ROW BEGIN
+    INSERT INTO search_index (rowid, owner, title, detail, body)
+    SELECT NEW.id * 4 + 3, 'u' || user_id, NEW.title, title, ''
+    FROM assignments WHERE id = NEW.assignment_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_stages_search_delete
+AFTER DELETE ON assignments_stages
+FOR EACH ROW BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 4 + 3;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_stages_search_update
+AFTER UPDATE OF assignment_id, title ON assignments_stages
+FOR EACH ROW BEGIN
+    UPDATE search_index
+    SET title = NEW.title,
+        owner = (SELECT 'u' || user_id FROM assignments WHERE id = NEW.assignment_id),
+        detail = (SELECT title FROM assignments WHERE id = NEW.assignment_id)
+    WHERE rowid = NEW.id * 4 + 3;
+END;
@@ -0,0 +1,40 @@
+-- =============== Assignments: priority from the due date =============== --
+
+-- 1 = due within 3 days (or overdue), 2 = within 7 days, 3 = later or no due date.
+-- It depends on today's date, so the pages work it out when they read (ASSIGNMENT_PRIORITY_SQL
+-- in app.py, the same expression). The stored column is a snapshot: set here on every write,
+-- and brought up to date for all users at once by `flask assignments-priority` (cron, daily)
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_priority_insert
+AFTER INSERT ON assignments
+FOR EACH ROW BEGIN
+    UPDATE assignments
+    SET priority = CASE
+        WHEN julianday(NEW.due_date) IS NULL THEN 3
+        WHEN julianday(NEW.due_date) - julianday('now', 'localtime', 'start of day') <= 3 THEN 1
+        WHEN julianday(NEW.due_date) - julianday('now', 'localtime', 'start of day') <= 7 THEN 2
+        ELSE 3 END
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_priority_update
+AFTER UPDATE OF due_date ON assignments
+FOR EACH ROW BEGIN
+    UPDATE assignments
+    SET priority = CASE
+        WHEN julianday(NEW.due_date) IS NULL THEN 3
+        WHEN julianday(NEW.due_date) - julianday('now', 'localtime', 'start of day') <= 3 THEN 1
+        WHEN julianday(NEW.due_date) - julianday('now', 'localtime', 'start of day') <= 7 THEN 2
+        ELSE 3 END
+    WHERE id = NEW.id;
+END;
+
+UPDATE assignments
+SET priority = CASE
+    WHEN julianday(due_date) IS NULL THEN 3
+    WHEN julianday(due_date) - julianday('now', 'localtime', 'start of day') <= 3 THEN 1
+    WHEN julianday(due_date) - julianday('now', 'localtime', 'start of day') <= 7 THEN 2
+    ELSE 3 END;
+
+-- nothing filters on priority across users; the page reads by (user_id, due_date)
+DROP INDEX IF EXISTS idx_assignments_priority;
@@ -0,0 +1,79 @@
+-- =============== Assignments: progress counts and status =============== --
+
+-- total_count / done_count: how many stages the assignment has and how many are ticked.
+-- Every stage write adjusts them by the difference, and status follows from them:
+--   done         every stage ticked (and at least one stage)
+--   in_progress  some ticked
+--   pending      none ticked, or no stages
+-- so the page reads progress without touching assignments_stages
+
+ALTER TABLE assignments ADD COLUMN total_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE assignments ADD COLUMN done_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE assignments SET
+    total_count = (SELECT COUNT(*) FROM assignments_stages WHERE assignment_id = assignments.id),
+    done_count = (SELECT COUNT(*) FROM assignments_stages WHERE assignment_id = assignments.id AND done <> 0);
+
+UPDATE assignments SET status = CASE
+    WHEN total_count > 0 AND done_count = total_count THEN 'done'
+    WHEN done_count > 0 THEN 'in_progress'
+    ELSE 'pending' END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_stages_count_insert
+AFTER INSERT ON assignments_stages
+FOR EACH ROW BEGIN
+    UPDATE assignments
+    SET total_count = total_count + 1,
+        done_count = done_count + (NEW.done <> 0)
+    WHERE id = NEW.assignment_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_stages_count_delete
+AFTER DELETE ON assignments_stages
+FOR EACH ROW BEGIN
+    UPDATE assignments
+    SET total_count = total_count - 1,
+        done_count = done_count - (OLD.done <> 0)
+    WHERE id = OLD.assignment_id;
+END;
+
+-- ticking / unticking: one UPDATE, and only when done really flipped
+CREATE TRIGGER IF NOT EXISTS trg_assignments_stages_count_done
+AFTER UPDATE OF done ON assignments_stages
+FOR EACH ROW WHEN NEW.assignment_id = OLD.assignment_id AND (NEW.done <> 0) <> (OLD.done <> 0)
+BEGIN
+    UPDATE assignments
+    SET done_count = done_count + (NEW.done <> 0) - (OLD.done <> 0)
+    WHERE id = NEW.assignment_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_stages_count_move
+AFTER UPDATE OF assignment_id ON assignments_stages
+FOR EACH ROW WHEN NEW.assignment_id <> OLD.assignment_id
+BEGIN
+    UPDATE assignments
+    SET total_count = total_count - 1,
+        done_count = done_count - (OLD.done <> 0)
+    WHERE id = OLD.assignment_id;
+
+    UPDATE assignments
+    SET total_count = total_count + 1,
+        done_count = done_count + (NEW.done <> 0)
+    WHERE id = NEW.assignment_id;
+END;
+
+-- status from the counts, whoever changed them (written only when it actually changes)
+CREATE TRIGGER IF NOT EXISTS trg_assignments_status_from_counts
+AFTER UPDATE OF total_count, done_count ON assignments
+FOR EACH ROW WHEN NEW.status IS NOT CASE
+        WHEN NEW.total_count > 0 AND NEW.done_count = NEW.total_count THEN 'done'
+        WHEN NEW.done_count > 0 THEN 'in_progress'
+        ELSE 'pending' END
+BEGIN
+    UPDATE assignments
+    SET status = CASE
+        WHEN NEW.total_count > 0 AND NEW.done_count = NEW.total_count THEN 'done'
+        WHEN NEW.done_count > 0 THEN 'in_progress'
+        ELSE 'pending' END
+    WHERE id = NEW.id;
+END;
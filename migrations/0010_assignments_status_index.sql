@@ -0,0 +1,6 @@
+-- =============== Assignments: done view =============== --
+
+-- the Done tab pages through (user_id, status = 'done') by id, and the tab counts
+-- group by status; both are walks of this index
+CREATE INDEX IF NOT EXISTS idx_assignments_user_status
+ON assignments(user_id, status);
@@ -0,0 +1,13 @@
+-- =============== Assignments: gapped stage positions =============== --
+
+-- stages are numbered 1024, 2048, 3072, ... within their assignment (STAGE_GAP in app.py),
+-- so moving one stage is one UPDATE to a position between its new neighbours; only when
+-- a gap runs out is the checklist renumbered
+
+UPDATE assignments_stages
+SET position = ranked.n * 1024
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY assignment_id ORDER BY position, id) AS n
+    FROM assignments_stages
+) AS ranked
+WHERE ranked.id = assignments_stages.id;
@@ -0,0 +1,20 @@
+-- =============== Schedule: slots as minute intervals =============== --
+
+-- start_min / end_min: the slot's times as minutes since midnight, computed by SQLite
+-- from start_time / end_time (virtual columns, nothing to keep in sync).
+-- Slots of one user on one day do not overlap (the app refuses overlapping saves), so in
+-- (user_id, weekday, start_min) order the end times are sorted too: "what overlaps
+-- [s, e)" and "what is on at t" are one index probe each (the last slot starting before
+-- e / at or before t)
+
+ALTER TABLE schedule_items ADD COLUMN start_min INTEGER
+    GENERATED ALWAYS AS (CAST(substr(start_time, 1, 2) AS INTEGER) * 60 + CAST(substr(start_time, 4, 2) AS INTEGER)) VIRTUAL;
+
+ALTER TABLE schedule_items ADD COLUMN end_min INTEGER
+    GENERATED ALWAYS AS (CAST(substr(end_time, 1, 2) AS INTEGER) * 60 + CAST(substr(end_time, 4, 2) AS INTEGER)) VIRTUAL;
+
+CREATE INDEX IF NOT EXISTS idx_sched_user_day_min
+ON schedule_items(user_id, weekday, start_min, end_min);
+
+-- same order, superseded by the index above
+DROP INDEX IF EXISTS idx_sched_user_day_time;
@@ -0,0 +1,10 @@
+-- =============== Calendar feed =============== --
+
+-- the secret in the user's calendar subscription URL (/calendar/<token>.ics): calendar apps
+-- poll it without a session. NULL until the user asks for a link; a new link replaces it,
+-- which turns the old URL off
+
+ALTER TABLE users ADD COLUMN calendar_token TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_calendar_token
+ON users(calendar_token);
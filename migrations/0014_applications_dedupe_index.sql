@@ -0,0 +1,8 @@
+-- =============== Applications: one per company + programme =============== --
+
+-- the CSV import skips rows the user already has: one lookup per row on
+-- (user_id, company, programme), letter case ignored. Not UNIQUE, rows saved before the
+-- import existed may repeat
+
+CREATE INDEX IF NOT EXISTS idx_applications_user_company_programme
+ON applications(user_id, company COLLATE NOCASE, programme COLLATE NOCASE);
@@ -0,0 +1,150 @@
+-- =============== Per-user data versions =============== --
+
+-- one row per user with a counter per page's data, bumped by the triggers below on every
+-- insert, update and delete, and changed_at, the time of the last bump. The list pages
+-- and the calendar feed build their ETags from it, so "has anything changed?" is one
+-- primary-key lookup:
+--   schedule      schedule_items (and users.calendar_token, shown on the schedule page)
+--   applications  applications
+--   grades        modules, assessments
+--   assignments   assignments, assignments_stages
+
+CREATE TABLE IF NOT EXISTS user_data_version (
+    user_id INTEGER PRIMARY KEY,
+    schedule INTEGER NOT NULL DEFAULT 0,
+    applications INTEGER NOT NULL DEFAULT 0,
+    grades INTEGER NOT NULL DEFAULT 0,
+    assignments INTEGER NOT NULL DEFAULT 0,
+    changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+INSERT OR IGNORE INTO user_data_version (user_id) SELECT id FROM users;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_data_version_insert
+AFTER INSERT ON users
+FOR EACH ROW BEGIN
+    INSERT OR IGNORE INTO user_data_version (user_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_data_version_calendar
+AFTER UPDATE OF calendar_token ON users
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET schedule = schedule + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = NEW.id;
+END;
+
+-- schedule
+
+CREATE TRIGGER IF NOT EXISTS trg_schedule_items_data_version_insert
+AFTER INSERT ON schedule_items
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET schedule = schedule + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedule_items_data_version_update
+AFTER UPDATE ON schedule_items
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET schedule = schedule + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_schedule_items_data_version_delete
+AFTER DELETE ON schedule_items
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET schedule = schedule + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = OLD.user_id;
+END;
+
+-- applications
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_data_version_insert
+AFTER INSERT ON applications
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET applications = applications + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_data_version_update
+AFTER UPDATE ON applications
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET applications = applications + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_applications_data_version_delete
+AFTER DELETE ON applications
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET applications = applications + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = OLD.user_id;
+END;
+
+-- grades
+
+CREATE TRIGGER IF NOT EXISTS trg_modules_data_version_insert
+AFTER INSERT ON modules
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET grades = grades + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modules_data_version_update
+AFTER UPDATE ON modules
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET grades = grades + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modules_data_version_delete
+AFTER DELETE ON modules
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET grades = grades + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assessments_data_version_insert
+AFTER INSERT ON assessments
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET grades = grades + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = (SELECT user_id FROM modules WHERE id = NEW.module_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assessments_data_version_update
+AFTER UPDATE ON assessments
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET grades = grades + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = (SELECT user_id FROM modules WHERE id = NEW.module_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assessments_data_version_delete
+AFTER DELETE ON assessments
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET grades = grades + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = (SELECT user_id FROM modules WHERE id = OLD.module_id);
+END;
+
+-- assignments
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_data_version_insert
+AFTER INSERT ON assignments
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET assignments = assignments + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_data_version_update
+AFTER UPDATE ON assignments
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET assignments = assignments + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_data_version_delete
+AFTER DELETE ON assignments
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET assignments = assignments + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_stages_data_version_insert
+AFTER INSERT ON assignments_stages
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET assignments = assignments + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = (SELECT user_id FROM assignments WHERE id = NEW.assignment_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_stages_data_version_update
+AFTER UPDATE ON assignments_stages
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET assignments = assignments + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = (SELECT user_id FROM assignments WHERE id = NEW.assignment_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assignments_stages_data_version_delete
+AFTER DELETE ON assignments_stages
+FOR EACH ROW BEGIN
+    UPDATE user_data_version SET assignments = assignments + 1, changed_at = CURRENT_TIMESTAMP WHERE user_id = (SELECT user_id FROM assignments WHERE id = OLD.assignment_id);
+END;
@@ -0,0 +1,55 @@
+-- =============== Grade Tracker: module aggregates without drift =============== --
+
+-- the running sums in 0003 are REAL, and adding then subtracting the same weights does not
+-- always give back what was there (33.3 + 33.3 + 33.4, all deleted again, leaves about
+-- 7e-15). Each write now rounds the new total to 9 decimal places, far below anything a
+-- weight or score can mean, so the error of one write never carries into the next and a
+-- module with nothing scored is back at exactly 0
+
+DROP TRIGGER IF EXISTS trg_assessments_agg_insert;
+DROP TRIGGER IF EXISTS trg_assessments_agg_delete;
+DROP TRIGGER IF EXISTS trg_assessments_agg_update;
+
+CREATE TRIGGER IF NOT EXISTS trg_assessments_agg_insert
+AFTER INSERT ON assessments
+FOR EACH ROW BEGIN
+    UPDATE modules
+    SET total_weight = ROUND(total_weight + NEW.weight_pct, 9),
+        scored_weight = ROUND(scored_weight + IIF(NEW.score_pct IS NULL, 0, NEW.weight_pct), 9),
+        weighted_sum = ROUND(weighted_sum + COALESCE(NEW.weight_pct * NEW.score_pct, 0), 9)
+    WHERE id = NEW.module_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assessments_agg_delete
+AFTER DELETE ON assessments
+FOR EACH ROW BEGIN
+    UPDATE modules
+    SET total_weight = ROUND(total_weight - OLD.weight_pct, 9),
+        scored_weight = ROUND(scored_weight - IIF(OLD.score_pct IS NULL, 0, OLD.weight_pct), 9),
+        weighted_sum = ROUND(weighted_sum - COALESCE(OLD.weight_pct * OLD.score_pct, 0), 9)
+    WHERE id = OLD.module_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_assessments_agg_update
+AFTER UPDATE OF module_id, weight_pct, score_pct ON assessments
+FOR EACH ROW BEGIN
+    UPDATE modules
+    SET total_weight = ROUND(total_weight - OLD.weight_pct, 9),
+        scored_weight = ROUND(scored_weight - IIF(OLD.score_pct IS NULL, 0, OLD.weight_pct), 9),
+        weighted_sum = ROUND(weighted_sum - COALESCE(OLD.weight_pct * OLD.score_pct, 0), 9)
+    WHERE id = OLD.module_id;
+
+    UPDATE modules
+    SET total_weight = ROUND(total_weight + NEW.weight_pct, 9),
+        scored_weight = ROUND(scored_weight + IIF(NEW.score_pct IS NULL, 0, NEW.weight_pct), 9),
+        weighted_sum = ROUND(weighted_sum + COALESCE(NEW.weight_pct * NEW.score_pct, 0), 9)
+    WHERE id = NEW.module_id;
+END;
+
+-- modules that already drifted: rebuilt from their assessments, rounded the same way
+-- (MODULE_AGG_SQL in app.py, which `flask grades-repair` uses)
+
+UPDATE modules SET
+    total_weight = ROUND(COALESCE((SELECT SUM(weight_pct) FROM assessments WHERE module_id = modules.id), 0), 9),
+    scored_weight = ROUND(COALESCE((SELECT SUM(weight_pct) FROM assessments WHERE module_id = modules.id AND score_pct IS NOT NULL), 0), 9),
+    weighted_sum = ROUND(COALESCE((SELECT SUM(weight_pct * score_pct) FROM assessments WHERE module_id = modules.id), 0), 9);
@@ -0,0 +1,51 @@
+-- =============== Home Page Summary: modules without scores =============== --
+
+-- overall_grade averages the modules that have a score. The module aggregates are REAL
+-- sums (kept to 9 decimal places since 0016), so "has a score" is a scored weight above
+-- 1e-9 (WEIGHT_EPSILON in app.py), not above 0: a leftover like 7e-15 used to count as a
+-- module graded 0.0 and pulled the average down
+
+DROP TRIGGER IF EXISTS trg_modules_summary_insert;
+DROP TRIGGER IF EXISTS trg_modules_summary_update;
+DROP TRIGGER IF EXISTS trg_modules_summary_delete;
+
+CREATE TRIGGER IF NOT EXISTS trg_modules_summary_insert
+AFTER INSERT ON modules
+FOR EACH ROW BEGIN
+    UPDATE user_summary
+    SET overall_grade = (
+        SELECT ROUND(SUM(credits * weighted_sum / scored_weight) / SUM(credits), 2)
+        FROM modules WHERE user_id = NEW.user_id AND scored_weight > 1e-9
+    )
+    WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modules_summary_update
+AFTER UPDATE OF credits, scored_weight, weighted_sum ON modules
+FOR EACH ROW BEGIN
+    UPDATE user_summary
+    SET overall_grade = (
+        SELECT ROUND(SUM(credits * weighted_sum / scored_weight) / SUM(credits), 2)
+        FROM modules WHERE user_id = NEW.user_id AND scored_weight > 1e-9
+    )
+    WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_modules_summary_delete
+AFTER DELETE ON modules
+FOR EACH ROW BEGIN
+    UPDATE user_summary
+    SET overall_grade = (
+        SELECT ROUND(SUM(credits * weighted_sum / scored_weight) / SUM(credits), 2)
+        FROM modules WHERE user_id = OLD.user_id AND scored_weight > 1e-9
+    )
+    WHERE user_id = OLD.user_id;
+END;
+
+-- grades that counted such a module
+
+UPDATE user_summary
+SET overall_grade = (
+    SELECT ROUND(SUM(credits * weighted_sum / scored_weight) / SUM(credits), 2)
+    FROM modules WHERE user_id = user_summary.user_id AND scored_weight > 1e-9
+);
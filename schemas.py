@@ -0,0 +1,327 @@
+# schemas.py
+#
+# msgspec Structs for everything the app accepts (forms, bulk JSON, /api/v1) and returns
+# from /api/v1. The *In structs are what a client sends, field names = column names, field
+# order = the order the routes insert them in. The plain ones add the server-side fields
+
+import re
+from typing import Annotated, ClassVar, Literal
+
+import msgspec
+from msgspec import Meta, Struct
+
+STATUS_CHOICES = [
+    "Not Applied",
+    "Interested",
+    "Application Submitted",
+    "Online Assessment",
+    "Case Study",
+    "HireVue",
+    "Telephone Interview",
+    "Video Interview",
+    "Face-to-face Interview",
+    "Assessment Centre",
+    "Offer Received",
+    "Rejected",
+    "Not Interested"
+]
+
+CV_CHOICES = ["Yes", "No"]
+OPT_CHOICES = ["Yes", "No", "Optional"]
+
+ASSIGNMENT_STATUSES = ["pending", "in_progress", "done"]
+
+Text = Annotated[str, Meta(min_length = 1)]
+Time = Annotated[str, Meta(pattern = r"^([01]\d|2[0-3]):[0-5]\d$")]
+Day = Annotated[str, Meta(pattern = r"^\d{4}-\d{2}-\d{2}$")]
+Percent = Annotated[float, Meta(ge = 0, le = 100)]
+
+
+# ---------------- schedule ----------------
+
+class ScheduleItemIn(Struct):
+    weekday: Annotated[int, Meta(ge = 0, le = 6)]
+    start_time: Time
+    end_time: Time
+    title: Text
+    notes: str = ""
+
+    # field -> message shown to the user when that field is rejected
+    messages: ClassVar[dict] = {
+        "weekday": "Please select a valid day",
+        "start_time": "Please enter valid times",
+        "end_time": "Please enter valid times",
+        "title": "Please enter a title",
+    }
+
+    def __post_init__(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("End time must be after start time")
+
+
+class ScheduleItem(ScheduleItemIn, kw_only = True):
+    id: int
+
+
+# free time search (GET /api/v1/schedule/free): stretches of at least `minutes` between
+# from and to on each day
+class FreeQuery(Struct):
+    minutes: Annotated[int, Meta(ge = 1, le = 24 * 60)] = 60
+    start: Time = msgspec.field(default = "08:00", name = "from")
+    end: Time = msgspec.field(default = "20:00", name = "to")
+
+    messages: ClassVar[dict] = {
+        "minutes": "minutes must be a whole number of minutes (1-1440).",
+        "from": "from and to must be times (HH:MM).",
+        "to": "from and to must be times (HH:MM).",
+    }
+
+    def __post_init__(self):
+        if self.end <= self.start:
+            raise ValueError("to must be after from")
+
+
+class FreeSlot(Struct):
+    weekday: int
+    start_time: str
+    end_time: str
+
+
+# ---------------- applications ----------------
+
+class ApplicationIn(Struct, kw_only = True):
+    status: Literal[tuple(STATUS_CHOICES)] = "Not Applied"
+    company: Text
+    programme: Text
+    open_date: Day | None = None
+    close_date: Day | None = None
+    cv: Literal[tuple(CV_CHOICES)] = "Yes"
+    cover: Literal[tuple(OPT_CHOICES)] = "Optional"
+    written: Literal[tuple(OPT_CHOICES)] = "Optional"
+    notes: str = ""
+
+    messages: ClassVar[dict] = {
+        "company": "Please fill Company and Programme.",
+        "programme": "Please fill Company and Programme.",
+        "status": "Invalid selection.",
+        "cv": "Invalid selection.",
+        "cover": "Invalid selection.",
+        "written": "Invalid selection.",
+        "open_date": "Please enter valid dates.",
+        "close_date": "Please enter valid dates.",
+    }
+
+
+class Application(ApplicationIn, kw_only = True):
+    id: int
+
+
+# a CSV import row that was not saved; row is the file line the record starts on (the header
+# is line 1)
+class RowError(Struct):
+    row: int | None
+    error: str
+
+
+# errors holds the first IMPORT_MAX_ERRORS of them, error_count all of them
+class ImportReport(Struct):
+    imported: int = 0
+    duplicates: int = 0
+    error_count: int = 0
+    errors: list[RowError] = []
+
+
+# ---------------- grades ----------------
+
+class ModuleIn(Struct):
+    name: Text
+    term: Annotated[int, Meta(ge = 1)] = 1
+    credits: Annotated[float, Meta(gt = 0)] = 5.0
+
+    messages: ClassVar[dict] = {
+        "name": "Please fill module name, valid term and credits.",
+        "term": "Please fill module name, valid term and credits.",
+        "credits": "Please fill module name, valid term and credits.",
+    }
+
+
+class AssessmentIn(Struct):
+    title: Text
+    weight_pct: Percent
+    score_pct: Percent | None = None
+
+    messages: ClassVar[dict] = {
+        "title": "Fill a valid assessment title and weight (0-100).",
+        "weight_pct": "Fill a valid assessment title and weight (0-100).",
+        "score_pct": "The score must be between 0 and 100.",
+    }
+
+
+class Assessment(AssessmentIn, kw_only = True):
+    id: int
+    module_id: int
+
+
+# with the running aggregates worked out (see _calc_module_stats)
+class Module(ModuleIn, kw_only = True):
+    id: int
+    total_weight: float
+    current_grade: float | None
+    w_with_score: float
+    current_points: float
+    assessments: list[Assessment] = []
+
+
+# ---------------- assignments ----------------
+
+class AssignmentIn(Struct):
+    title: Text
+    due_date: Day | None = None
+    notes: str = ""
+
+    messages: ClassVar[dict] = {
+        "title": "Please enter a title.",
+        "due_date": "Please enter a valid due date.",
+    }
+
+
+class StageIn(Struct):
+    title: Text
+    done: bool = False
+
+    messages: ClassVar[dict] = {
+        "title": "Stage title cannot be empty",
+    }
+
+
+# one stage in a batch (PUT /api/v1/assignments/<id>/stages); done None = leave it as it is
+class StageOrder(Struct):
+    id: int
+    done: bool | None = None
+
+
+class StageBatch(Struct):
+    stages: list[StageOrder]
+    delete: list[int] = []
+
+    messages: ClassVar[dict] = {
+        "stages": "List the stages as {\"id\": ..., \"done\": ...} objects, in the new order.",
+        "delete": "List the ids of the stages to delete.",
+    }
+
+
+class Stage(StageIn, kw_only = True):
+    id: int
+    assignment_id: int
+    position: int
+
+
+# status, done_count and total_count follow from the stages (migrations/0009_assignment_progress.sql)
+class Assignment(AssignmentIn, kw_only = True):
+    id: int
+    priority: int
+    status: Literal[tuple(ASSIGNMENT_STATUSES)]
+    done_count: int
+    total_count: int
+    stages: list[Stage] = []
+
+
+# ---------------- search ----------------
+
+# one search result; title, detail and snippet are HTML-escaped text with the matched
+# words wrapped in <mark>
+class SearchHit(Struct):
+    kind: Literal["schedule", "application", "assignment", "stage"]
+    id: int
+    title: str
+    detail: str
+    snippet: str
+    url: str
+
+
+# ---------------- export / restore ----------------
+
+# A user's data as JSON Lines: an ExportHeader, then one record per row, tagged by "type".
+# Parents come before their children; ids are the exporting database's and only link the
+# records together (a restore gives every row a new id)
+EXPORT_FORMAT_VERSION = 1
+
+
+class ExportHeader(Struct, tag = "uniflow-export", kw_only = True):
+    version: int = EXPORT_FORMAT_VERSION
+    exported_at: str
+
+
+class ScheduleRecord(ScheduleItemIn, tag = "schedule", kw_only = True):
+    id: int
+
+
+class ApplicationRecord(ApplicationIn, tag = "application", kw_only = True):
+    id: int
+
+
+class ModuleRecord(ModuleIn, tag = "module", kw_only = True):
+    id: int
+
+
+class AssessmentRecord(AssessmentIn, tag = "assessment", kw_only = True):
+    id: int
+    module_id: int
+
+
+class AssignmentRecord(AssignmentIn, tag = "assignment", kw_only = True):
+    id: int
+
+
+# in their order within the assignment
+class StageRecord(StageIn, tag = "stage", kw_only = True):
+    id: int
+    assignment_id: int
+
+
+ExportRecord = (
+    ExportHeader | ScheduleRecord | ApplicationRecord | ModuleRecord | AssessmentRecord
+    | AssignmentRecord | StageRecord
+)
+
+
+# ---------------- loading ----------------
+
+_FIELD_IN_ERROR = re.compile(r"`\$\.(\w+)`|required field `(\w+)`")
+
+
+def _message(kind, error):
+    m = _FIELD_IN_ERROR.search(str(error))
+    field = m and (m.group(1) or m.group(2))
+
+    return kind.messages.get(field) or str(error)
+
+
+# builds a kind from a form, a JSON object or a dict of column values. Strings are stripped;
+# empty strings and nulls count as missing, so the field's default applies. Numbers may
+# arrive as strings (form posts). Raises ValueError with the message to show the user
+def load(kind, data):
+    values = {}
+
+    for key, value in data.items():
+        if value is None:
+            continue
+
+        if isinstance(value, str):
+            value = value.strip()
+
+            if not value:
+                continue
+
+        values[key] = value
+
+    try:
+        return msgspec.convert(values, kind, strict = False)
+    except msgspec.ValidationError as e:
+        raise ValueError(_message(kind, e)) from None
+
+
+# kind built from a database row (or dict): takes kind's fields that the row has, the rest
+# come from extra or the defaults
+def from_row(kind, row, **extra):
+    return kind(**{f: row[f] for f in kind.__struct_fields__ if f in row and f not in extra}, **extra)
@@ -0,0 +1,96 @@
+# sessions.py
+
+import time
+
+from flask_session import Session
+from flask_session._utils import total_seconds
+from flask_session.base import ServerSideSession, ServerSideSessionInterface
+from flask_session.defaults import Defaults
+
+
+class SQLiteSession(ServerSideSession):
+    pass
+
+
+# Flask-Session backend that keeps sessions in our own SQLite database (sessions table,
+# migrations/0005). The cookie only carries the session id.
+# SQLite has no TTL, so expired rows are reaped by `flask session_cleanup` (registered by
+# Flask-Session) or, with SESSION_CLEANUP_N_REQUESTS, on average every N requests
+class SQLiteSessionInterface(ServerSideSessionInterface):
+
+    session_class = SQLiteSession
+    ttl = False
+
+    def __init__(
+        self,
+        app,
+        db,
+        key_prefix = Defaults.SESSION_KEY_PREFIX,
+        permanent = Defaults.SESSION_PERMANENT,
+        sid_length = Defaults.SESSION_ID_LENGTH,
+        serialization_format = Defaults.SESSION_SERIALIZATION_FORMAT,
+        cleanup_n_requests = Defaults.SESSION_CLEANUP_N_REQUESTS,
+    ):
+        self.db = db
+        super().__init__(app, key_prefix, False, permanent, sid_length, serialization_format, cleanup_n_requests)
+
+    def open_session(self, app, request):
+        # static files never read the session: hand out an empty one without touching the store.
+        # It is unmodified, so save_session leaves the store and the cookie alone
+        if app.static_url_path and request.path.startswith(app.static_url_path + "/"):
+            return self.session_class(sid = self._generate_sid(self.sid_length), permanent = self.permanent)
+
+        return super().open_session(app, request)
+
+    def _retrieve_session_data(self, store_id):
+        rows = self.db.execute(
+            "SELECT data FROM sessions WHERE id = ? AND expiry > ?",
+            store_id, int(time.time())
+        )
+
+        if not rows:
+            return None
+
+        return self.serializer.decode(rows[0]["data"])
+
+    def _delete_session(self, store_id):
+        self.db.execute("DELETE FROM sessions WHERE id = ?", store_id)
+
+    def _upsert_session(self, session_lifetime, session, store_id):
+        self.db.execute(
+            "INSERT INTO sessions (id, data, expiry) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET data = excluded.data, expiry = excluded.expiry",
+            store_id, self.serializer.encode(session), int(time.time() + total_seconds(session_lifetime))
+        )
+
+    def _delete_expired_sessions(self):
+        self.db.execute("DELETE FROM sessions WHERE expiry <= ?", int(time.time()))
+
+
+# SESSION_TYPE: "sqlite" (default), "cookie" (Flask's signed cookie) or any Flask-Session
+# backend, e.g. "cachelib" with SESSION_CACHELIB = FileSystemCache(...)
+def init_session(app, db):
+    config = app.config
+    config.setdefault("SESSION_TYPE", "sqlite")
+
+    # only write the store when the session actually changed, not on every request
+    config["SESSION_REFRESH_EACH_REQUEST"] = False
+
+    kind = config["SESSION_TYPE"]
+
+    if kind == "cookie":
+        return
+
+    if kind != "sqlite":
+        Session(app)
+        return
+
+    app.session_interface = SQLiteSessionInterface(
+        app,
+        db,
+        key_prefix = config.get("SESSION_KEY_PREFIX", Defaults.SESSION_KEY_PREFIX),
+        permanent = config.get("SESSION_PERMANENT", Defaults.SESSION_PERMANENT),
+        sid_length = config.get("SESSION_ID_LENGTH", Defaults.SESSION_ID_LENGTH),
+        serialization_format = config.get("SESSION_SERIALIZATION_FORMAT", Defaults.SESSION_SERIALIZATION_FORMAT),
+        cleanup_n_requests = config.get("SESSION_CLEANUP_N_REQUESTS", Defaults.SESSION_CLEANUP_N_REQUESTS),
+    )
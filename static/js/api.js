@@ -0,0 +1,101 @@
+// Forms with data-api="<url>" go to the JSON API (/api/v1) instead of a full POST + redirect +
+// page render: data-api-method is PUT / PATCH / DELETE (default PATCH).
+// On success the form fires "api:done" (response in e.detail); then, after a DELETE, the closest
+// [data-api-row] is removed. After an update the inputs already show the new values.
+// If the request cannot be sent at all the form is posted the old way.
+
+function apiToast(message, category = "success") {
+    const area = document.getElementById("toastArea");
+
+    if(!area)
+        return;
+
+    const el = document.createElement("div");
+    el.className = `toast alert alert-${category}`;
+    el.setAttribute("role", "alert");
+    el.dataset.bsDelay = "2500";
+    el.innerHTML = '<div class="d-flex"><div class="toast-body"></div>' +
+        '<button type="button" class="btn-close btn-close-white me-2 m-auto" data-bs-dismiss="toast" aria-label="Close"></button></div>';
+    el.querySelector(".toast-body").textContent = message;
+
+    area.appendChild(el);
+    el.addEventListener("hidden.bs.toast", () => el.remove());
+    new bootstrap.Toast(el).show();
+}
+
+// form fields as a JSON object: empty fields become null, checkboxes true/false
+function formToObject(form) {
+    const data = {};
+
+    for(const el of form.elements) {
+        if(!el.name || el.disabled)
+            continue;
+
+        if(el.type === "checkbox")
+            data[el.name] = el.checked;
+        else
+            data[el.name] = el.value.trim() === "" ? null : el.value;
+    }
+
+    return data;
+}
+
+async function apiSend(url, method, body) {
+    const res = await fetch(url, {
+        method,
+        headers: {"Content-Type": "application/json", "Accept": "application/json"},
+        body: method === "DELETE" ? undefined : JSON.stringify(body),
+        credentials: "same-origin",
+    });
+
+    const data = res.status === 204 ? null : await res.json();
+
+    if(!res.ok)
+        throw new Error(data?.error || `Request failed (${res.status})`);
+
+    return data;
+}
+
+document.addEventListener("submit", async (e) => {
+    const form = e.target;
+
+    // inline onsubmit="return confirm(...)" has already run
+    if(!form.dataset.api || e.defaultPrevented)
+        return;
+
+    e.preventDefault();
+
+    const method = (form.dataset.apiMethod || "PATCH").toUpperCase();
+    const buttons = [...form.querySelectorAll("button"), ...document.querySelectorAll(`button[form="${form.id}"]`)];
+    let data;
+
+    buttons.forEach(b => b.disabled = true);
+
+    try {
+        data = await apiSend(form.dataset.api, method, formToObject(form));
+    }
+    catch(err) {
+        buttons.forEach(b => b.disabled = false);
+
+        if(err instanceof TypeError) {
+            form.submit();
+            return;
+        }
+
+        apiToast(err.message, "warning");
+        return;
+    }
+
+    buttons.forEach(b => b.disabled = false);
+
+    // fired while the form is still in the page, so listeners can find its card/row
+    form.dispatchEvent(new CustomEvent("api:done", {bubbles: true, detail: data}));
+
+    if(method === "DELETE") {
+        form.closest("[data-api-row]")?.remove();
+        apiToast("Deleted.", "info");
+    }
+    else if(!form.hasAttribute("data-api-quiet")) {
+        apiToast("Saved.");
+    }
+});
@@ -19,6 +19,29 @@ function autoResizeTextarea(t) {
     t.style.height = (t.scrollHeight || t.offsetHeight) + "px";
 }
 
+// the stages table is not in the page: fetch it the first time the card is opened
+async function loadStages(card) {
+    const box = card.querySelector(".js-stages");
+
+    if(!box || box.dataset.loaded)
+        return;
+
+    box.dataset.loaded = "1";
+
+    try {
+        const res = await fetch(box.dataset.src, {credentials: "same-origin"});
+
+        if(!res.ok)
+            throw new Error(res.status);
+
+        box.innerHTML = await res.text();
+    }
+    catch {
+        delete box.dataset.loaded;
+        box.innerHTML = '<div class="text-danger small py-2">Could not load the stages. Close and open the card to try again.</div>';
+    }
+}
+
 
 document.addEventListener("DOMContentLoaded", () => {
 
@@ -35,6 +58,7 @@ document.addEventListener("DOMContentLoaded", () => {
         // reopen if it was open before refresh
         if(id && openSet.has(id)) {
             body.hidden = false;
+            loadStages(card);
 
             if(bodyBtn)
                 bodyBtn.textContent = "Close"
@@ -63,6 +87,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
             if(!open){
                 settings.hidden = true;
+                loadStages(card);
 
                 requestAnimationFrame(() => {
                     card.querySelectorAll(".assignment-body textarea").forEach(autoResizeTextarea);
@@ -148,5 +173,83 @@ document.addEventListener("DOMContentLoaded", () => {
             history.replaceState({}, "", location.pathname);
         }
     }
-});
 
+    // drag stages into a new order: the rows move right away, the order is saved with one
+    // PUT to the checklist's batch endpoint; if that fails the page reloads the saved order
+    let dragged = null;
+    let draggedFrom = "";
+
+    const stageOrder = (table) => [...table.querySelectorAll(".js-stage-row")].map(r => Number(r.dataset.stageId));
+
+    document.addEventListener("dragstart", (e) => {
+        dragged = e.target.closest?.(".js-stage-row") || null;
+
+        if(dragged) {
+            draggedFrom = stageOrder(dragged.closest("table")).join();
+            e.dataTransfer.effectAllowed = "move";
+            dragged.classList.add("opacity-50");
+        }
+    });
+
+    document.addEventListener("dragover", (e) => {
+        const row = e.target.closest?.(".js-stage-row");
+
+        if(!dragged || !row || row === dragged || row.parentElement !== dragged.parentElement)
+            return;
+
+        e.preventDefault();
+
+        const box = row.getBoundingClientRect();
+        row.parentElement.insertBefore(dragged, e.clientY < box.top + box.height / 2 ? row : row.nextSibling);
+    });
+
+    document.addEventListener("dragend", async () => {
+        if(!dragged)
+            return;
+
+        const row = dragged;
+        const table = row.closest("table");
+        dragged = null;
+        row.classList.remove("opacity-50");
+
+        const order = stageOrder(table);
+
+        if(order.join() === draggedFrom)
+            return;
+
+        const stages = order.map(id => ({id}));
+
+        try {
+            await apiSend(table.dataset.apiBatch, "PUT", {stages});
+        }
+        catch(err) {
+            apiToast(err.message, "warning");
+            location.reload();
+        }
+    });
+
+    // keep "x/y completed" and the progress bar current when a stage is ticked or deleted through the API
+    document.addEventListener("api:done", (e) => {
+        const card = e.target.closest(".assignment");
+        const count = card?.querySelector(".js-stage-count");
+        const bar = card?.querySelector(".js-stage-progress");
+
+        if(!count)
+            return;
+
+        // after api.js has removed a deleted row
+        requestAnimationFrame(() => {
+            const boxes = [...card.querySelectorAll('.stages-table input[name="done"]')];
+            const done = boxes.filter(b => b.checked).length;
+            const pct = boxes.length ? Math.round(100 * done / boxes.length) : 0;
+
+            count.textContent = `${done}/${boxes.length} completed`;
+
+            if(bar) {
+                bar.style.width = `${pct}%`;
+                bar.classList.toggle("bg-success", boxes.length > 0 && done === boxes.length);
+                bar.parentElement.setAttribute("aria-valuenow", pct);
+            }
+        });
+    });
+});
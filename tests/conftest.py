@@ -0,0 +1,47 @@
+# tests/conftest.py
+#
+# every test gets the app on a database of its own, migrated to the latest version
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    # no page cache, so every request runs the page queries
+    monkeypatch.setenv("FLASK_DATABASE", str(tmp_path / "test.db"))
+    monkeypatch.setenv("FLASK_CACHE_TYPE", "null")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(ROOT))
+
+    for name in ("app", "db", "cache", "sessions", "schemas", "metrics", "migrations", "intervals", "ics"):
+        sys.modules.pop(name, None)
+
+    import app as app_module
+    import migrations
+
+    migrations.upgrade(app_module.db)
+    yield app_module
+    app_module.db.close_all()
+
+
+# sign_in(email) -> (test client logged in as a new user, their user id)
+@pytest.fixture
+def sign_in(app_module):
+
+    def sign_in(email):
+        client = app_module.app.test_client()
+        client.post("/signup", data={"username": email, "email": email, "password": "pw", "confirm": "pw"})
+        client.post("/login", data={"email": email, "password": "pw"})
+
+        # shows (and clears) the login flash
+        client.get("/home")
+
+        uid = app_module.db.execute("SELECT id FROM users WHERE email = ?", email)[0]["id"]
+        return client, uid
+
+    return sign_in
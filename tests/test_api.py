@@ -0,0 +1,20 @@
+# tests/test_api.py
+#
+# errors under /api/v1 are JSON; routing redirects are passed through with their Location
+
+
+def test_api_errors_are_json(app_module, sign_in):
+    client, _ = sign_in("api@example.com")
+
+    response = client.get("/api/v1/schedule/999")
+    assert response.status_code == 404
+    assert response.is_json and "error" in response.get_json()
+
+
+def test_api_redirects_keep_their_location(app_module, sign_in):
+    client, _ = sign_in("redirect@example.com")
+
+    # werkzeug merges the doubled slash with a 308 to the canonical path
+    response = client.get("/api/v1//schedule")
+    assert response.status_code == 308
+    assert response.headers["Location"].endswith("/api/v1/schedule")
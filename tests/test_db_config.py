@@ -0,0 +1,22 @@
+# tests/test_db_config.py
+#
+# the PRAGMA profile of every connection can be tuned from the app config (DATABASE_PRAGMAS)
+
+import pytest
+
+
+@pytest.fixture
+def pragma_env(monkeypatch):
+    monkeypatch.setenv("FLASK_DATABASE_PRAGMAS__cache_size", "-64000")
+    monkeypatch.setenv("FLASK_DATABASE_PRAGMAS__journal_mode", "DELETE")
+
+
+# pragma_env first: the app reads the environment when it is imported
+def test_database_pragmas_come_from_the_config(pragma_env, app_module):
+    con = app_module.db.connection()
+
+    assert con.execute("PRAGMA cache_size").fetchone()[0] == -64000
+    assert con.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+
+    # the rest of the profile is left as it was
+    assert con.execute("PRAGMA foreign_keys").fetchone()[0] == 1
@@ -0,0 +1,72 @@
+# tests/test_grades_aggregates.py
+#
+# the module aggregates are running sums kept by triggers; adding assessments and deleting
+# them again must leave the module exactly where it started
+
+import pytest
+
+
+def _module(client, weights):
+    module = client.post("/api/v1/modules", json={"name": "Maths", "credits": 10}).get_json()
+
+    ids = [
+        client.post(f"/api/v1/modules/{module['id']}/assessments",
+                    json={"title": f"Part {i}", "weight_pct": w, "score_pct": 71.7}).get_json()["id"]
+        for i, w in enumerate(weights)
+    ]
+
+    return module["id"], ids
+
+
+@pytest.mark.parametrize("weights", [(33.3, 33.3, 33.4), (10.1, 20.2), (0.1, 0.2)])
+def test_deleting_every_assessment_leaves_no_grade(app_module, sign_in, weights):
+    client, uid = sign_in("drift@example.com")
+    module_id, ids = _module(client, weights)
+
+    for assessment_id in ids:
+        assert client.delete(f"/api/v1/assessments/{assessment_id}").status_code == 204
+
+    module = client.get(f"/api/v1/modules/{module_id}").get_json()
+    assert module["current_grade"] is None
+    assert module["total_weight"] == 0
+    assert module["w_with_score"] == 0
+
+    row = app_module.db.execute("SELECT total_weight, scored_weight, weighted_sum FROM modules WHERE id = ?", module_id)[0]
+    assert (row["total_weight"], row["scored_weight"], row["weighted_sum"]) == (0, 0, 0)
+
+
+def test_grades_repair_finds_no_drift_after_edits(app_module, sign_in):
+    client, uid = sign_in("repair@example.com")
+    module_id, ids = _module(client, (33.3, 33.3, 33.4))
+
+    client.patch(f"/api/v1/assessments/{ids[0]}", json={"score_pct": None})
+    client.delete(f"/api/v1/assessments/{ids[1]}")
+
+    result = app_module.app.test_cli_runner().invoke(args=["grades-repair", "--check"])
+    assert result.exit_code == 0, result.output
+
+
+def _overall_grade(app_module, uid):
+    return app_module.db.execute("SELECT overall_grade FROM user_summary WHERE user_id = ?", uid)[0]["overall_grade"]
+
+
+def test_overall_grade_is_empty_once_every_assessment_is_gone(app_module, sign_in):
+    client, uid = sign_in("overall@example.com")
+    module_id, ids = _module(client, (33.3, 33.3, 33.4))
+    assert _overall_grade(app_module, uid) == 71.7
+
+    for assessment_id in ids:
+        client.delete(f"/api/v1/assessments/{assessment_id}")
+
+    assert _overall_grade(app_module, uid) is None
+
+
+def test_overall_grade_ignores_a_leftover_scored_weight(app_module, sign_in):
+    client, uid = sign_in("leftover@example.com")
+    _module(client, (100,))
+    emptied, _ = _module(client, ())
+
+    # what a module from before migrations/0016 could be left with
+    app_module.db.execute("UPDATE modules SET scored_weight = 7e-15 WHERE id = ?", emptied)
+
+    assert _overall_grade(app_module, uid) == 71.7
@@ -0,0 +1,38 @@
+# tests/test_grades_queries.py
+#
+# /grades loads the modules and all of their assessments with a fixed number of queries,
+# however many modules the user has (see _load_grades)
+
+def _add_modules(db, uid, count):
+    module_ids = db.insert_many(
+        "modules", ("user_id", "name", "term", "credits"),
+        ((uid, f"Module {i}", 1 + i % 3, 10) for i in range(count))
+    )
+
+    db.insert_many(
+        "assessments", ("module_id", "title", "weight_pct", "score_pct"),
+        ((m, title, 50, 60) for m in module_ids for title in ("Exam", "Coursework"))
+    )
+
+
+def _grades_queries(app_module, sign_in, email, modules):
+    client, uid = sign_in(email)
+    _add_modules(app_module.db, uid, modules)
+
+    queries = []
+    app_module.db.add_listener(lambda query, params, seconds: queries.append(query))
+
+    response = client.get("/grades")
+    app_module.db._listeners.clear()
+
+    assert response.status_code == 200
+    assert f"Module {modules - 1}" in response.get_data(as_text=True)
+    return queries
+
+
+def test_grades_page_query_count_does_not_grow_with_modules(app_module, sign_in):
+    one = _grades_queries(app_module, sign_in, "one@example.com", 1)
+    forty = _grades_queries(app_module, sign_in, "forty@example.com", 40)
+
+    assert len(one) == len(forty), (one, forty)
+    assert len(forty) <= 5, forty
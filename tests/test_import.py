@@ -0,0 +1,43 @@
+# tests/test_import.py
+#
+# CSV import of applications: errors name the line each record starts on, and company +
+# programme pairs the user already has (in any letter case) are skipped
+
+
+def _import(client, text):
+    response = client.post("/api/v1/applications/import", data=text.encode(), content_type="text/csv")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_errors_name_the_line_the_record_starts_on(app_module, sign_in):
+    client, _ = sign_in("lines@example.com")
+
+    report = _import(client, (
+        "Company,Programme,Notes\n"                  # line 1
+        'Acme,Graduate,"first\nsecond\nthird"\n'     # lines 2-4
+        "\n"                                         # line 5, blank
+        "Beta,,missing programme\n"                  # line 6
+        'Gamma,Intern,"x\n"\n'                       # lines 7-8
+        "Delta,,missing again\n"                     # line 9
+    ))
+
+    assert report["imported"] == 2
+    assert [e["row"] for e in report["errors"]] == [6, 9]
+
+
+def test_duplicates_are_skipped_whatever_the_letter_case(app_module, sign_in):
+    client, uid = sign_in("dedupe@example.com")
+    client.post("/api/v1/applications", json={"company": "Acme Ltd", "programme": "Graduate Scheme"})
+
+    report = _import(client, (
+        "Company,Programme\n"
+        "ACME LTD,graduate scheme\n"
+        "Beta,Intern\n"
+        "beta,INTERN\n"
+    ))
+
+    assert (report["imported"], report["duplicates"]) == (1, 2)
+
+    count = app_module.db.execute("SELECT COUNT(*) AS n FROM applications WHERE user_id = ?", uid)[0]["n"]
+    assert count == 2
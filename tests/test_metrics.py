@@ -0,0 +1,26 @@
+# tests/test_metrics.py
+#
+# metrics and the slow-query log are opt-in: without either, no statement is timed
+
+from flask import Flask
+
+
+def test_nothing_is_timed_by_default(app_module):
+    assert app_module.db._listeners == []
+
+
+def test_slow_query_log_works_without_metrics(app_module, caplog):
+    import metrics
+
+    app = Flask("slow_log_only")
+    app.config["METRICS_SLOW_QUERY_MS"] = 0
+    m = metrics.Metrics(app, app_module.db)
+
+    try:
+        assert app_module.db._listeners == [m._on_query]
+        assert "metrics" not in app.view_functions
+
+        app_module.db.execute("SELECT 1")
+        assert "slow query" in caplog.text
+    finally:
+        app_module.db._listeners.clear()
@@ -0,0 +1,25 @@
+# tests/test_pages.py
+#
+# the list pages answer 304 from the user's data version, and read that version once per
+# request: the ETag and the page cache's generation come from the same row
+
+import pytest
+from cachelib import SimpleCache
+
+
+@pytest.mark.parametrize("path", ["/schedule", "/applications", "/grades", "/assignments"])
+def test_data_version_is_read_once_per_page(app_module, sign_in, monkeypatch, path):
+    monkeypatch.setattr(app_module.page_cache, "backend", SimpleCache())
+    client, _ = sign_in("pages@example.com")
+
+    queries = []
+    app_module.db.add_listener(lambda query, params, seconds: queries.append(query))
+
+    try:
+        first = client.get(path)
+        again = client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+    finally:
+        app_module.db._listeners.clear()
+
+    assert (first.status_code, again.status_code) == (200, 304)
+    assert sum("FROM user_data_version" in q for q in queries) == 2, queries
@@ -0,0 +1,44 @@
+# tests/test_restore.py
+#
+# restoring an export replaces the account's data in one transaction; a file with
+# overlapping schedule slots changes nothing
+
+import io
+import json
+
+
+def _restore(client, records):
+    body = "".join(json.dumps(r) + "\n" for r in records).encode()
+    client.post("/account/restore", data={"file": (io.BytesIO(body), "uniflow.jsonl")})
+    return client.get("/home").get_data(as_text=True)
+
+
+def _export(client):
+    return [json.loads(line) for line in client.get("/account/export").get_data(as_text=True).splitlines()]
+
+
+def test_export_restores_as_it_is(app_module, sign_in):
+    client, _ = sign_in("roundtrip@example.com")
+    client.post("/api/v1/schedule", json={"weekday": 1, "start_time": "09:00", "end_time": "10:00", "title": "Lecture"})
+    client.post("/api/v1/applications", json={"company": "Acme", "programme": "Graduate"})
+
+    records = _export(client)
+    assert "Restored 2 records." in _restore(client, records)
+
+    # the rows come back under new ids
+    without_ids = lambda rs: [{k: v for k, v in r.items() if k != "id"} for r in rs[1:]]
+    assert without_ids(_export(client)) == without_ids(records)
+
+
+def test_overlap_with_a_slot_whose_id_is_0_is_refused(app_module, sign_in):
+    client, uid = sign_in("overlap@example.com")
+    client.post("/api/v1/schedule", json={"weekday": 1, "start_time": "12:00", "end_time": "13:00", "title": "Kept"})
+
+    header = _export(client)[0]
+    slot = {"type": "schedule", "weekday": 0, "start_time": "09:00", "end_time": "10:00", "title": "A", "notes": ""}
+
+    page = _restore(client, [header, {**slot, "id": 0}, {**slot, "id": 1, "start_time": "09:30", "end_time": "10:30"}])
+    assert "Nothing was restored" in page
+
+    rows = app_module.db.execute("SELECT title FROM schedule_items WHERE user_id = ?", uid)
+    assert [r["title"] for r in rows] == ["Kept"]
@@ -0,0 +1,37 @@
+# tests/test_sessions.py
+#
+# server-side sessions: logging in or out hands out a new session id, so an id from before
+# (planted by someone else, or seen by them) never becomes a logged-in session
+
+
+def _sid(client):
+    return client.get_cookie("session").value
+
+
+def _stored(app_module, sid):
+    store_id = app_module.app.session_interface._get_store_id(sid)
+    return app_module.db.execute("SELECT COUNT(*) AS n FROM sessions WHERE id = ?", store_id)[0]["n"]
+
+
+def test_login_and_logout_rotate_the_session_id(app_module):
+    client = app_module.app.test_client()
+    client.post("/signup", data={"username": "s", "email": "s@example.com", "password": "pw", "confirm": "pw"})
+
+    # the signup flash already gave this browser a session
+    before = _sid(client)
+    assert _stored(app_module, before) == 1
+
+    client.post("/login", data={"email": "s@example.com", "password": "pw"})
+    logged_in = _sid(client)
+
+    assert logged_in != before
+    assert _stored(app_module, before) == 0
+
+    # someone holding the old id is not logged in
+    other = app_module.app.test_client()
+    other.set_cookie("session", before)
+    assert other.get("/home").status_code == 302
+
+    client.get("/logout")
+    assert _sid(client) != logged_in
+    assert _stored(app_module, logged_in) == 0